@@ -0,0 +1 @@
+# Código compartido por todos los microservicios (se copia al Lambda Layer)
@@ -0,0 +1,104 @@
+"""
+Paginación de listados con limit / next_token / fields, compartida por todos
+los microservicios a través del Lambda Layer.
+"""
+import re
+import json
+import base64
+
+# Límites de página para los listados
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Nombres de atributos aceptados en el parámetro fields
+CAMPO_VALIDO = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class PaginacionError(ValueError):
+    """Parámetros de paginación o proyección inválidos"""
+    pass
+
+
+def codificar_token(last_evaluated_key):
+    """Convierte el LastEvaluatedKey de DynamoDB en un token opaco para el cliente"""
+    if not last_evaluated_key:
+        return None
+    contenido = json.dumps(last_evaluated_key, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(contenido.encode('utf-8')).decode('ascii')
+
+
+def decodificar_token(next_token):
+    """Convierte el token opaco del cliente de vuelta en un ExclusiveStartKey"""
+    if not next_token:
+        return None
+    try:
+        relleno = '=' * (-len(next_token) % 4)
+        clave = json.loads(base64.urlsafe_b64decode(next_token + relleno).decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        raise PaginacionError('next_token inválido')
+    if not isinstance(clave, dict):
+        raise PaginacionError('next_token inválido')
+    return clave
+
+
+def leer_limite(params):
+    """Lee y valida el parámetro limit"""
+    limite = params.get('limit')
+    if limite in (None, ''):
+        return DEFAULT_LIMIT
+    try:
+        limite = int(limite)
+    except (TypeError, ValueError):
+        raise PaginacionError('limit debe ser un número entero')
+    if limite < 1 or limite > MAX_LIMIT:
+        raise PaginacionError(f'limit debe estar entre 1 y {MAX_LIMIT}')
+    return limite
+
+
+def construir_proyeccion(fields):
+    """
+    Convierte "pedido_id,estado,costo" en ProjectionExpression y
+    ExpressionAttributeNames (evita conflictos con palabras reservadas)
+    Returns: dict con los parámetros para get_item/query, vacío si no hay fields
+    """
+    if not fields:
+        return {}
+
+    campos = [c.strip() for c in fields.split(',') if c.strip()]
+    if not campos:
+        return {}
+
+    for campo in campos:
+        if not CAMPO_VALIDO.match(campo):
+            raise PaginacionError(f"Campo inválido en fields: '{campo}'")
+
+    nombres = {f'#f{i}': campo for i, campo in enumerate(dict.fromkeys(campos))}
+    return {
+        'ProjectionExpression': ', '.join(nombres.keys()),
+        'ExpressionAttributeNames': nombres
+    }
+
+
+def leer_parametros(params):
+    """
+    Lee limit, next_token y fields de los query params
+    Returns: (int, dict, dict) - (límite, ExclusiveStartKey, parámetros de proyección)
+    """
+    return (
+        leer_limite(params),
+        decodificar_token(params.get('next_token')),
+        construir_proyeccion(params.get('fields'))
+    )
+
+
+def consultar_pagina(table, limite, start_key=None, **query_kwargs):
+    """
+    Ejecuta una query de una sola página
+    Returns: (list, str) - (items, next_token o None si no hay más páginas)
+    """
+    query_kwargs['Limit'] = limite
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+
+    response = table.query(**query_kwargs)
+    return response.get('Items', []), codificar_token(response.get('LastEvaluatedKey'))
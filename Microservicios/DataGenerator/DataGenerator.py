@@ -1,5 +1,10 @@
+import os
 import json
+import random
+import argparse
+from datetime import datetime
 from data_generator_utils.config import Config
+from data_generator_utils.shards import generar_en_paralelo, limpiar_salida
 from data_generator_utils.generators import (
     LocalesGenerator,
     UsuariosGenerator,
@@ -17,18 +22,119 @@ from data_generator_utils.generators import (
 
 def guardar_json(filename, data):
     """Guarda datos en formato JSON"""
+    # DataPoblator prefiere .ndjson y partes: no deben quedar de una corrida anterior
+    limpiar_salida(os.path.splitext(filename)[0])
     filepath = f"{Config.OUTPUT_DIR}/{filename}"
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
     print(f"  ✅ {filename} generado ({len(data)} registros)")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera los datos de prueba de China Wok")
+    parser.add_argument("--pedidos", type=int,
+                        help="Modo paralelo: cantidad de pedidos, generados en shards NDJSON")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count(),
+                        help="Procesos del modo paralelo (por defecto, uno por CPU)")
+    parser.add_argument("--shards", type=int,
+                        help=f"Shards del modo paralelo (por defecto, uno cada {Config.PEDIDOS_POR_SHARD} pedidos)")
+    parser.add_argument("--seed",
+                        help="Semilla para una salida reproducible (en modo paralelo se elige una si no se indica)")
+    parser.add_argument("--fecha-referencia",
+                        help="Fecha 'actual' de los datos en ISO 8601 (por defecto, ahora; en modo paralelo, hoy a las 00:00)")
+    return parser.parse_args()
+
+
+def generar_pedidos_y_resenas(locales_ids, usuarios, productos, productos_por_local,
+                             empleados, empleados_por_local, combos_por_local):
+    """Pedidos, reseñas y eventos en memoria (Config.NUM_PEDIDOS)"""
+    # 7. Generar Pedidos
+    print("\n📦 Generando Pedidos...")
+    pedidos, pedidos_ids = PedidosGenerator.generar_pedidos(
+        locales_ids, usuarios, productos, productos_por_local, empleados_por_local, combos_por_local
+    )
+    
+    # 8. Generar Reseñas
+    print("\n⭐ Generando Reseñas...")
+    resenas = ResenasGenerator.generar_resenas(pedidos, empleados_por_local)
+    guardar_json("resenas.json", resenas)
+    
+    # Los empleados se guardan después de acumular sus calificaciones
+    ResenasGenerator.acumular_calificaciones(empleados, resenas)
+    guardar_json("empleados.json", empleados)
+    guardar_json("resenas_resumen.json", ResenasGenerator.generar_resumenes(resenas, locales_ids))
+    
+    # 9. Separar el historial de estados en la tabla de eventos
+    # (las reseñas se generan antes porque usan el historial en línea)
+    print("\n🧾 Generando eventos de pedidos...")
+    pedidos, pedido_eventos = PedidosGenerator.separar_eventos(pedidos)
+    guardar_json("pedidos.json", pedidos)
+    guardar_json("pedido_eventos.json", pedido_eventos)
+    
+    return {"pedidos": len(pedidos), "resenas": len(resenas), "pedido_eventos": len(pedido_eventos)}
+
+
+def generar_pedidos_en_paralelo(args, locales_ids, usuarios, productos, productos_por_local,
+                                empleados, empleados_por_local, combos_por_local):
+    """
+    Pedidos, reseñas y eventos repartidos en shards de un pool de procesos;
+    cada shard escribe sus partes NDJSON (<tabla>-part-NNNNN.ndjson)
+    """
+    shards = args.shards or max(1, -(-args.pedidos // Config.PEDIDOS_POR_SHARD))
+    procesos = max(1, min(args.procesos or 1, shards))
+    
+    usuarios_validos = PedidosGenerator.filtrar_usuarios_validos(usuarios)
+    if not usuarios_validos:
+        print("  ⚠️  No hay usuarios Cliente con información bancaria")
+        return {"pedidos": 0, "resenas": 0, "pedido_eventos": 0}
+    
+    print(f"\n📦 Generando {args.pedidos} pedidos, reseñas y eventos en {shards} shards ({procesos} procesos)...")
+    contexto = {
+        "locales_ids": locales_ids,
+        "usuarios_validos": usuarios_validos,
+        "productos": productos,
+        "productos_por_local": productos_por_local,
+        "empleados_por_local": empleados_por_local,
+        "combos_por_local": combos_por_local
+    }
+    conteos, acumulados, resumenes = generar_en_paralelo(args.pedidos, contexto, args.seed, procesos, shards)
+    
+    # Los empleados y los resúmenes se guardan con los agregados de todos los shards
+    ResenasGenerator.aplicar_calificaciones(empleados, acumulados)
+    guardar_json("empleados.json", empleados)
+    
+    resenas_resumen = []
+    for local_id in locales_ids:
+        resumen = resumenes.get(local_id) or ResenasGenerator.nuevo_resumen(local_id)
+        ResenasGenerator.cerrar_resumen(resumen)
+        resenas_resumen.append(resumen)
+    guardar_json("resenas_resumen.json", resenas_resumen)
+    
+    print(f"  ✅ {conteos['pedidos']} pedidos, {conteos['resenas']} reseñas y "
+          f"{conteos['pedido_eventos']} eventos en {Config.OUTPUT_DIR}/*-part-*.ndjson")
+    return conteos
+
+
 def main():
     """Función principal para generar todos los datos"""
+    args = parse_args()
+    
     print("=" * 80)
     print("🍜 GENERADOR DE DATOS - CHINA WOK")
     print("=" * 80)
     
+    # Semilla y fecha de referencia: con ambas la salida es reproducible
+    if args.pedidos and args.seed is None:
+        args.seed = str(random.SystemRandom().getrandbits(32))
+    if args.fecha_referencia:
+        Config.FECHA_REFERENCIA = datetime.fromisoformat(args.fecha_referencia)
+    elif args.pedidos:
+        Config.FECHA_REFERENCIA = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if args.seed is not None:
+        random.seed(args.seed)
+        fecha = Config.FECHA_REFERENCIA.isoformat() if Config.FECHA_REFERENCIA else "ahora"
+        print(f"🎲 Semilla: {args.seed} - fecha de referencia: {fecha}")
+    
     # Crear directorio de salida
     Config.crear_directorio_salida()
     
@@ -50,7 +156,6 @@ def main():
     # 4. Generar Empleados
     print("\n👨‍🍳 Generando Empleados...")
     empleados, empleados_por_local = EmpleadosGenerator.generar_empleados(locales_ids)
-    guardar_json("empleados.json", empleados)
     
     # 5. Generar Combos
     print("\n🎁 Generando Combos...")
@@ -59,24 +164,23 @@ def main():
     )
     guardar_json("combos.json", combos)
     
-    # 6. Generar Pedidos
-    print("\n📦 Generando Pedidos...")
-    pedidos, pedidos_ids = PedidosGenerator.generar_pedidos(
-        locales_ids, usuarios, productos, productos_por_local, empleados_por_local, combos_por_local
-    )
-    guardar_json("pedidos.json", pedidos)
-    
-    # 7. Generar Ofertas
+    # 6. Generar Ofertas
     print("\n🎉 Generando Ofertas...")
     ofertas = OfertasGenerator.generar_ofertas(
         locales_ids, productos_por_local, combos_por_local
     )
     guardar_json("ofertas.json", ofertas)
     
-    # 8. Generar Reseñas
-    print("\n⭐ Generando Reseñas...")
-    resenas = ResenasGenerator.generar_resenas(pedidos, empleados_por_local)
-    guardar_json("resenas.json", resenas)
+    if args.pedidos:
+        conteos = generar_pedidos_en_paralelo(
+            args, locales_ids, usuarios, productos, productos_por_local,
+            empleados, empleados_por_local, combos_por_local
+        )
+    else:
+        conteos = generar_pedidos_y_resenas(
+            locales_ids, usuarios, productos, productos_por_local,
+            empleados, empleados_por_local, combos_por_local
+        )
     
     # Resumen final
     print("\n" + "=" * 80)
@@ -88,9 +192,10 @@ def main():
     print(f"   • Productos: {len(productos)}")
     print(f"   • Empleados: {len(empleados)}")
     print(f"   • Combos: {len(combos)}")
-    print(f"   • Pedidos: {len(pedidos)}")
+    print(f"   • Pedidos: {conteos['pedidos']}")
     print(f"   • Ofertas: {len(ofertas)}")
-    print(f"   • Reseñas: {len(resenas)}")
+    print(f"   • Reseñas: {conteos['resenas']}")
+    print(f"   • Eventos de pedidos: {conteos['pedido_eventos']}")
     print(f"\n📁 Archivos generados en: {Config.OUTPUT_DIR}/")
     print("=" * 80)
 
@@ -1,12 +1,17 @@
 import json
+import glob
 import boto3
 import os
 from dotenv import load_dotenv
-from botocore.exceptions import ClientError
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError, BotoCoreError
+from boto3.dynamodb.types import TypeSerializer
 import time
+from email.utils import parsedate_to_datetime
 from decimal import Decimal
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from threading import Lock, Thread, Condition, Event, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 import random as random_module
 
 # Cargar variables de entorno desde .env (si existe)
@@ -29,10 +34,59 @@ TABLE_COMBOS = os.getenv('TABLE_COMBOS')
 TABLE_PEDIDOS = os.getenv('TABLE_PEDIDOS')
 TABLE_OFERTAS = os.getenv('TABLE_OFERTAS')
 TABLE_RESENAS = os.getenv('TABLE_RESENAS')
+TABLE_PEDIDO_EVENTOS = os.getenv('TABLE_PEDIDO_EVENTOS')
+TABLE_RESENAS_RESUMEN = os.getenv('TABLE_RESENAS_RESUMEN')
 
 # Carpeta con los datos JSON
 DATA_DIR = "dynamodb_data"
 
+# Lectura incremental de los archivos de datos
+CHUNK_SIZE = 1 << 16
+# Items por llamada a BatchWriteItem (máximo de DynamoDB)
+BATCH_SIZE = 25
+# Concurrencia de escritura (AIMD): arranca en INITIAL_CONCURRENCY, suma un
+# escritor por cada ventana sin throttling y se reduce a la mitad al detectarlo
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = int(os.getenv('POBLATOR_MAX_CONCURRENCY', '32'))
+# Presupuesto global: BatchWriteItem en vuelo sumando todas las tablas
+GLOBAL_MAX_CONCURRENCY = int(os.getenv('POBLATOR_GLOBAL_CONCURRENCY', '64'))
+# Reset en modo "replace": segmentos del scan cuando la tabla no se puede
+# recrear, y si las tablas con stream también se recrean (su ARN cambia)
+RESET_SCAN_SEGMENTS = int(os.getenv('POBLATOR_RESET_SEGMENTS', '8'))
+RESET_STREAM_TABLES = os.getenv('POBLATOR_RESET_STREAM_TABLES', 'false').lower() == 'true'
+# Segundos entre cada vista de progreso consolidada
+PROGRESS_INTERVAL_SECONDS = 5
+# Lotes en vuelo entre el lector y los escritores
+MAX_QUEUED_BATCHES = MAX_CONCURRENCY * 2
+# Reintentos de UnprocessedItems con backoff exponencial y jitter completo
+MAX_BATCH_ATTEMPTS = 10
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 5.0
+# Una sola reducción por ráfaga de throttling
+DECREASE_COOLDOWN_SECONDS = 1.0
+
+THROTTLING_ERRORS = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+}
+TRANSIENT_ERRORS = THROTTLING_ERRORS | {'InternalServerError', 'ServiceUnavailable'}
+
+# Cliente del motor de escritura: sin reintentos de botocore (el motor reintenta
+# solo lo no procesado y necesita ver el throttling) y con un pool de conexiones
+# suficiente para la concurrencia máxima
+writer_client = boto3.client(
+    'dynamodb',
+    region_name=AWS_REGION,
+    config=BotoConfig(
+        retries={'max_attempts': 1, 'mode': 'standard'},
+        max_pool_connections=GLOBAL_MAX_CONCURRENCY
+    )
+)
+serializer = TypeSerializer()
+write_slots = BoundedSemaphore(GLOBAL_MAX_CONCURRENCY)
+
 # Mapeo de archivos JSON a tablas y sus claves
 TABLE_MAPPING = {
     "locales.json": {
@@ -43,7 +97,15 @@ TABLE_MAPPING = {
     "usuarios.json": {
         "table_name": TABLE_USUARIOS,
         "pk": "correo",
-        "sk": None
+        "sk": None,
+        "gsis": [
+            # Usuarios por rol ordenados por correo (usuario/listar?role=)
+            {
+                "index_name": "role-correo-index",
+                "pk": "role",
+                "sk": "correo"
+            }
+        ]
     },
     "productos.json": {
         "table_name": TABLE_PRODUCTOS,
@@ -53,7 +115,21 @@ TABLE_MAPPING = {
     "empleados.json": {
         "table_name": TABLE_EMPLEADOS,
         "pk": "local_id",
-        "sk": "dni"
+        "sk": "dni",
+        # Los acumuladores de reseñas vienen precalculados de DataGenerator: se
+        # cargan después de las reseñas con sembrado_hasta (ver load_table)
+        "depends_on": ["resenas.json"],
+        "sembrado_hasta": True,
+        "gsis": [
+            # Índice disperso: solo los empleados libres tienen disponible_rol
+            # ("local_id#role"), ordenados por calificacion_prom
+            {
+                "index_name": "disponible_rol-calificacion_prom-index",
+                "pk": "disponible_rol",
+                "sk": "calificacion_prom",
+                "sk_type": "N"
+            }
+        ]
     },
     "combos.json": {
         "table_name": TABLE_COMBOS,
@@ -63,7 +139,27 @@ TABLE_MAPPING = {
     "pedidos.json": {
         "table_name": TABLE_PEDIDOS,
         "pk": "local_id",
-        "sk": "pedido_id"
+        "sk": "pedido_id",
+        "gsis": [
+            # Pedidos de un local por estado, ordenados por fecha de creación
+            {
+                "index_name": "local_id-estado_created_at-index",
+                "pk": "local_id",
+                "sk": "estado_created_at"
+            },
+            # Historial de pedidos de un usuario, ordenado por fecha de creación
+            {
+                "index_name": "usuario_correo-created_at-index",
+                "pk": "usuario_correo",
+                "sk": "created_at"
+            }
+        ]
+    },
+    "pedido_eventos.json": {
+        "table_name": TABLE_PEDIDO_EVENTOS,
+        "pk": "pedido_key",  # "local_id#pedido_id"
+        "sk": "secuencia",
+        "sk_type": "N"
     },
     "ofertas.json": {
         "table_name": TABLE_OFERTAS,
@@ -73,25 +169,23 @@ TABLE_MAPPING = {
     "resenas.json": {
         "table_name": TABLE_RESENAS,
         "pk": "local_id",  # Cambiado de "pk" a "local_id"
-        "sk": "resena_id"
+        "sk": "resena_id",
+        # actualizarPromedioEmpleado necesita la imagen anterior para MODIFY/REMOVE
+        "stream": "NEW_AND_OLD_IMAGES",
+        # empleados y resenas_resumen se siembran con estas reseñas ya sumadas y
+        # se cargan después (depends_on de esas tablas, ver load_table)
+    },
+    "resenas_resumen.json": {
+        "table_name": TABLE_RESENAS_RESUMEN,
+        "pk": "local_id",
+        "sk": None,
+        # Resúmenes precalculados por DataGenerator, igual que los empleados
+        "depends_on": ["resenas.json"],
+        "sembrado_hasta": True
     }
 }
 
 
-def convert_float_to_decimal(obj):
-    """
-    Convierte float a Decimal recursivamente para compatibilidad con DynamoDB
-    """
-    if isinstance(obj, list):
-        return [convert_float_to_decimal(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_float_to_decimal(value) for key, value in obj.items()}
-    elif isinstance(obj, float):
-        return Decimal(str(obj))
-    else:
-        return obj
-
-
 def get_table_keys(filename):
     """Obtiene las claves PK y SK para una tabla específica"""
     config = TABLE_MAPPING.get(filename)
@@ -140,17 +234,54 @@ def table_exists(table_name):
             raise
 
 
-def create_table(table_name, pk_name, sk_name=None):
-    """Crea una tabla en DynamoDB con las claves especificadas"""
+def build_gsi_definition(gsi):
+    """Construye la definición de un GSI (proyección completa, on-demand)"""
+    key_schema = [{'AttributeName': gsi['pk'], 'KeyType': 'HASH'}]
+    if gsi.get('sk'):
+        key_schema.append({'AttributeName': gsi['sk'], 'KeyType': 'RANGE'})
+    
+    return {
+        'IndexName': gsi['index_name'],
+        'KeySchema': key_schema,
+        'Projection': {'ProjectionType': 'ALL'}
+    }
+
+
+def build_attribute_definitions(keys):
+    """
+    Define cada atributo clave (sin duplicados)
+    keys: lista de (nombre, tipo); las claves son string salvo que se indique otro tipo
+    """
+    definitions = {}
+    for name, attribute_type in keys:
+        if name:
+            definitions.setdefault(name, attribute_type or 'S')
+    return [
+        {'AttributeName': name, 'AttributeType': attribute_type}
+        for name, attribute_type in definitions.items()
+    ]
+
+
+def gsi_keys(gsi):
+    """Retorna las claves de un GSI como (nombre, tipo)"""
+    return [(gsi['pk'], gsi.get('pk_type')), (gsi.get('sk'), gsi.get('sk_type'))]
+
+
+def create_table(table_name, pk_name, sk_name=None, gsis=None, sk_type='S', stream_view_type=None):
+    """Crea una tabla en DynamoDB con las claves e índices especificados"""
     print(f"   📋 Tabla '{table_name}' no existe. Creándola...")
+    gsis = gsis or []
     
     # Configuración de claves
     key_schema = [{'AttributeName': pk_name, 'KeyType': 'HASH'}]
-    attribute_definitions = [{'AttributeName': pk_name, 'AttributeType': 'S'}]
     
     if sk_name:
         key_schema.append({'AttributeName': sk_name, 'KeyType': 'RANGE'})
-        attribute_definitions.append({'AttributeName': sk_name, 'AttributeType': 'S'})
+    
+    keys = [(pk_name, 'S'), (sk_name, sk_type)]
+    for gsi in gsis:
+        keys.extend(gsi_keys(gsi))
+    attribute_definitions = build_attribute_definitions(keys)
     
     try:
         table_config = {
@@ -160,10 +291,19 @@ def create_table(table_name, pk_name, sk_name=None):
             'BillingMode': 'PAY_PER_REQUEST'  # On-demand pricing (sin necesidad de configurar capacidad)
         }
         
-        table = dynamodb.create_table(**table_config)
+        if gsis:
+            table_config['GlobalSecondaryIndexes'] = [build_gsi_definition(gsi) for gsi in gsis]
+        
+        if stream_view_type:
+            table_config['StreamSpecification'] = {
+                'StreamEnabled': True,
+                'StreamViewType': stream_view_type
+            }
+        
+        dynamodb_client.create_table(**table_config)
         
         print(f"   ⏳ Esperando a que la tabla '{table_name}' esté activa...")
-        table.wait_until_exists()
+        dynamodb_client.get_waiter('table_exists').wait(TableName=table_name)
         
         print(f"   ✅ Tabla '{table_name}' creada exitosamente")
         return True
@@ -173,57 +313,318 @@ def create_table(table_name, pk_name, sk_name=None):
         return False
 
 
-def load_json_file(filename):
+def ensure_gsis(table_name, gsis):
     """
-    Carga un archivo JSON y retorna su contenido
+    Agrega a una tabla existente los GSIs que le falten.
+    DynamoDB solo permite crear un índice por llamada a update_table.
     """
-    filepath = os.path.join(DATA_DIR, filename)
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # Convertir floats a Decimal
-            return convert_float_to_decimal(data)
-    except FileNotFoundError:
-        print(f"⚠️  Archivo no encontrado: {filepath}")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"⚠️  Error al decodificar JSON en {filename}: {e}")
-        return None
-
-
-def delete_all_items_from_table(table_name, pk_name, sk_name=None):
-    """Elimina todos los items de una tabla de DynamoDB"""
+    if not gsis:
+        return True
+    
     try:
-        table = dynamodb.Table(table_name)
+        description = dynamodb_client.describe_table(TableName=table_name)['Table']
+        existing = {index['IndexName'] for index in description.get('GlobalSecondaryIndexes', [])}
         
-        print(f"   🗑️  Escaneando items en '{table_name}'...")
+        for gsi in gsis:
+            if gsi['index_name'] in existing:
+                continue
+            
+            print(f"   🔧 Creando índice '{gsi['index_name']}' en '{table_name}'...")
+            dynamodb_client.update_table(
+                TableName=table_name,
+                AttributeDefinitions=build_attribute_definitions(gsi_keys(gsi)),
+                GlobalSecondaryIndexUpdates=[{'Create': build_gsi_definition(gsi)}]
+            )
+            dynamodb_client.get_waiter('table_exists').wait(TableName=table_name)
+            print(f"   ✅ Índice '{gsi['index_name']}' creado (el backfill continúa en segundo plano)")
         
-        # Escanear todos los items
-        response = table.scan()
-        items = response.get('Items', [])
+        return True
         
-        # Manejar paginación
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
+    except ClientError as e:
+        print(f"   ❌ Error al crear índices en '{table_name}': {e.response['Error']['Message']}")
+        return False
+
+
+def ensure_stream(table_name, stream_view_type):
+    """Habilita el stream de una tabla existente si aún no lo tiene"""
+    if not stream_view_type:
+        return True
+    
+    try:
+        description = dynamodb_client.describe_table(TableName=table_name)['Table']
+        stream = description.get('StreamSpecification') or {}
         
-        if not items:
-            print(f"   ℹ️  La tabla '{table_name}' ya está vacía")
+        if stream.get('StreamEnabled'):
+            if stream.get('StreamViewType') != stream_view_type:
+                print(f"   ⚠️  El stream de '{table_name}' es {stream.get('StreamViewType')}, se esperaba {stream_view_type}")
             return True
         
-        print(f"   🗑️  Eliminando {len(items)} items de '{table_name}'...")
-        
-        # Eliminar en lotes
-        with table.batch_writer() as batch:
-            for item in items:
-                key = {pk_name: item[pk_name]}
-                if sk_name:
-                    key[sk_name] = item[sk_name]
-                batch.delete_item(Key=key)
-        
-        print(f"   ✅ {len(items)} items eliminados de '{table_name}'")
+        print(f"   🔧 Habilitando stream {stream_view_type} en '{table_name}'...")
+        dynamodb_client.update_table(
+            TableName=table_name,
+            StreamSpecification={'StreamEnabled': True, 'StreamViewType': stream_view_type}
+        )
+        dynamodb_client.get_waiter('table_exists').wait(TableName=table_name)
+        print(f"   ✅ Stream habilitado")
         return True
         
+    except ClientError as e:
+        print(f"   ❌ Error al habilitar el stream de '{table_name}': {e.response['Error']['Message']}")
+        return False
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    Recorre un array JSON de un archivo elemento por elemento, leyendo por
+    bloques: la memoria depende del item más grande, no del archivo.
+    Los números con decimales se leen directo como Decimal (DynamoDB no acepta float)
+    """
+    decoder = json.JSONDecoder(parse_float=Decimal)
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def skip(chars):
+        nonlocal pos
+        while pos < len(buffer) and buffer[pos] in chars:
+            pos += 1
+
+    while True:
+        skip(' \t\r\n' + (',' if started else ''))
+
+        # Se necesita más texto para decidir (o el item quedó cortado)
+        if pos >= len(buffer) and not eof:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        if not started:
+            if pos >= len(buffer) or buffer[pos] != '[':
+                raise ValueError("El archivo debe contener un array JSON")
+            started = True
+            pos += 1
+            continue
+
+        if pos >= len(buffer):
+            raise ValueError("Array JSON incompleto")
+        if buffer[pos] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            item, end = None, len(buffer)
+
+        # Un item que termina justo en el borde del bloque puede estar incompleto
+        if end >= len(buffer) and not eof:
+            chunk = f.read(max(chunk_size, len(buffer)))
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        pos = end
+        yield item
+
+
+def iter_ndjson(f):
+    """Un item JSON por línea (las líneas vacías se ignoran)"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line, parse_float=Decimal)
+
+
+def iter_json_items(filepath):
+    """Items de un archivo .json (array) o .ndjson, sin cargarlo completo"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        if filepath.endswith('.ndjson'):
+            yield from iter_ndjson(f)
+        else:
+            yield from iter_json_array(f)
+
+
+def iter_files_items(filepaths):
+    """Items de varios archivos, uno después de otro"""
+    for filepath in filepaths:
+        yield from iter_json_items(filepath)
+
+
+def open_data_file(filename):
+    """
+    Retorna un iterador perezoso sobre los items del archivo de datos
+    (o None si no existe). Se prefieren, en orden: las partes NDJSON del
+    modo paralelo de DataGenerator (<tabla>-part-NNNNN.ndjson), una versión
+    NDJSON del archivo y el archivo JSON
+    """
+    filepath = os.path.join(DATA_DIR, filename)
+    base_path = os.path.splitext(filepath)[0]
+
+    parts = sorted(glob.glob(f"{base_path}-part-*.ndjson"))
+    if parts:
+        return iter_files_items(parts)
+
+    for path in (base_path + '.ndjson', filepath):
+        if os.path.exists(path):
+            return iter_json_items(path)
+
+    print(f"⚠️  Archivo no encontrado: {filepath}")
+    return None
+
+
+def iter_batches(items, batch_size=BATCH_SIZE):
+    """Agrupa un iterador de items en lotes de batch_size (máximo de DynamoDB: 25)"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def table_spec_from_description(description):
+    """
+    Parámetros de create_table equivalentes a una tabla existente: claves,
+    índices, modo de facturación, stream, cifrado y clase de tabla
+    """
+    spec = {
+        'TableName': description['TableName'],
+        'KeySchema': description['KeySchema'],
+        'AttributeDefinitions': description['AttributeDefinitions']
+    }
+
+    billing_mode = (description.get('BillingModeSummary') or {}).get('BillingMode', 'PROVISIONED')
+    spec['BillingMode'] = billing_mode
+
+    def throughput(source):
+        return {
+            'ReadCapacityUnits': source['ProvisionedThroughput']['ReadCapacityUnits'],
+            'WriteCapacityUnits': source['ProvisionedThroughput']['WriteCapacityUnits']
+        }
+
+    if billing_mode == 'PROVISIONED':
+        spec['ProvisionedThroughput'] = throughput(description)
+
+    if description.get('GlobalSecondaryIndexes'):
+        spec['GlobalSecondaryIndexes'] = []
+        for index in description['GlobalSecondaryIndexes']:
+            gsi = {
+                'IndexName': index['IndexName'],
+                'KeySchema': index['KeySchema'],
+                'Projection': index['Projection']
+            }
+            if billing_mode == 'PROVISIONED':
+                gsi['ProvisionedThroughput'] = throughput(index)
+            spec['GlobalSecondaryIndexes'].append(gsi)
+
+    if description.get('LocalSecondaryIndexes'):
+        spec['LocalSecondaryIndexes'] = [
+            {'IndexName': index['IndexName'], 'KeySchema': index['KeySchema'], 'Projection': index['Projection']}
+            for index in description['LocalSecondaryIndexes']
+        ]
+
+    stream = description.get('StreamSpecification') or {}
+    if stream.get('StreamEnabled'):
+        spec['StreamSpecification'] = {'StreamEnabled': True, 'StreamViewType': stream['StreamViewType']}
+
+    sse = description.get('SSEDescription') or {}
+    if sse.get('SSEType') == 'KMS':
+        spec['SSESpecification'] = {'Enabled': True, 'SSEType': 'KMS'}
+        if sse.get('KMSMasterKeyArn'):
+            spec['SSESpecification']['KMSMasterKeyId'] = sse['KMSMasterKeyArn']
+
+    table_class = (description.get('TableClassSummary') or {}).get('TableClass')
+    if table_class:
+        spec['TableClass'] = table_class
+
+    return spec
+
+
+def recreate_table(table_name):
+    """
+    Vacía una tabla eliminándola y volviéndola a crear con la misma definición.
+    Returns: bool - False si la tabla no se puede eliminar (se usa el borrado por scan)
+    """
+    description = dynamodb_client.describe_table(TableName=table_name)['Table']
+
+    if description.get('DeletionProtectionEnabled'):
+        print(f"   ℹ️  '{table_name}' tiene protección contra borrado")
+        return False
+
+    # Los consumidores del stream apuntan a su ARN, que cambia al recrear la tabla
+    stream = description.get('StreamSpecification') or {}
+    if stream.get('StreamEnabled') and not RESET_STREAM_TABLES:
+        print(f"   ℹ️  '{table_name}' tiene stream (su ARN cambiaría al recrearla)")
+        return False
+
+    spec = table_spec_from_description(description)
+
+    try:
+        dynamodb_client.delete_table(TableName=table_name)
+    except ClientError as e:
+        print(f"   ℹ️  No se pudo eliminar '{table_name}': {e.response['Error']['Message']}")
+        return False
+
+    print(f"   ⏳ Recreando '{table_name}'...")
+    dynamodb_client.get_waiter('table_not_exists').wait(TableName=table_name)
+    dynamodb_client.create_table(**spec)
+    dynamodb_client.get_waiter('table_exists').wait(TableName=table_name)
+
+    if 'StreamSpecification' in spec:
+        new_arn = dynamodb_client.describe_table(TableName=table_name)['Table'].get('LatestStreamArn')
+        print(f"   ⚠️  Nuevo stream de '{table_name}': {new_arn} (actualizar el ARN y volver a desplegar sus consumidores)")
+
+    print(f"   ✅ Tabla '{table_name}' recreada vacía")
+    return True
+
+
+def delete_all_items_from_table(table_name, pk_name, sk_name=None):
+    """
+    Elimina todos los items con un scan paralelo por segmentos que solo lee
+    las claves; cada página se borra al leerla, sin juntar los items en memoria
+    """
+    key_names = [pk_name] + ([sk_name] if sk_name else [])
+    names = {f"#k{i}": name for i, name in enumerate(key_names)}
+    stats = WriteStats(table_name)
+    stats.start()
+    controller = AIMDController()
+
+    def delete_segment(segment):
+        scan_kwargs = {
+            'TableName': table_name,
+            'ProjectionExpression': ", ".join(names),
+            'ExpressionAttributeNames': names,
+            'Segment': segment,
+            'TotalSegments': RESET_SCAN_SEGMENTS
+        }
+        while True:
+            response = dynamodb_client.scan(**scan_kwargs)
+            keys = response.get('Items', [])
+            for i in range(0, len(keys), BATCH_SIZE):
+                requests = [{'DeleteRequest': {'Key': key}} for key in keys[i:i + BATCH_SIZE]]
+                write_requests(table_name, requests, controller, stats)
+
+            if 'LastEvaluatedKey' not in response:
+                return
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    try:
+        print(f"   🗑️  Eliminando items de '{table_name}' ({RESET_SCAN_SEGMENTS} segmentos)...")
+        with ThreadPoolExecutor(max_workers=RESET_SCAN_SEGMENTS) as executor:
+            list(executor.map(delete_segment, range(RESET_SCAN_SEGMENTS)))
+
+        stats.finish()
+        stats.peak_concurrency = controller.peak
+        print(f"   ✅ Eliminados: {stats.summary()}")
+        return stats.errors == 0
+
     except ClientError as e:
         error_code = e.response['Error']['Code']
         if error_code == 'ResourceNotFoundException':
@@ -237,102 +638,288 @@ def delete_all_items_from_table(table_name, pk_name, sk_name=None):
         return False
 
 
-def batch_write_items(table, items, table_name):
-    """Escribe items en lotes a DynamoDB con procesamiento paralelo y retry"""
-    success_count = 0
-    error_count = 0
-    total_items = len(items)
-    
-    # Tamaño del lote (máximo 25 en DynamoDB)
-    batch_size = 25
-    
-    # Lock para actualizar contadores de forma segura entre threads
-    count_lock = Lock()
+def reset_table(table_name, pk_name, sk_name=None):
+    """
+    Deja la tabla vacía: primero intenta recrearla (no consume capacidad de
+    lectura ni escritura); si no se puede, borra sus items con un scan paralelo
+    """
+    try:
+        if recreate_table(table_name):
+            return True
+    except (ClientError, BotoCoreError) as e:
+        print(f"   ⚠️  No se pudo recrear '{table_name}': {e}")
+        # Si la tabla ya se eliminó, no hay nada que borrar: la recreación es obligatoria
+        if not table_exists(table_name):
+            return False
+
+    return delete_all_items_from_table(table_name, pk_name, sk_name)
+
+
+class AIMDController:
+    """
+    Limita cuántos BatchWriteItem hay en vuelo. Suma uno al límite por cada
+    `limit` llamadas sin throttling y lo reduce a la mitad cuando aparece
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.peak = self.limit
+        self._active = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self, throttled):
+        with self._condition:
+            self._active -= 1
+            now = time.monotonic()
+
+            if throttled:
+                self._successes = 0
+                if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self._last_decrease = now
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.peak = max(self.peak, self.limit)
+                    self._successes = 0
+
+            self._condition.notify_all()
+
+
+class WriteStats:
+    """Contadores de escritura de una tabla (compartidos entre hilos)"""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.written = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled_calls = 0
+        self.wcu = 0.0
+        self.peak_concurrency = 0
+        self.concurrency = 0
+        self.status = "en espera"
+        self.start_time = time.monotonic()
+        self.end_time = None
+        self._lock = Lock()
+
+    def start(self):
+        self.status = "cargando"
+        self.start_time = time.monotonic()
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def finish(self):
+        self.end_time = time.monotonic()
+        self.status = "con errores" if self.errors else "ok"
+
+    @property
+    def elapsed(self):
+        return (self.end_time or time.monotonic()) - self.start_time
+
+    @property
+    def items_per_second(self):
+        return self.written / max(self.elapsed, 1e-6)
+
+    def summary(self):
+        return (f"{self.written} items en {self.elapsed:.1f}s ({self.items_per_second:.0f} items/s), "
+                f"reintentos: {self.retries}, throttling: {self.throttled_calls}, "
+                f"WCU: {self.wcu:.0f}, concurrencia máx.: {self.peak_concurrency}, errores: {self.errors}")
+
+
+def serialize_item(item):
+    """Item de Python -> formato del cliente de bajo nivel ({'S': ...}, {'N': ...})"""
+    return {key: serializer.serialize(value) for key, value in item.items()}
+
+
+def consumed_wcu(response):
+    return sum(capacity.get('CapacityUnits', 0) for capacity in response.get('ConsumedCapacity', []))
+
+
+def backoff(attempt):
+    """Backoff exponencial con jitter completo"""
+    time.sleep(random_module.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))))
+
+
+def report_error(stats, message):
+    """Muestra solo los primeros errores de cada tabla"""
+    if stats.errors <= 3:
+        print(f"      ⚠️  {stats.table_name}: {message[:200]}")
+
+
+def write_one_by_one(table_name, requests, stats):
+    """
+    DynamoDB rechaza el lote completo si un item es inválido (o si hay claves
+    repetidas en el lote): se escriben uno por uno para aislar los errores
+    """
+    for request in requests:
+        try:
+            with write_slots:
+                if 'PutRequest' in request:
+                    response = writer_client.put_item(
+                        TableName=table_name,
+                        Item=request['PutRequest']['Item'],
+                        ReturnConsumedCapacity='TOTAL'
+                    )
+                else:
+                    response = writer_client.delete_item(
+                        TableName=table_name,
+                        Key=request['DeleteRequest']['Key'],
+                        ReturnConsumedCapacity='TOTAL'
+                    )
+            stats.add(written=1, wcu=response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+        except (ClientError, BotoCoreError) as e:
+            stats.add(errors=1)
+            report_error(stats, str(e))
+
+
+def write_batch(table_name, batch, controller, stats):
+    """Escribe un lote de items (PutRequest) con write_requests"""
+    requests = []
+    for item in batch:
+        try:
+            requests.append({'PutRequest': {'Item': serialize_item(item)}})
+        except (TypeError, ValueError) as e:
+            stats.add(errors=1)
+            report_error(stats, f"Item inválido: {e}")
+
+    write_requests(table_name, requests, controller, stats)
+
+
+def write_requests(table_name, requests, controller, stats):
+    """
+    Envía hasta 25 PutRequest/DeleteRequest con BatchWriteItem y reintenta
+    solo los UnprocessedItems (o todo si la llamada entera fue rechazada por throttling)
+    """
+    attempt = 0
+    while requests:
+        controller.acquire()
+        try:
+            with write_slots:
+                response = writer_client.batch_write_item(
+                    RequestItems={table_name: requests},
+                    ReturnConsumedCapacity='TOTAL'
+                )
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            controller.release(throttled=code in THROTTLING_ERRORS)
+            if code == 'ValidationException':
+                write_one_by_one(table_name, requests, stats)
+                return
+            if code not in TRANSIENT_ERRORS:
+                stats.add(errors=len(requests))
+                report_error(stats, f"{code}: {e.response['Error']['Message']}")
+                return
+            stats.add(throttled_calls=1 if code in THROTTLING_ERRORS else 0)
+            unprocessed = requests
+        except BotoCoreError:
+            # Errores de red: se reintentan igual que los transitorios
+            controller.release(throttled=False)
+            unprocessed = requests
+        else:
+            unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+            controller.release(throttled=bool(unprocessed))
+            stats.add(
+                written=len(requests) - len(unprocessed),
+                wcu=consumed_wcu(response),
+                throttled_calls=1 if unprocessed else 0
+            )
+
+        if not unprocessed:
+            return
+
+        attempt += 1
+        if attempt >= MAX_BATCH_ATTEMPTS:
+            stats.add(errors=len(unprocessed))
+            report_error(stats, f"{len(unprocessed)} items sin procesar tras {attempt} intentos")
+            return
+
+        stats.add(retries=len(unprocessed))
+        requests = unprocessed
+        backoff(attempt)
+
+
+def batch_write_items(table_name, items, stats=None, show_progress=True):
+    """
+    Escribe items en DynamoDB con BatchWriteItem en paralelo.
+    `items` puede ser cualquier iterador (p. ej. open_data_file): un hilo lector
+    arma lotes de 25 y los deja en una cola acotada que consumen los escritores,
+    así las escrituras empiezan de inmediato y la memoria no depende del archivo.
+    La cantidad de escrituras en vuelo la regula un AIMDController (por tabla)
+    dentro del presupuesto global write_slots.
+    Returns: WriteStats
+    """
+    stats = stats or WriteStats(table_name)
+    stats.start()
+    controller = AIMDController()
+    batches = Queue(maxsize=MAX_QUEUED_BATCHES)
+    end_of_data = object()
+    reader_error = []
+    progress = {'next': 500}
+    progress_lock = Lock()
     
-    # Dividir items en lotes
-    batches = [items[i:i + batch_size] for i in range(0, total_items, batch_size)]
+    def reader():
+        """Lee el archivo y encola los lotes (bloquea si los escritores van atrás)"""
+        try:
+            for batch in iter_batches(items):
+                batches.put(batch)
+        except Exception as e:
+            reader_error.append(e)
+        finally:
+            for _ in range(MAX_CONCURRENCY):
+                batches.put(end_of_data)
     
-    def process_batch_with_retry(batch, max_retries=5):
-        """Procesa un lote de items con retry y backoff exponencial"""
-        local_success = 0
-        local_errors = 0
-        
-        for attempt in range(max_retries):
+    def writer():
+        while True:
+            batch = batches.get()
+            if batch is end_of_data:
+                return
+            
             try:
-                with table.batch_writer() as batch_writer:
-                    for item in batch:
-                        try:
-                            batch_writer.put_item(Item=item)
-                            local_success += 1
-                        except ClientError as e:
-                            if e.response['Error']['Code'] == 'ProvisionedThroughputExceededException':
-                                # No contar como error aún, se reintentará
-                                raise
-                            else:
-                                local_errors += 1
-                                if local_errors <= 3:  # Mostrar más detalles
-                                    error_msg = e.response['Error']['Message']
-                                    print(f"      ⚠️  Error ValidationException: {error_msg}")
-                                    # Imprimir el item problemático (solo claves)
-                                    if 'local_id' in item and 'resena_id' in item:
-                                        print(f"         Item: local_id={item['local_id']}, resena_id={item['resena_id']}")
-                        except Exception as e:
-                            local_errors += 1
-                            if local_errors <= 3:
-                                print(f"      ⚠️  Error inesperado: {str(e)[:100]}")
-                
-                # Si llegamos aquí, el batch fue exitoso
-                return local_success, local_errors
-                
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                
-                if error_code == 'ProvisionedThroughputExceededException':
-                    if attempt < max_retries - 1:
-                        # Backoff exponencial con jitter
-                        wait_time = (2 ** attempt) + random_module.uniform(0, 1)
-                        time.sleep(wait_time)
-                        # Resetear contadores para reintentar
-                        local_success = 0
-                        local_errors = 0
-                        continue
-                else:
-                    # Otro tipo de error
-                    local_errors += len(batch)
-                    return 0, local_errors
-        
-        # Si se agotaron los reintentos
-        return local_success, local_errors
-    
-    try:
-        # Usar ThreadPoolExecutor para procesamiento paralelo
-        num_threads = min(10, len(batches))
-        
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = {executor.submit(process_batch_with_retry, batch): batch for batch in batches}
+                write_batch(table_name, batch, controller, stats)
+            except Exception as e:
+                stats.add(errors=len(batch))
+                report_error(stats, f"Error en lote: {e}")
             
-            for future in as_completed(futures):
-                try:
-                    local_success, local_errors = future.result()
-                    with count_lock:
-                        success_count += local_success
-                        error_count += local_errors
-                        
-                        # Mostrar progreso cada 5% o cada 500 items
-                        if (success_count % 500 == 0) or (success_count + error_count >= total_items):
-                            porcentaje = ((success_count + error_count) / total_items) * 100
-                            print(f"      📊 Progreso: {success_count}/{total_items} ({porcentaje:.1f}%) - Errores: {error_count}")
-                
-                except Exception as e:
-                    with count_lock:
-                        error_count += len(futures[future])
-                    print(f"      ⚠️  Error en lote: {str(e)[:80]}")
-        
-    except Exception as e:
-        print(f"   ❌ Error en procesamiento paralelo: {str(e)}")
-        return success_count, total_items - success_count
+            stats.concurrency = controller.limit
+            if not show_progress:
+                continue
+            
+            # Mostrar progreso cada 500 items
+            with progress_lock:
+                if stats.written + stats.errors >= progress['next']:
+                    progress['next'] = (stats.written + stats.errors) // 500 * 500 + 500
+                    print(f"      📊 Progreso: {stats.written} items ({stats.items_per_second:.0f} items/s, "
+                          f"concurrencia: {controller.limit}) - Errores: {stats.errors}")
+    
+    threads = [Thread(target=reader, daemon=True)]
+    threads += [Thread(target=writer, daemon=True) for _ in range(MAX_CONCURRENCY)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    if reader_error:
+        print(f"   ❌ Error al leer los datos de '{table_name}': {reader_error[0]}")
+        stats.add(errors=1)
     
-    return success_count, error_count
+    stats.finish()
+    stats.peak_concurrency = controller.peak
+    return stats
 
 
 def ask_user_action_global():
@@ -367,80 +954,194 @@ def ask_user_action_global():
             print("   ⚠️  Opción inválida. Por favor selecciona 1 o 2")
 
 
-def populate_table(dynamodb, filename, table_config, global_action=None):
-    """Puebla una tabla de DynamoDB con datos de un archivo JSON"""
+def prepare_table(filename, table_config, global_action=None):
+    """
+    Deja la tabla lista para cargar: la crea (y espera a que esté activa) o
+    completa sus índices y stream, y la limpia si la acción es "replace"
+    """
     table_name = table_config["table_name"]
     pk_name = table_config["pk"]
     sk_name = table_config["sk"]
     
-    print(f"\n📤 Poblando tabla: {table_name}")
+    print(f"\n📤 Preparando tabla: {table_name}")
     print(f"   Archivo: {filename}")
     print(f"   Claves: PK={pk_name}" + (f", SK={sk_name}" if sk_name else ""))
     
     # Verificar si la tabla existe, si no, crearla
     if not table_exists(table_name):
-        if not create_table(table_name, pk_name, sk_name):
+        if not create_table(
+            table_name, pk_name, sk_name,
+            table_config.get("gsis"),
+            table_config.get("sk_type", "S"),
+            table_config.get("stream")
+        ):
             print(f"   ❌ No se pudo crear la tabla '{table_name}'. Saltando...")
             return False
         time.sleep(2)
-    else:
-        print(f"   ✅ Tabla '{table_name}' existe")
-        
-        # Si hay una acción global definida y es "replace", limpiar la tabla
-        if global_action == "replace":
-            # Verificar si la tabla tiene datos antes de limpiar
-            try:
-                table = dynamodb.Table(table_name)
-                response = table.scan(Limit=1)
-                
-                if response.get('Count', 0) > 0:
-                    print(f"   🗑️  Limpiando datos existentes de '{table_name}'...")
-                    if not delete_all_items_from_table(table_name, pk_name, sk_name):
-                        print(f"   ❌ Error al limpiar la tabla. Saltando...")
-                        return False
-                else:
-                    print(f"   ℹ️  La tabla '{table_name}' está vacía")
-            except Exception as e:
-                print(f"   ⚠️  No se pudo verificar contenido de la tabla: {e}")
-        elif global_action == "append":
-            print(f"   ℹ️  Agregando datos a la tabla existente")
+        return True
     
-    # Cargar datos del archivo
-    items = load_json_file(filename)
+    print(f"   ✅ Tabla '{table_name}' existe")
+    ensure_gsis(table_name, table_config.get("gsis"))
+    ensure_stream(table_name, table_config.get("stream"))
     
-    if items is None:
-        return False
+    # Si hay una acción global definida y es "replace", limpiar la tabla
+    if global_action == "replace":
+        # Verificar si la tabla tiene datos antes de limpiar
+        try:
+            response = dynamodb_client.scan(TableName=table_name, Limit=1, Select='COUNT')
+            
+            if response.get('Count', 0) > 0:
+                print(f"   🗑️  Limpiando datos existentes de '{table_name}'...")
+                if not reset_table(table_name, pk_name, sk_name):
+                    print(f"   ❌ Error al limpiar la tabla. Saltando...")
+                    return False
+            else:
+                print(f"   ℹ️  La tabla '{table_name}' está vacía")
+        except Exception as e:
+            print(f"   ⚠️  No se pudo verificar contenido de la tabla: {e}")
+    elif global_action == "append":
+        print(f"   ℹ️  Agregando datos a la tabla existente ('{table_name}')")
     
-    if not isinstance(items, list):
-        print(f"   ❌ El archivo debe contener un array JSON")
-        return False
+    return True
+
+
+def dynamodb_server_time():
+    """
+    Hora actual de DynamoDB en segundos epoch, tomada de la cabecera Date de
+    una respuesta: se compara con el ApproximateCreationDateTime del stream,
+    así que no depende del reloj de esta máquina
+    """
+    response = dynamodb_client.list_tables(Limit=1)
+    return int(parsedate_to_datetime(response['ResponseMetadata']['HTTPHeaders']['date']).timestamp())
+
+
+def load_table(filename, table_config, stats, show_progress=True):
+    """
+    Carga el archivo de datos en una tabla ya preparada.
+
+    Con "sembrado_hasta" los items ya incluyen el aporte de las reseñas
+    cargadas, y los consumidores del stream descartan los registros creados
+    hasta ese instante: los INSERT de esta carga (ya sumados) y los REMOVE
+    del reset de la tabla de reseñas (no deben restarse de los valores nuevos).
+    Se toma después de cargar las reseñas (depends_on), y cualquier escritura
+    del consumidor sobre los items anteriores queda reemplazada por esta carga.
+    La recarga debe hacerse sin tráfico de reseñas: lo que llegue mientras
+    tanto no se cuenta.
+    """
+    table_name = table_config["table_name"]
     
-    if len(items) == 0:
-        print(f"   ⚠️  El archivo está vacío, no hay datos para insertar")
-        return True
+    # Abrir el archivo de datos (se lee de forma incremental al escribir)
+    items = open_data_file(filename)
+    
+    if items is None:
+        stats.status = "sin archivo"
+        return False
     
-    print(f"   📊 Total de items a insertar: {len(items)}")
+    if table_config.get("sembrado_hasta"):
+        sembrado_hasta = dynamodb_server_time()
+        print(f"   ℹ️  {table_name}: sembrado_hasta = {sembrado_hasta} (hora de DynamoDB)")
+        items = (dict(item, sembrado_hasta=sembrado_hasta) for item in items)
     
     try:
-        table = dynamodb.Table(table_name)
-        success_count, error_count = batch_write_items(table, items, table_name)
+        batch_write_items(table_name, items, stats, show_progress)
         
-        print(f"   ✅ Insertados exitosamente: {success_count} items")
-        if error_count > 0:
-            print(f"   ⚠️  Errores: {error_count} items")
+        if stats.written == 0 and stats.errors == 0:
+            print(f"   ⚠️  {filename} está vacío, no hay datos para insertar")
+            return True
         
-        return error_count == 0
+        return stats.errors == 0
         
     except ClientError as e:
         error_code = e.response['Error']['Code']
         error_msg = e.response['Error']['Message']
-        print(f"   ❌ Error de AWS: {error_code} - {error_msg}")
+        print(f"   ❌ Error de AWS en '{table_name}': {error_code} - {error_msg}")
+        stats.status = "con errores"
         return False
     except Exception as e:
-        print(f"   ❌ Error inesperado: {str(e)}")
+        print(f"   ❌ Error inesperado en '{table_name}': {str(e)}")
+        stats.status = "con errores"
         return False
 
 
+def print_progress(all_stats, elapsed):
+    """Vista consolidada del progreso de todas las tablas"""
+    total = sum(stats.written for stats in all_stats.values())
+    print(f"\n   📊 [{elapsed:6.1f}s] {total} items escritos")
+    for filename, stats in all_stats.items():
+        line = f"      {filename:<22} {stats.status:<12} {stats.written:>9} items"
+        if stats.status == "cargando":
+            line += f"  {stats.items_per_second:8.0f} items/s  concurrencia: {stats.concurrency}"
+        if stats.errors:
+            line += f"  errores: {stats.errors}"
+        print(line)
+
+
+def populate_all_tables(global_action=None):
+    """
+    Fase 1: prepara todas las tablas en paralelo (las creaciones y sus
+    esperas a ACTIVE corren juntas).
+    Fase 2: carga todas las tablas en paralelo dentro del presupuesto global
+    de escrituras; una tabla con "depends_on" espera a que terminen esas cargas.
+    Returns: dict - archivo -> éxito
+    """
+    configs = {filename: config for filename, config in TABLE_MAPPING.items() if config["table_name"]}
+    if not configs:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=len(configs)) as executor:
+        prepared = dict(zip(
+            configs,
+            executor.map(lambda filename: prepare_table(filename, configs[filename], global_action), configs)
+        ))
+    
+    results = {filename: False for filename, ok in prepared.items() if not ok}
+    all_stats = {
+        filename: WriteStats(config["table_name"])
+        for filename, config in configs.items() if prepared[filename]
+    }
+    finished = {filename: Event() for filename in configs}
+    for filename in results:
+        finished[filename].set()
+    
+    def load(filename):
+        try:
+            for dependency in configs[filename].get("depends_on", []):
+                if dependency in finished:
+                    finished[dependency].wait()
+            results[filename] = load_table(filename, configs[filename], all_stats[filename], show_progress=False)
+        finally:
+            finished[filename].set()
+    
+    print("\n" + "=" * 60)
+    print("📊 CARGANDO DATOS")
+    print("=" * 60)
+    
+    start_time = time.monotonic()
+    stop_progress = Event()
+    
+    def report():
+        while not stop_progress.wait(PROGRESS_INTERVAL_SECONDS):
+            print_progress(all_stats, time.monotonic() - start_time)
+    
+    reporter = Thread(target=report, daemon=True)
+    reporter.start()
+    try:
+        if all_stats:
+            with ThreadPoolExecutor(max_workers=len(all_stats)) as executor:
+                list(executor.map(load, all_stats))
+    finally:
+        stop_progress.set()
+        reporter.join()
+    
+    print_progress(all_stats, time.monotonic() - start_time)
+    print()
+    for filename, stats in all_stats.items():
+        detail = stats.summary() if stats.status != "sin archivo" else f"{filename} no encontrado"
+        print(f"   {'✅' if results.get(filename) else '❌'} {stats.table_name}: {detail}")
+    
+    return results
+
+
 def verify_credentials():
     """
     Verifica que las credenciales de AWS estén disponibles
@@ -522,11 +1223,7 @@ def main():
     print("📊 INICIANDO POBLACIÓN DE TABLAS")
     print("=" * 60)
 
-    results = {}
-    for filename, config in TABLE_MAPPING.items():
-        if config["table_name"]:
-            success = populate_table(dynamodb, filename, config, global_action)
-            results[filename] = success
+    results = populate_all_tables(global_action)
 
     # Resumen final
     print("\n" + "=" * 60)
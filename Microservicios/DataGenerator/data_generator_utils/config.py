@@ -35,6 +35,13 @@ class Config:
     PORCENTAJE_PRODUCTOS_PICANTES = 0.3
     PORCENTAJE_PEDIDOS_CON_RESENA = 0.5  # 50% de pedidos completados tendrán reseña
     
+    # Generación paralela (DataGenerator.py --pedidos N): pedidos por shard
+    PEDIDOS_POR_SHARD = 50000
+    
+    # Fecha "actual" de los datos generados (None = datetime.now()).
+    # Con una fecha fija y una semilla la salida es reproducible
+    FECHA_REFERENCIA = None
+    
     # Rangos de precios
     PRECIO_MIN_PRODUCTO = 10.0
     PRECIO_MAX_PRODUCTO = 50.0
@@ -69,10 +69,17 @@ class EmpleadosGenerator:
             "dni": dni,
             "nombre": nombre,
             "apellido": apellido,
+            # Calificación con la que aparece en el historial de los pedidos;
+            # ResenasGenerator.aplicar_calificaciones la reemplaza por el
+            # promedio de sus reseñas junto con los acumuladores
             "calificacion_prom": round(random.uniform(3.5, 5.0), 2),
+            "suma_calificaciones": 0,
+            "num_resenas": 0,
             "sueldo": round(random.uniform(1200, 3000), 2),
             "role": role,
-            "ocupado": False
+            "ocupado": False,
+            # Clave del índice de empleados disponibles (solo mientras está libre)
+            "disponible_rol": f"{local_id}#{role}"
         }
     
     @classmethod
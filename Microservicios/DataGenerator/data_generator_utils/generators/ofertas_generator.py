@@ -2,7 +2,7 @@
 Generador de Ofertas
 """
 import random
-from datetime import datetime, timedelta
+from datetime import timedelta
 from ..config import Config
 from ..helpers import Helpers
 
@@ -45,7 +45,7 @@ class OfertasGenerator:
     def _crear_oferta_producto(cls, local_id, producto_nombre):
         """Crea una oferta para un producto"""
         oferta_id = Helpers.generar_uuid()
-        fecha_inicio = datetime.now()
+        fecha_inicio = Helpers.ahora()
         fecha_limite = fecha_inicio + timedelta(days=random.randint(7, 30))
         
         return {
@@ -61,7 +61,7 @@ class OfertasGenerator:
     def _crear_oferta_combo(cls, local_id, combo_id):
         """Crea una oferta para un combo"""
         oferta_id = Helpers.generar_uuid()
-        fecha_inicio = datetime.now()
+        fecha_inicio = Helpers.ahora()
         fecha_limite = fecha_inicio + timedelta(days=random.randint(7, 30))
         
         return {
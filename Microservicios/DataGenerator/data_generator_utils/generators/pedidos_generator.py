@@ -2,7 +2,7 @@
 Generador de Pedidos con historial de estados
 """
 import random
-from datetime import datetime, timedelta
+from datetime import timedelta
 from ..config import Config
 from ..sample_data import SampleData
 from ..helpers import Helpers
@@ -27,7 +27,7 @@ class PedidosGenerator:
         pedidos = []
         
         # Filtrar solo usuarios con rol "Cliente" que tengan información bancaria
-        usuarios_validos = [u for u in usuarios if u.get("informacion_bancaria") and u.get("role") == "Cliente"]
+        usuarios_validos = cls.filtrar_usuarios_validos(usuarios)
         
         if not usuarios_validos:
             print("  ⚠️  No hay usuarios Cliente con información bancaria")
@@ -35,17 +35,11 @@ class PedidosGenerator:
         
         print(f"  ℹ️  Usuarios Cliente válidos para pedidos: {len(usuarios_validos)}")
         
-        # Crear diccionario de productos por nombre para búsqueda rápida
-        productos_dict = {p["nombre"]: p for p in productos}
-        
-        for i in range(Config.NUM_PEDIDOS):
-            local_id = random.choice(locales_ids)
-            usuario = random.choice(usuarios_validos)
-            
-            pedido = cls._crear_pedido_con_historial(
-                local_id, usuario, productos_dict, productos_por_local, empleados_por_local, combos_por_local
-            )
-            
+        pedidos_iter = cls.iterar_pedidos(
+            Config.NUM_PEDIDOS, locales_ids, usuarios_validos, productos,
+            productos_por_local, empleados_por_local, combos_por_local
+        )
+        for i, pedido in enumerate(pedidos_iter):
             pedidos.append(pedido)
             
             if (i + 1) % 1000 == 0:
@@ -57,6 +51,25 @@ class PedidosGenerator:
         
         return pedidos, pedidos_ids
     
+    @classmethod
+    def filtrar_usuarios_validos(cls, usuarios):
+        """Usuarios con rol "Cliente" e información bancaria (los que pueden pedir)"""
+        return [u for u in usuarios if u.get("informacion_bancaria") and u.get("role") == "Cliente"]
+    
+    @classmethod
+    def iterar_pedidos(cls, cantidad, locales_ids, usuarios_validos, productos, productos_por_local, empleados_por_local, combos_por_local):
+        """Genera `cantidad` pedidos de uno en uno, sin acumularlos en memoria"""
+        # Crear diccionario de productos por nombre para búsqueda rápida
+        productos_dict = {p["nombre"]: p for p in productos}
+        
+        for _ in range(cantidad):
+            local_id = random.choice(locales_ids)
+            usuario = random.choice(usuarios_validos)
+            
+            yield cls._crear_pedido_con_historial(
+                local_id, usuario, productos_dict, productos_por_local, empleados_por_local, combos_por_local
+            )
+    
     @classmethod
     def _crear_pedido_con_historial(cls, local_id, usuario, productos_dict, productos_por_local, empleados_por_local, combos_por_local):
         """Crea un pedido con historial de estados"""
@@ -135,7 +148,7 @@ class PedidosGenerator:
             k=1
         )[0]
         
-        fecha_base = datetime.now() - timedelta(hours=random.randint(0, 72))
+        fecha_base = Helpers.ahora() - timedelta(hours=random.randint(0, 72))
         
         # Calcular fecha de entrega aproximada
         total_items = len(productos_pedido) + len(combos_pedido)
@@ -160,6 +173,9 @@ class PedidosGenerator:
             "fecha_entrega_aproximada": fecha_entrega_aproximada,
             "direccion": direccion_pedido,
             "estado": estado_actual,
+            "created_at": fecha_base.isoformat(),
+            # Sort key del GSI de pedidos por estado
+            "estado_created_at": f"{estado_actual}#{fecha_base.isoformat()}",
             "historial_estados": historial_estados
         }
         
@@ -173,6 +189,45 @@ class PedidosGenerator:
         
         return pedido
     
+    @classmethod
+    def separar_eventos(cls, pedidos):
+        """
+        Convierte el historial en línea de cada pedido en eventos de la tabla
+        PedidoEventos y deja en el pedido solo el snapshot del estado actual
+        """
+        pedidos_snapshot = []
+        eventos = []
+        
+        for pedido in pedidos:
+            pedido = dict(pedido)
+            historial = pedido.pop("historial_estados", [])
+            empleados_asignados = {}
+            
+            for secuencia, entrada in enumerate(historial, start=1):
+                empleado = entrada.get("empleado")
+                if empleado:
+                    empleados_asignados[empleado["rol"]] = empleado["dni"]
+                
+                eventos.append({
+                    "pedido_key": f"{pedido['local_id']}#{pedido['pedido_id']}",
+                    "secuencia": secuencia,
+                    "local_id": pedido["local_id"],
+                    "pedido_id": pedido["pedido_id"],
+                    "tipo": "creacion" if secuencia == 1 else "transicion",
+                    "estado": entrada["estado"],
+                    "hora": entrada["hora_inicio"],
+                    "empleado": empleado
+                })
+            
+            ultima = historial[-1] if historial else {}
+            pedido["estado_desde"] = ultima.get("hora_inicio", pedido.get("created_at"))
+            pedido["empleado_actual"] = ultima.get("empleado") if ultima.get("activo") else None
+            pedido["empleados_asignados"] = empleados_asignados
+            pedido["version"] = len(historial)
+            pedidos_snapshot.append(pedido)
+        
+        return pedidos_snapshot, eventos
+    
     @classmethod
     def _calcular_fecha_entrega(cls, fecha_base, num_productos):
         """Calcula fecha de entrega aproximada basada en número de productos"""
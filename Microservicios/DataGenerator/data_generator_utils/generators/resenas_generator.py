@@ -30,7 +30,7 @@ class ResenasGenerator:
             if pedido["pedido_id"] in pedidos_resenados:
                 continue
                 
-            resena = cls._crear_resena(pedido)
+            resena = cls.crear_resena(pedido)
             if resena:
                 resenas.append(resena)
                 pedidos_resenados.add(pedido["pedido_id"])
@@ -40,7 +40,103 @@ class ResenasGenerator:
         return resenas
     
     @classmethod
-    def _crear_resena(cls, pedido):
+    def acumular_calificaciones(cls, empleados, resenas):
+        """
+        Completa suma_calificaciones / num_resenas / calificacion_prom de cada
+        empleado con las reseñas generadas, igual que lo haría
+        actualizarPromedioEmpleado
+        """
+        acumulados = {}
+        for resena in resenas:
+            cls.sumar_calificacion(acumulados, resena)
+        
+        cls.aplicar_calificaciones(empleados, acumulados)
+        print(f"  ✅ Calificaciones acumuladas para {len(acumulados)} empleados con reseñas")
+    
+    @classmethod
+    def sumar_calificacion(cls, acumulados, resena):
+        """Suma la reseña a los tres empleados que atendieron el pedido"""
+        for campo in ("cocinero_dni", "despachador_dni", "repartidor_dni"):
+            clave = (resena["local_id"], resena[campo])
+            suma, num = acumulados.get(clave, (0, 0))
+            acumulados[clave] = (suma + resena["calificacion"], num + 1)
+    
+    @classmethod
+    def aplicar_calificaciones(cls, empleados, acumulados):
+        """
+        Escribe en cada empleado los totales de `acumulados`; el promedio sale
+        de los totales (0 sin reseñas), como en el consumidor del stream
+        """
+        for empleado in empleados:
+            suma, num = acumulados.get((empleado["local_id"], empleado["dni"]), (0, 0))
+            empleado["suma_calificaciones"] = round(suma, 2)
+            empleado["num_resenas"] = num
+            empleado["calificacion_prom"] = round(suma / num, 2) if num else 0
+    
+    @classmethod
+    def generar_resumenes(cls, resenas, locales_ids, num_ultimas=10):
+        """
+        Genera el resumen por local que mantiene actualizarResumenLocal
+        (las últimas reseñas son las últimas de la lista, la más reciente primero).
+        DataPoblator lo carga con sembrado_hasta para que el consumidor no
+        vuelva a aplicar estas reseñas
+        """
+        resumenes = {local_id: cls.nuevo_resumen(local_id) for local_id in locales_ids}
+        
+        for resena in resenas:
+            cls.agregar_a_resumen(resumenes[resena["local_id"]], resena, num_ultimas)
+        
+        for resumen in resumenes.values():
+            cls.cerrar_resumen(resumen)
+        
+        print(f"  ✅ {len(resumenes)} resúmenes de reseñas por local")
+        return list(resumenes.values())
+    
+    @classmethod
+    def nuevo_resumen(cls, local_id):
+        # version 1: el consumidor solo crea el item (attribute_not_exists) cuando
+        # no leyó versión, y aquí el item ya existe
+        return {
+            "local_id": local_id,
+            "num_resenas": 0,
+            "suma_calificaciones": 0,
+            "calificacion_prom": 0,
+            "histograma": {str(estrellas): 0 for estrellas in range(6)},
+            "ultimas_resenas": [],
+            "version": 1
+        }
+    
+    @classmethod
+    def agregar_a_resumen(cls, resumen, resena, num_ultimas=10):
+        resumen["num_resenas"] += 1
+        resumen["suma_calificaciones"] += resena["calificacion"]
+        resumen["histograma"][str(int(resena["calificacion"] + 0.5))] += 1
+        resumen["ultimas_resenas"].insert(0, {
+            "resena_id": resena["resena_id"],
+            "pedido_id": resena["pedido_id"],
+            "calificacion": resena["calificacion"],
+            "resena": resena["resena"]
+        })
+        del resumen["ultimas_resenas"][num_ultimas:]
+    
+    @classmethod
+    def combinar_resumenes(cls, resumen, posterior, num_ultimas=10):
+        """Suma a `resumen` otro resumen parcial con reseñas generadas después"""
+        resumen["num_resenas"] += posterior["num_resenas"]
+        resumen["suma_calificaciones"] += posterior["suma_calificaciones"]
+        for estrellas, cantidad in posterior["histograma"].items():
+            resumen["histograma"][estrellas] += cantidad
+        resumen["ultimas_resenas"] = (posterior["ultimas_resenas"] + resumen["ultimas_resenas"])[:num_ultimas]
+    
+    @classmethod
+    def cerrar_resumen(cls, resumen):
+        """Redondea la suma y calcula el promedio"""
+        resumen["suma_calificaciones"] = round(resumen["suma_calificaciones"], 2)
+        if resumen["num_resenas"]:
+            resumen["calificacion_prom"] = round(resumen["suma_calificaciones"] / resumen["num_resenas"], 2)
+    
+    @classmethod
+    def crear_resena(cls, pedido):
         """Crea una reseña extrayendo los 3 DNIs del historial del pedido"""
         # Extraer los DNIs directamente del historial
         cocinero_dni = None
@@ -50,8 +50,7 @@ class UsuariosGenerator:
             "correo": Config.ADMIN_EMAIL,
             "telefono": Config.ADMIN_TELEFONO,
             "contrasena": Config.ADMIN_PASSWORD,
-            "role": "Admin",
-            "historial_pedidos": []
+            "role": "Admin"
         }
     
     @classmethod
@@ -63,8 +62,7 @@ class UsuariosGenerator:
             "correo": gerente_data["correo"],
             "telefono": f"+51{random.randint(900000000, 999999999)}",
             "contrasena": gerente_data["contrasena"],
-            "role": "Gerente",
-            "historial_pedidos": []
+            "role": "Gerente"
         }
     
     @classmethod
@@ -79,8 +77,7 @@ class UsuariosGenerator:
             "correo": f"{nombre.lower()}.{apellido.lower()}{index}@email.com",
             "telefono": f"+51{random.randint(900000000, 999999999)}",
             "contrasena": f"cliente{index:04d}",
-            "role": "Cliente",  # Primera letra mayúscula
-            "historial_pedidos": []  # Array vacío por defecto
+            "role": "Cliente"  # Primera letra mayúscula
         }
         
         # 70% de los clientes tienen información bancaria COMPLETA
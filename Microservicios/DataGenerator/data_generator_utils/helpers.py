@@ -4,6 +4,7 @@ Funciones auxiliares para el generador
 import uuid
 import random
 from datetime import datetime
+from .config import Config
 
 
 class Helpers:
@@ -11,13 +12,21 @@ class Helpers:
     
     @staticmethod
     def generar_uuid():
-        """Genera un UUID único"""
-        return str(uuid.uuid4())
+        """
+        Genera un UUID v4 a partir de `random` (no de os.urandom), así una
+        semilla reproduce también los ids
+        """
+        return str(uuid.UUID(int=random.getrandbits(128), version=4))
+    
+    @staticmethod
+    def ahora():
+        """Fecha actual de los datos (Config.FECHA_REFERENCIA si está fijada)"""
+        return Config.FECHA_REFERENCIA or datetime.now()
     
     @staticmethod
     def generar_timestamp():
         """Genera timestamp ISO 8601"""
-        return datetime.now().isoformat()
+        return Helpers.ahora().isoformat()
     
     @staticmethod
     def generar_email(nombre, apellido, suffix=""):
@@ -0,0 +1,137 @@
+"""
+Generación de pedidos, eventos y reseñas repartida en shards que corren en
+un pool de procesos. Cada shard:
+  - usa su propia semilla (f"{semilla}-{shard}"): misma semilla, misma salida,
+    sin importar cuántos procesos se usen;
+  - escribe sus propios archivos NDJSON (<tabla>-part-NNNNN.ndjson) pedido a
+    pedido, sin acumularlos en memoria;
+  - devuelve solo sus conteos, las calificaciones acumuladas por empleado y
+    los resúmenes parciales por local, que se combinan en el proceso principal.
+"""
+import os
+import json
+import glob
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .config import Config
+from .generators import PedidosGenerator, ResenasGenerator
+
+# Tablas que se generan por shards
+TABLAS_SHARDS = ("pedidos", "pedido_eventos", "resenas")
+
+# Datos base que comparten todos los shards (se copian una vez por proceso)
+_contexto = {}
+
+
+def ruta_parte(tabla, shard):
+    return os.path.join(Config.OUTPUT_DIR, f"{tabla}-part-{shard:05d}.ndjson")
+
+
+def limpiar_salida(tabla):
+    """Elimina las salidas anteriores de una tabla (.json, .ndjson y partes)"""
+    base = os.path.join(Config.OUTPUT_DIR, tabla)
+    for ruta in [f"{base}.json", f"{base}.ndjson"] + glob.glob(f"{base}-part-*.ndjson"):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def repartir(total, shards):
+    """Tamaño de cada shard (los primeros reciben el resto)"""
+    base, resto = divmod(total, shards)
+    return [base + (1 if shard < resto else 0) for shard in range(shards)]
+
+
+def _inicializar_proceso(contexto):
+    _contexto.update(contexto)
+    Config.OUTPUT_DIR = contexto["output_dir"]
+    Config.FECHA_REFERENCIA = contexto["fecha_referencia"]
+
+
+def _escribir(archivo, item):
+    archivo.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+
+def generar_shard(shard, cantidad, semilla):
+    """Genera un shard completo y retorna sus conteos y agregados"""
+    random.seed(semilla)
+    acumulados = {}
+    resumenes = {}
+    conteos = dict.fromkeys(TABLAS_SHARDS, 0)
+    archivos = {tabla: open(ruta_parte(tabla, shard), "w", encoding="utf-8") for tabla in TABLAS_SHARDS}
+
+    try:
+        pedidos = PedidosGenerator.iterar_pedidos(
+            cantidad,
+            _contexto["locales_ids"],
+            _contexto["usuarios_validos"],
+            _contexto["productos"],
+            _contexto["productos_por_local"],
+            _contexto["empleados_por_local"],
+            _contexto["combos_por_local"]
+        )
+        for pedido in pedidos:
+            # La reseña usa el historial en línea: se genera antes de separar los eventos
+            if pedido["estado"] == "recibido" and random.random() < Config.PORCENTAJE_PEDIDOS_CON_RESENA:
+                resena = ResenasGenerator.crear_resena(pedido)
+                if resena:
+                    _escribir(archivos["resenas"], resena)
+                    conteos["resenas"] += 1
+                    ResenasGenerator.sumar_calificacion(acumulados, resena)
+                    resumen = resumenes.setdefault(resena["local_id"], ResenasGenerator.nuevo_resumen(resena["local_id"]))
+                    ResenasGenerator.agregar_a_resumen(resumen, resena)
+
+            snapshots, eventos = PedidosGenerator.separar_eventos([pedido])
+            _escribir(archivos["pedidos"], snapshots[0])
+            conteos["pedidos"] += 1
+            for evento in eventos:
+                _escribir(archivos["pedido_eventos"], evento)
+            conteos["pedido_eventos"] += len(eventos)
+    finally:
+        for archivo in archivos.values():
+            archivo.close()
+
+    return {"shard": shard, "conteos": conteos, "acumulados": acumulados, "resumenes": resumenes}
+
+
+def generar_en_paralelo(num_pedidos, contexto, semilla, procesos, shards):
+    """
+    Reparte num_pedidos en `shards` y los genera con `procesos` procesos.
+    Returns: (conteos, acumulados, resumenes) - totales por tabla,
+    calificaciones por (local_id, dni) y resúmenes parciales por local (sin cerrar)
+    """
+    for tabla in TABLAS_SHARDS:
+        limpiar_salida(tabla)
+
+    contexto = dict(contexto, output_dir=Config.OUTPUT_DIR, fecha_referencia=Config.FECHA_REFERENCIA)
+    tamanos = repartir(num_pedidos, shards)
+    resultados = {}
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso, initargs=(contexto,)) as executor:
+        futuros = [
+            executor.submit(generar_shard, shard, tamano, f"{semilla}-{shard}")
+            for shard, tamano in enumerate(tamanos)
+        ]
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados[resultado["shard"]] = resultado
+            print(f"  📊 Shard {len(resultados)}/{shards}: {resultado['conteos']['pedidos']} pedidos, "
+                  f"{resultado['conteos']['resenas']} reseñas")
+
+    # Se combinan en orden de shard para que las "últimas reseñas" sean deterministas
+    conteos = dict.fromkeys(TABLAS_SHARDS, 0)
+    acumulados = {}
+    resumenes = {}
+    for shard in sorted(resultados):
+        resultado = resultados[shard]
+        for tabla, cantidad in resultado["conteos"].items():
+            conteos[tabla] += cantidad
+        for clave, (suma, num) in resultado["acumulados"].items():
+            suma_total, num_total = acumulados.get(clave, (0, 0))
+            acumulados[clave] = (suma_total + suma, num_total + num)
+        for local_id, parcial in resultado["resumenes"].items():
+            if local_id in resumenes:
+                ResenasGenerator.combinar_resumenes(resumenes[local_id], parcial)
+            else:
+                resumenes[local_id] = parcial
+
+    return conteos, acumulados, resumenes
@@ -0,0 +1,117 @@
+"""
+Migración única: agrega disponible_rol a los empleados existentes.
+
+El workflow busca empleados libres en el índice disperso
+disponible_rol-calificacion_prom-index, donde solo aparecen los empleados
+con disponible_rol ("local_id#role"). Los empleados creados antes del índice
+(o cargados desde un dynamodb_data/empleados.json antiguo) no lo tienen y el
+workflow nunca los encuentra. Este script recorre la tabla y completa
+disponible_rol en los empleados libres que no lo tienen.
+
+Los empleados ocupados se omiten: marcar_empleado_libre les agrega la clave
+al liberarlos.
+
+Uso:
+    python migrar_disponibilidad_empleados.py --dry-run
+    python migrar_disponibilidad_empleados.py
+"""
+import argparse
+import os
+import boto3
+from dotenv import load_dotenv
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+# Cargar variables de entorno desde .env (si existe)
+load_dotenv()
+
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+TABLE_EMPLEADOS = os.getenv('TABLE_EMPLEADOS', 'ChinaWok-Empleados')
+
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+
+
+def scan_all(table, **scan_kwargs):
+    """Recorre todas las páginas de un scan"""
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield from response.get('Items', [])
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def clave_disponibilidad(local_id, role):
+    """Valor de disponible_rol mientras el empleado está libre (igual que el workflow)"""
+    return f'{local_id}#{role}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Completa disponible_rol en los empleados libres')
+    parser.add_argument('--dry-run', action='store_true', help='Solo reporta los cambios, no escribe nada')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 CHINA WOK - MIGRACIÓN DE DISPONIBILIDAD DE EMPLEADOS")
+    print("=" * 60)
+    if args.dry_run:
+        print("ℹ️  Modo dry-run: no se escribirá nada")
+
+    empleados_table = dynamodb.Table(TABLE_EMPLEADOS)
+
+    print(f"\n📥 Buscando empleados sin disponible_rol en '{TABLE_EMPLEADOS}'...")
+    pendientes = scan_all(
+        empleados_table,
+        ProjectionExpression='local_id, dni, #role, ocupado',
+        ExpressionAttributeNames={'#role': 'role'},
+        FilterExpression=Attr('disponible_rol').not_exists()
+    )
+
+    actualizados = 0
+    ocupados = 0
+    omitidos = 0
+
+    for empleado in pendientes:
+        if empleado.get('ocupado'):
+            ocupados += 1
+            continue
+
+        local_id, dni = empleado['local_id'], empleado['dni']
+
+        if args.dry_run:
+            print(f"   {local_id}/{dni}: disponible_rol = {clave_disponibilidad(local_id, empleado['role'])}")
+            actualizados += 1
+            continue
+
+        try:
+            # Condicionado a que siga libre: si el workflow lo ocupó entretanto
+            # no se lo devuelve al índice
+            empleados_table.update_item(
+                Key={'local_id': local_id, 'dni': dni},
+                UpdateExpression='SET disponible_rol = :disponible_rol',
+                ConditionExpression='attribute_exists(dni) AND attribute_not_exists(disponible_rol) AND (attribute_not_exists(ocupado) OR ocupado = :libre)',
+                ExpressionAttributeValues={
+                    ':disponible_rol': clave_disponibilidad(local_id, empleado['role']),
+                    ':libre': False
+                }
+            )
+            actualizados += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            omitidos += 1
+
+    # Resumen final
+    print("\n" + "=" * 60)
+    print("📋 RESUMEN FINAL")
+    print("=" * 60)
+    print(f"\n✅ Empleados agregados al índice de disponibles: {actualizados}")
+    if ocupados:
+        print(f"ℹ️  Empleados ocupados omitidos (se agregan al liberarse): {ocupados}")
+    if omitidos:
+        print(f"⚠️  Empleados modificados durante la migración (omitidos): {omitidos}")
+
+
+if __name__ == "__main__":
+    main()
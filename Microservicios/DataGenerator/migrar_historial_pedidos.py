@@ -0,0 +1,167 @@
+"""
+Migración única: historial_pedidos (lista en el usuario) -> GSI de Pedidos.
+
+El historial de un usuario ahora se consulta en el índice
+usuario_correo-created_at-index de la tabla de Pedidos. Este script:
+  1. Completa created_at / estado_created_at en los pedidos que no lo tienen
+     (sin created_at el pedido no aparece en los índices).
+  2. Recorre las listas historial_pedidos existentes y completa usuario_correo
+     en los pedidos referenciados que no lo tengan.
+  3. Con --eliminar-listas, borra historial_pedidos de los usuarios migrados.
+
+Uso:
+    python migrar_historial_pedidos.py --dry-run
+    python migrar_historial_pedidos.py --eliminar-listas
+"""
+import argparse
+import os
+import boto3
+from dotenv import load_dotenv
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+# Cargar variables de entorno desde .env (si existe)
+load_dotenv()
+
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+TABLE_USUARIOS = os.getenv('TABLE_USUARIOS', 'ChinaWok-Usuarios')
+TABLE_PEDIDOS = os.getenv('TABLE_PEDIDOS', 'ChinaWok-Pedidos')
+
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+
+
+def scan_all(table, **scan_kwargs):
+    """Recorre todas las páginas de un scan"""
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield from response.get('Items', [])
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def fecha_creacion(pedido):
+    """created_at del pedido, o la hora de inicio del primer estado"""
+    if pedido.get('created_at'):
+        return pedido['created_at']
+    historial = pedido.get('historial_estados') or [{}]
+    return historial[0].get('hora_inicio')
+
+
+def completar_pedido(pedidos_table, pedido, usuario_correo=None, dry_run=False):
+    """
+    Agrega los atributos que necesitan los índices (created_at,
+    estado_created_at y opcionalmente usuario_correo)
+    Returns: bool - True si el pedido necesitaba cambios
+    """
+    cambios = {}
+
+    created_at = fecha_creacion(pedido)
+    if created_at and not pedido.get('created_at'):
+        cambios['created_at'] = created_at
+    if created_at and pedido.get('estado') and not pedido.get('estado_created_at'):
+        cambios['estado_created_at'] = f"{pedido['estado']}#{created_at}"
+    if usuario_correo and not pedido.get('usuario_correo'):
+        cambios['usuario_correo'] = usuario_correo
+
+    if not cambios:
+        return False
+
+    if not dry_run:
+        pedidos_table.update_item(
+            Key={'local_id': pedido['local_id'], 'pedido_id': pedido['pedido_id']},
+            UpdateExpression='SET ' + ', '.join(f'#{k} = :{k}' for k in cambios),
+            ExpressionAttributeNames={f'#{k}': k for k in cambios},
+            ExpressionAttributeValues={f':{k}': v for k, v in cambios.items()},
+            ConditionExpression='attribute_exists(pedido_id)'
+        )
+    pedido.update(cambios)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migra historial_pedidos de usuarios al GSI de Pedidos')
+    parser.add_argument('--dry-run', action='store_true', help='Solo reporta los cambios, no escribe nada')
+    parser.add_argument('--eliminar-listas', action='store_true', help='Elimina historial_pedidos de los usuarios migrados')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 CHINA WOK - MIGRACIÓN DE HISTORIAL DE PEDIDOS")
+    print("=" * 60)
+    if args.dry_run:
+        print("ℹ️  Modo dry-run: no se escribirá nada")
+
+    usuarios_table = dynamodb.Table(TABLE_USUARIOS)
+    pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
+
+    # 1. Indexar pedidos por pedido_id y completar created_at
+    print(f"\n📥 Leyendo pedidos de '{TABLE_PEDIDOS}'...")
+    pedidos_por_id = {}
+    pedidos_actualizados = 0
+
+    for pedido in scan_all(pedidos_table):
+        pedidos_por_id[pedido['pedido_id']] = pedido
+        if completar_pedido(pedidos_table, pedido, dry_run=args.dry_run):
+            pedidos_actualizados += 1
+
+    print(f"   📊 Pedidos leídos: {len(pedidos_por_id)}")
+    print(f"   ✅ Pedidos con created_at completado: {pedidos_actualizados}")
+
+    # 2. Recorrer las listas historial_pedidos de los usuarios
+    print(f"\n📥 Leyendo historiales de '{TABLE_USUARIOS}'...")
+    usuarios_migrados = 0
+    huerfanos = 0
+    conflictos = 0
+
+    for usuario in scan_all(
+        usuarios_table,
+        FilterExpression=Attr('historial_pedidos').exists(),
+        ProjectionExpression='correo, historial_pedidos'
+    ):
+        correo = usuario['correo']
+
+        for pedido_id in usuario.get('historial_pedidos') or []:
+            pedido = pedidos_por_id.get(pedido_id)
+            if pedido is None:
+                huerfanos += 1
+                print(f"   ⚠️  {correo}: pedido '{pedido_id}' no existe en '{TABLE_PEDIDOS}'")
+                continue
+
+            if pedido.get('usuario_correo') and pedido['usuario_correo'] != correo:
+                conflictos += 1
+                print(f"   ⚠️  {correo}: pedido '{pedido_id}' pertenece a '{pedido['usuario_correo']}'")
+                continue
+
+            if completar_pedido(pedidos_table, pedido, usuario_correo=correo, dry_run=args.dry_run):
+                pedidos_actualizados += 1
+
+        if args.eliminar_listas and not args.dry_run:
+            try:
+                usuarios_table.update_item(
+                    Key={'correo': correo},
+                    UpdateExpression='REMOVE historial_pedidos',
+                    ConditionExpression='attribute_exists(correo)'
+                )
+            except ClientError as e:
+                print(f"   ❌ {correo}: no se pudo eliminar historial_pedidos: {e.response['Error']['Message']}")
+                continue
+
+        usuarios_migrados += 1
+
+    # Resumen final
+    print("\n" + "=" * 60)
+    print("📋 RESUMEN FINAL")
+    print("=" * 60)
+    print(f"\n✅ Usuarios con historial procesados: {usuarios_migrados}")
+    print(f"✅ Pedidos actualizados: {pedidos_actualizados}")
+    if huerfanos:
+        print(f"⚠️  Pedidos referenciados que no existen: {huerfanos}")
+    if conflictos:
+        print(f"⚠️  Pedidos con otro usuario_correo: {conflictos}")
+    if args.eliminar_listas and not args.dry_run:
+        print("🗑️  historial_pedidos eliminado de los usuarios procesados")
+
+
+if __name__ == "__main__":
+    main()
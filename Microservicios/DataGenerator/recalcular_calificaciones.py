@@ -0,0 +1,124 @@
+"""
+Migración única: inicializa los acumuladores de calificación de los empleados.
+
+actualizarPromedioEmpleado mantiene suma_calificaciones y num_resenas con ADD
+atómicos a partir del stream de reseñas, por lo que los empleados existentes
+necesitan partir de los valores correctos. Este script recorre la tabla de
+reseñas una sola vez y escribe suma_calificaciones, num_resenas y
+calificacion_prom en cada empleado calificado.
+
+Solo hace falta para reseñas que no pasaron por el stream (anteriores a
+habilitarlo). Ejecutarlo antes de habilitar el stream: la función lee el
+stream desde TRIM_HORIZON, así que toda reseña que siga en él (24 h) se
+contaría dos veces. Los datos de DataGenerator no lo necesitan: los empleados
+se siembran con los acumuladores de las reseñas generadas y DataPoblator los
+marca con sembrado_hasta, así que la función descarta esas reseñas.
+
+Uso:
+    python recalcular_calificaciones.py --dry-run
+    python recalcular_calificaciones.py
+"""
+import argparse
+import os
+import boto3
+from decimal import Decimal, ROUND_HALF_UP
+from dotenv import load_dotenv
+from botocore.exceptions import ClientError
+
+# Cargar variables de entorno desde .env (si existe)
+load_dotenv()
+
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+TABLE_RESENAS = os.getenv('TABLE_RESENAS', 'ChinaWok-Resenas')
+TABLE_EMPLEADOS = os.getenv('TABLE_EMPLEADOS', 'ChinaWok-Empleados')
+
+# Campos de la reseña con el DNI de cada empleado calificado
+CAMPOS_EMPLEADOS = ['cocinero_dni', 'despachador_dni', 'repartidor_dni']
+
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+
+
+def scan_all(table, **scan_kwargs):
+    """Recorre todas las páginas de un scan"""
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield from response.get('Items', [])
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def acumular_resenas(resenas_table):
+    """Retorna {(local_id, dni): (suma, num)} con todas las reseñas"""
+    acumulados = {}
+    projection = ', '.join(['local_id', 'calificacion'] + CAMPOS_EMPLEADOS)
+
+    for resena in scan_all(resenas_table, ProjectionExpression=projection):
+        if 'calificacion' not in resena:
+            continue
+        for campo in CAMPOS_EMPLEADOS:
+            if not resena.get(campo):
+                continue
+            clave = (resena['local_id'], resena[campo])
+            suma, num = acumulados.get(clave, (Decimal('0'), 0))
+            acumulados[clave] = (suma + resena['calificacion'], num + 1)
+
+    return acumulados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inicializa suma_calificaciones / num_resenas de los empleados')
+    parser.add_argument('--dry-run', action='store_true', help='Solo reporta los cambios, no escribe nada')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 CHINA WOK - RECÁLCULO DE CALIFICACIONES DE EMPLEADOS")
+    print("=" * 60)
+    if args.dry_run:
+        print("ℹ️  Modo dry-run: no se escribirá nada")
+
+    resenas_table = dynamodb.Table(TABLE_RESENAS)
+    empleados_table = dynamodb.Table(TABLE_EMPLEADOS)
+
+    print(f"\n📥 Leyendo reseñas de '{TABLE_RESENAS}'...")
+    acumulados = acumular_resenas(resenas_table)
+    print(f"   📊 Empleados con reseñas: {len(acumulados)}")
+
+    actualizados = 0
+    inexistentes = 0
+
+    for (local_id, dni), (suma, num) in acumulados.items():
+        promedio = (suma / num).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+        if args.dry_run:
+            print(f"   {local_id}/{dni}: {num} reseñas, promedio {promedio}")
+            actualizados += 1
+            continue
+
+        try:
+            empleados_table.update_item(
+                Key={'local_id': local_id, 'dni': dni},
+                UpdateExpression='SET suma_calificaciones = :suma, num_resenas = :num, calificacion_prom = :promedio',
+                ExpressionAttributeValues={':suma': suma, ':num': num, ':promedio': promedio},
+                ConditionExpression='attribute_exists(dni)'
+            )
+            actualizados += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            inexistentes += 1
+            print(f"   ⚠️  Empleado {local_id}/{dni} no existe en '{TABLE_EMPLEADOS}'")
+
+    # Resumen final
+    print("\n" + "=" * 60)
+    print("📋 RESUMEN FINAL")
+    print("=" * 60)
+    print(f"\n✅ Empleados actualizados: {actualizados}")
+    if inexistentes:
+        print(f"⚠️  Empleados referenciados que no existen: {inexistentes}")
+    print("ℹ️  Los empleados sin reseñas empiezan en 0 con el primer ADD del stream")
+
+
+if __name__ == "__main__":
+    main()
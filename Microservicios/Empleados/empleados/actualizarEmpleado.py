@@ -1,5 +1,6 @@
 import boto3, json, os
 from decimal import Decimal
+from botocore.exceptions import ClientError
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
@@ -18,16 +19,15 @@ def lambda_handler(event, context):
     update_expr = []
     expr_attr_vals = {}
     for key, value in body.items():
-        if key not in ['nombre', 'apellido', 'calificacion_prom', 'sueldo', 'role']:
+        # calificacion_prom se deriva de las reseñas (actualizarPromedioEmpleado)
+        if key not in ['nombre', 'apellido', 'sueldo', 'role']:
             continue
 
         # Convertir campos numéricos a Decimal
-        if key in ['calificacion_prom', 'sueldo']:
+        if key == 'sueldo':
             value = Decimal(str(value))
             # Validar rangos
-            if key == 'calificacion_prom' and not (Decimal('0') <= value <= Decimal('5')):
-                return {'statusCode': 400, 'body': json.dumps({'error': 'La calificación debe estar entre 0 y 5'})}
-            if key == 'sueldo' and value < 0:
+            if value < 0:
                 return {'statusCode': 400, 'body': json.dumps({'error': 'El sueldo no puede ser negativo'})}
 
         update_expr.append(f"{key} = :{key}")
@@ -43,4 +43,23 @@ def lambda_handler(event, context):
         ReturnValues='ALL_NEW'
     )
 
+    # Si cambia el rol de un empleado libre, moverlo en el índice de disponibles
+    empleado = response['Attributes']
+    if 'role' in body and not empleado.get('ocupado', False):
+        try:
+            response = table.update_item(
+                Key={'local_id': local_id, 'dni': dni},
+                UpdateExpression="SET disponible_rol = :disponible_rol",
+                ConditionExpression="ocupado = :libre",
+                ExpressionAttributeValues={
+                    ':disponible_rol': f"{local_id}#{empleado['role']}",
+                    ':libre': False
+                },
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            # Fue asignado mientras tanto; al liberarse recibe la clave con el rol nuevo
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
     return {'statusCode': 200, 'body': json.dumps({'message': 'Empleado actualizado', 'empleado': response['Attributes']}, cls=DecimalEncoder)}
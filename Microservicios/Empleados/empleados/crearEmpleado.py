@@ -49,8 +49,13 @@ def lambda_handler(event, context):
         'apellido': body['apellido'],
         'role': body['role'],
         'calificacion_prom': Decimal('0'),
+        # Acumuladores de reseñas; calificacion_prom = suma / num
+        'suma_calificaciones': Decimal('0'),
+        'num_resenas': 0,
         'sueldo': sueldo,
-        'ocupado': False
+        'ocupado': False,
+        # Clave del índice de empleados disponibles (se quita mientras está ocupado)
+        'disponible_rol': f"{body['local_id']}#{body['role']}"
     }
 
     table.put_item(Item=item)
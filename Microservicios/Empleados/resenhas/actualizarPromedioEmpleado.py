@@ -1,80 +1,190 @@
 import boto3, os
-from boto3.dynamodb.conditions import Key
 from decimal import Decimal
-import json
+from botocore.exceptions import ClientError
+import traceback
+from utils.stream_resenas import imagenes_registro, clave_secuencia, creacion_registro, calcular_promedio
 
 dynamodb = boto3.resource('dynamodb')
-tabla_resenas = dynamodb.Table(os.environ['TABLE_RESENAS'])
 tabla_empleados = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
 
-def lambda_handler(event, context):
+# Campos de la reseña con el DNI de cada empleado calificado
+CAMPOS_EMPLEADOS = ['cocinero_dni', 'despachador_dni', 'repartidor_dni']
+
+# Reintentos cuando otro proceso aplicó parte del lote a la vez
+MAX_INTENTOS_APORTES = 3
+
+
+def aportes_resena(resena):
+    """
+    Calificación que la reseña aporta a cada empleado: [((local_id, dni), calificacion)]
+    Una reseña califica al cocinero, al despachador y al repartidor del pedido
+    """
+    if not resena or 'calificacion' not in resena or 'local_id' not in resena:
+        return []
+
+    calificacion = Decimal(str(resena['calificacion']))
+    return [
+        ((resena['local_id'], resena[campo]), calificacion)
+        for campo in CAMPOS_EMPLEADOS
+        if resena.get(campo)
+    ]
+
+
+def calcular_deltas(record):
+    """
+    Cambios de suma y cantidad de reseñas por empleado que produce un registro:
+    INSERT suma la imagen nueva, REMOVE resta la anterior y MODIFY hace ambas
+    Returns: dict - {(local_id, dni): [delta_suma, delta_num]} sin deltas nulos
+    """
+    anterior, nueva = imagenes_registro(record)
+
+    deltas = {}
+    for clave, calificacion in aportes_resena(anterior):
+        delta = deltas.setdefault(clave, [Decimal('0'), 0])
+        delta[0] -= calificacion
+        delta[1] -= 1
+    for clave, calificacion in aportes_resena(nueva):
+        delta = deltas.setdefault(clave, [Decimal('0'), 0])
+        delta[0] += calificacion
+        delta[1] += 1
+
+    # Un MODIFY que solo cambia el texto no altera el promedio
+    return {clave: delta for clave, delta in deltas.items() if delta[0] != 0 or delta[1] != 0}
+
+
+def agrupar_por_empleado(records):
+    """
+    Junta los deltas de todo el lote por empleado
+    Returns: (grupos, fallidos)
+        grupos: {(local_id, dni): [(secuencia, sequence_number, delta_suma, delta_num, creacion)]}
+        fallidos: SequenceNumbers de los registros que no se pudieron leer
+    """
+    grupos = {}
+    fallidos = []
+
+    for record in records:
+        try:
+            deltas = calcular_deltas(record)
+        except Exception as e:
+            print(f"[ERROR] Registro {record['dynamodb'].get('SequenceNumber')} inválido: {type(e).__name__}: {str(e)}")
+            fallidos.append(record['dynamodb']['SequenceNumber'])
+            continue
+
+        for clave, (delta_suma, delta_num) in deltas.items():
+            grupos.setdefault(clave, []).append(
+                (clave_secuencia(record), record['dynamodb']['SequenceNumber'], delta_suma, delta_num,
+                 creacion_registro(record))
+            )
+
+    return grupos, fallidos
+
+
+def aplicar_aportes(local_id, dni, aportes):
+    """
+    Aplica en un solo ADD atómico todos los aportes del lote para el empleado
+    y deriva calificacion_prom de los totales resultantes, sin releer las reseñas.
+
+    ultima_secuencia_resena guarda el último registro del stream aplicado al
+    empleado: si el lote se reintenta (batchItemFailures), los aportes que ya
+    se sumaron se descartan en vez de contarse dos veces.
+
+    sembrado_hasta (DataPoblator) marca que los acumuladores ya incluyen las
+    reseñas cargadas: los registros creados hasta ese instante (la carga y los
+    REMOVE del reset de la tabla de reseñas) se descartan.
+    Returns: Decimal - nuevo promedio, o None si no hubo nada que aplicar
+    """
+    for _ in range(MAX_INTENTOS_APORTES):
+        delta_suma = sum((aporte[2] for aporte in aportes), Decimal('0'))
+        delta_num = sum(aporte[3] for aporte in aportes)
+        primera = min(aporte[0] for aporte in aportes)
+        ultima = max(aporte[0] for aporte in aportes)
+        primera_creacion = min(aporte[4] for aporte in aportes)
+
+        try:
+            response = tabla_empleados.update_item(
+                Key={'local_id': local_id, 'dni': dni},
+                UpdateExpression='ADD suma_calificaciones :delta_suma, num_resenas :delta_num SET ultima_secuencia_resena = :ultima',
+                # No recrear empleados eliminados y no volver a sumar registros ya aplicados
+                # ni registros anteriores a la siembra de los acumuladores
+                ConditionExpression='attribute_exists(dni) AND (attribute_not_exists(ultima_secuencia_resena) OR ultima_secuencia_resena < :primera) '
+                                    'AND (attribute_not_exists(sembrado_hasta) OR sembrado_hasta < :primera_creacion)',
+                ExpressionAttributeValues={
+                    ':delta_suma': delta_suma,
+                    ':delta_num': delta_num,
+                    ':primera': primera,
+                    ':ultima': ultima,
+                    ':primera_creacion': primera_creacion
+                },
+                ReturnValues='ALL_NEW'
+            )
+            break
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+        # Ver qué parte del lote ya estaba aplicada
+        empleado = tabla_empleados.get_item(
+            Key={'local_id': local_id, 'dni': dni},
+            ProjectionExpression='dni, ultima_secuencia_resena, sembrado_hasta',
+            ConsistentRead=True
+        ).get('Item')
+
+        if not empleado:
+            print(f"[WARN] Empleado {local_id}/{dni} no existe, se omite")
+            return None
+
+        aplicada = empleado.get('ultima_secuencia_resena', '')
+        sembrado_hasta = empleado.get('sembrado_hasta', -1)
+        aportes = [aporte for aporte in aportes if aporte[0] > aplicada and aporte[4] > sembrado_hasta]
+        if not aportes:
+            print(f"[DEBUG] Aportes para {local_id}/{dni} ya aplicados, se omiten")
+            return None
+    else:
+        raise RuntimeError(f"No se pudieron aplicar los aportes de {local_id}/{dni} tras {MAX_INTENTOS_APORTES} intentos")
+
+    suma = response['Attributes']['suma_calificaciones']
+    num = response['Attributes']['num_resenas']
+    promedio = calcular_promedio(suma, num)
+
+    # Si otra invocación sumó una reseña entre medio, la condición falla y es
+    # esa invocación la que escribe el promedio más reciente
     try:
-        print(f"[DEBUG] Evento recibido: {json.dumps(event, indent=2)}")
-        print(f"[DEBUG] Número de registros: {len(event['Records'])}")
-
-        for record in event['Records']:
-            try:
-                print(f"[DEBUG] Tipo de evento: {record['eventName']}")
-
-                if record['eventName'] != 'INSERT':
-                    print(f"[DEBUG] Evento ignorado (no es INSERT): {record['eventName']}")
-                    continue
-
-                # Extraer datos del Stream
-                item = record['dynamodb']['NewImage']
-                print(f"[DEBUG] NewImage completo: {json.dumps(item, indent=2)}")
-
-                # Verificar que existan los campos necesarios
-                if 'local_id' not in item or 'empleado_dni' not in item:
-                    print(f"[ERROR] Faltan campos 'local_id' o 'empleado_dni' en el item")
-                    continue
-
-                local_id = item['local_id']['S']
-                empleado_dni = item['empleado_dni']['S']
-                pk = f"LOCAL#{local_id}#EMP#{empleado_dni}"
-
-                print(f"[DEBUG] Procesando empleado: local_id={local_id}, dni={empleado_dni}, pk={pk}")
-
-                # 1️⃣ Consultar todas las reseñas del empleado
-                response = tabla_resenas.query(KeyConditionExpression=Key('pk').eq(pk))
-                items = response['Items']
-
-                print(f"[DEBUG] Reseñas encontradas: {len(items)}")
-
-                if not items:
-                    print(f"[DEBUG] No se encontraron reseñas para {pk}")
-                    continue
-
-                # 2️⃣ Calcular nuevo promedio
-                calificaciones = [float(i['calificacion']) for i in items]
-                total = sum(calificaciones)
-                promedio = Decimal(str(round(total / len(items), 2)))
-
-                print(f"[DEBUG] Calificaciones: {calificaciones}")
-                print(f"[DEBUG] Promedio calculado: {promedio}")
-
-                # 3️⃣ Actualizar calificacion_prom en tabla Empleados
-                tabla_empleados.update_item(
-                    Key={'local_id': local_id, 'dni': empleado_dni},
-                    UpdateExpression="SET calificacion_prom = :p",
-                    ExpressionAttributeValues={':p': promedio}
-                )
-
-                print(f"[DEBUG] Promedio actualizado exitosamente para empleado {empleado_dni}: {promedio}")
-
-            except Exception as e:
-                print(f"[ERROR] Error procesando registro individual: {str(e)}")
-                print(f"[ERROR] Tipo de error: {type(e).__name__}")
-                import traceback
-                print(f"[ERROR] Traceback: {traceback.format_exc()}")
-                # Continuar con el siguiente registro
-                continue
-
-        return {'statusCode': 200, 'body': 'Promedios actualizados correctamente'}
-
-    except Exception as e:
-        print(f"[ERROR] Error crítico en lambda_handler: {str(e)}")
-        print(f"[ERROR] Tipo de error: {type(e).__name__}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
-        raise
+        tabla_empleados.update_item(
+            Key={'local_id': local_id, 'dni': dni},
+            UpdateExpression='SET calificacion_prom = :promedio',
+            ConditionExpression='suma_calificaciones = :suma AND num_resenas = :num',
+            ExpressionAttributeValues={':promedio': promedio, ':suma': suma, ':num': num}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"[DEBUG] Promedio de {dni} ya fue actualizado por otra invocación")
+
+    return promedio
+
+
+def lambda_handler(event, context):
+    """
+    Consumidor del stream de reseñas. Agrupa los registros del lote por
+    empleado y aplica una sola actualización por empleado. Los errores se
+    reportan con batchItemFailures (functionResponseType: ReportBatchItemFailures)
+    para que Lambda reintente desde el primer registro fallido.
+    """
+    records = event['Records']
+    grupos, fallidos = agrupar_por_empleado(records)
+    print(f"[DEBUG] {len(records)} registros agrupados en {len(grupos)} empleados")
+
+    for (local_id, dni), aportes in grupos.items():
+        try:
+            promedio = aplicar_aportes(local_id, dni, aportes)
+            print(f"[DEBUG] Empleado {local_id}/{dni}: {len(aportes)} aportes, promedio={promedio}")
+        except Exception as e:
+            print(f"[ERROR] Error actualizando empleado {local_id}/{dni}: {type(e).__name__}: {str(e)}")
+            print(f"[ERROR] Traceback: {traceback.format_exc()}")
+            # Lambda reanuda desde el menor SequenceNumber reportado
+            fallidos.append(min(aportes)[1])
+
+    if fallidos:
+        print(f"[WARN] {len(fallidos)} registros se reintentarán")
+
+    return {'batchItemFailures': [{'itemIdentifier': secuencia} for secuencia in fallidos]}
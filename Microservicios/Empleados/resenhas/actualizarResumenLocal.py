@@ -0,0 +1,175 @@
+import boto3, os
+from decimal import Decimal, ROUND_HALF_UP
+from botocore.exceptions import ClientError
+import traceback
+from utils.stream_resenas import imagenes_registro, clave_secuencia, creacion_registro, calcular_promedio
+
+dynamodb = boto3.resource('dynamodb')
+tabla_resumen = dynamodb.Table(os.environ['TABLE_RESENAS_RESUMEN'])
+
+# Reseñas más recientes que se guardan en el resumen del local
+NUM_ULTIMAS_RESENAS = 10
+
+# Reintentos cuando otra invocación modificó el resumen a la vez
+MAX_INTENTOS_RESUMEN = 3
+
+# Campos de la reseña que se copian a ultimas_resenas
+CAMPOS_RESENA_RESUMIDA = ['resena_id', 'pedido_id', 'calificacion', 'resena']
+
+
+def resumen_vacio(local_id):
+    """Resumen de un local sin reseñas"""
+    return {
+        'local_id': local_id,
+        'num_resenas': 0,
+        'suma_calificaciones': Decimal('0'),
+        'calificacion_prom': Decimal('0'),
+        'histograma': {str(estrellas): 0 for estrellas in range(6)},
+        'ultimas_resenas': [],
+        'version': 0
+    }
+
+
+def estrellas(calificacion):
+    """Barra del histograma (0-5) a la que pertenece la calificación"""
+    return str(int(Decimal(str(calificacion)).quantize(Decimal('1'), rounding=ROUND_HALF_UP)))
+
+
+def aplicar_registro(resumen, anterior, nueva):
+    """Aplica en memoria el cambio de una reseña sobre el resumen del local"""
+    if anterior and 'calificacion' in anterior:
+        resumen['num_resenas'] -= 1
+        resumen['suma_calificaciones'] -= Decimal(str(anterior['calificacion']))
+        barra = estrellas(anterior['calificacion'])
+        resumen['histograma'][barra] = resumen['histograma'].get(barra, 0) - 1
+
+    if nueva and 'calificacion' in nueva:
+        resumen['num_resenas'] += 1
+        resumen['suma_calificaciones'] += Decimal(str(nueva['calificacion']))
+        barra = estrellas(nueva['calificacion'])
+        resumen['histograma'][barra] = resumen['histograma'].get(barra, 0) + 1
+
+    resena_id = (nueva or anterior or {}).get('resena_id')
+    ultimas = resumen['ultimas_resenas']
+    posicion = next((i for i, r in enumerate(ultimas) if r['resena_id'] == resena_id), None)
+
+    if nueva is None:
+        # REMOVE: sale de la lista (no se rellena con una más antigua)
+        if posicion is not None:
+            ultimas.pop(posicion)
+    elif anterior is None:
+        # INSERT: pasa a ser la más reciente
+        ultimas.insert(0, {campo: nueva.get(campo) for campo in CAMPOS_RESENA_RESUMIDA})
+        del ultimas[NUM_ULTIMAS_RESENAS:]
+    elif posicion is not None:
+        # MODIFY: se actualiza en su lugar
+        ultimas[posicion] = {campo: nueva.get(campo) for campo in CAMPOS_RESENA_RESUMIDA}
+
+
+def agrupar_por_local(records):
+    """
+    Returns: (grupos, fallidos)
+        grupos: {local_id: [(secuencia, sequence_number, anterior, nueva, creacion)]} en orden del stream
+        fallidos: SequenceNumbers de los registros que no se pudieron leer
+    """
+    grupos = {}
+    fallidos = []
+
+    for record in records:
+        try:
+            anterior, nueva = imagenes_registro(record)
+            local_id = (nueva or anterior)['local_id']
+        except Exception as e:
+            print(f"[ERROR] Registro {record['dynamodb'].get('SequenceNumber')} inválido: {type(e).__name__}: {str(e)}")
+            fallidos.append(record['dynamodb']['SequenceNumber'])
+            continue
+
+        grupos.setdefault(local_id, []).append(
+            (clave_secuencia(record), record['dynamodb']['SequenceNumber'], anterior, nueva,
+             creacion_registro(record))
+        )
+
+    return grupos, fallidos
+
+
+def actualizar_resumen(local_id, registros):
+    """
+    Lee el resumen del local, aplica los registros del lote que aún no se
+    aplicaron (ultima_secuencia) y lo guarda con control de versión.
+    Los registros creados hasta sembrado_hasta (DataPoblator) ya están en el
+    resumen sembrado (la carga y los REMOVE del reset de la tabla de
+    reseñas) y se descartan.
+    Returns: dict - resumen actualizado
+    """
+    for _ in range(MAX_INTENTOS_RESUMEN):
+        resumen = tabla_resumen.get_item(Key={'local_id': local_id}, ConsistentRead=True).get('Item')
+        resumen = resumen or resumen_vacio(local_id)
+        version_actual = resumen['version']
+
+        # Los registros ya aplicados (reintento del lote) o anteriores a la siembra se descartan
+        aplicada = resumen.get('ultima_secuencia', '')
+        sembrado_hasta = resumen.get('sembrado_hasta')
+        pendientes = [
+            registro for registro in registros
+            if registro[0] > aplicada and (sembrado_hasta is None or registro[4] > sembrado_hasta)
+        ]
+        if not pendientes:
+            print(f"[DEBUG] Registros del local {local_id} ya aplicados, se omiten")
+            return resumen
+
+        for _, _, anterior, nueva, _ in pendientes:
+            aplicar_registro(resumen, anterior, nueva)
+
+        resumen['calificacion_prom'] = calcular_promedio(resumen['suma_calificaciones'], resumen['num_resenas'])
+        resumen['ultima_secuencia'] = pendientes[-1][0]
+        resumen['version'] = version_actual + 1
+
+        condicion = {'ConditionExpression': 'attribute_not_exists(local_id)'}
+        if version_actual:
+            # Una nueva siembra también parte de version 1: sembrado_hasta
+            # distingue el resumen leído del que la reemplazó
+            condicion = {
+                'ConditionExpression': 'version = :version AND attribute_not_exists(sembrado_hasta)',
+                'ExpressionAttributeValues': {':version': version_actual}
+            }
+            if sembrado_hasta is not None:
+                condicion = {
+                    'ConditionExpression': 'version = :version AND sembrado_hasta = :sembrado_hasta',
+                    'ExpressionAttributeValues': {':version': version_actual, ':sembrado_hasta': sembrado_hasta}
+                }
+
+        try:
+            tabla_resumen.put_item(Item=resumen, **condicion)
+            return resumen
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            print(f"[DEBUG] Resumen del local {local_id} modificado por otra invocación, reintentando")
+
+    raise RuntimeError(f"No se pudo actualizar el resumen del local {local_id} tras {MAX_INTENTOS_RESUMEN} intentos")
+
+
+def lambda_handler(event, context):
+    """
+    Consumidor del stream de reseñas que mantiene un resumen por local
+    (cantidad, promedio, histograma y últimas reseñas) para servirlo con un
+    solo GetItem. Una escritura por local y lote; errores vía batchItemFailures.
+    """
+    records = event['Records']
+    grupos, fallidos = agrupar_por_local(records)
+    print(f"[DEBUG] {len(records)} registros agrupados en {len(grupos)} locales")
+
+    for local_id, registros in grupos.items():
+        try:
+            resumen = actualizar_resumen(local_id, registros)
+            print(f"[DEBUG] Local {local_id}: {resumen['num_resenas']} reseñas, promedio={resumen['calificacion_prom']}")
+        except Exception as e:
+            print(f"[ERROR] Error actualizando resumen del local {local_id}: {type(e).__name__}: {str(e)}")
+            print(f"[ERROR] Traceback: {traceback.format_exc()}")
+            # Lambda reanuda desde el menor SequenceNumber reportado
+            fallidos.append(registros[0][1])
+
+    if fallidos:
+        print(f"[WARN] {len(fallidos)} registros se reintentarán")
+
+    return {'batchItemFailures': [{'itemIdentifier': secuencia} for secuencia in fallidos]}
@@ -1,9 +1,11 @@
 import boto3, json, os
 from boto3.dynamodb.conditions import Key
 from decimal import Decimal
+from chinawok_shared.pagination import PaginacionError, leer_limite, decodificar_token, codificar_token
 
 dynamodb = boto3.resource('dynamodb')
 tabla_resenas = dynamodb.Table(os.environ['TABLE_RESENAS'])
+tabla_resumen = dynamodb.Table(os.environ['TABLE_RESENAS_RESUMEN'])
 
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -12,20 +14,61 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(obj)
 
 def lambda_handler(event, context):
+    """
+    Reseñas de un local.
+    - ?resumen=true: cantidad, promedio, histograma y últimas reseñas en un
+      solo GetItem (lo mantiene actualizarResumenLocal desde el stream)
+    - sin resumen: listado paginado con limit y next_token
+    """
     local_id = event['pathParameters']['local_id']
-    
+    params = event.get('queryStringParameters') or {}
+
+    if params.get('resumen', '').lower() == 'true':
+        try:
+            resumen = tabla_resumen.get_item(Key={'local_id': local_id}).get('Item')
+        except Exception as e:
+            return {'statusCode': 500, 'body': json.dumps({'error': f"Error al consultar resumen: {str(e)}"})}
+
+        if not resumen:
+            # Local sin reseñas todavía
+            resumen = {
+                'local_id': local_id,
+                'num_resenas': 0,
+                'calificacion_prom': 0,
+                'histograma': {str(estrellas): 0 for estrellas in range(6)},
+                'ultimas_resenas': []
+            }
+
+        # Campos internos del consumidor del stream
+        for campo in ('version', 'ultima_secuencia', 'sembrado_hasta', 'suma_calificaciones'):
+            resumen.pop(campo, None)
+
+        return {'statusCode': 200, 'body': json.dumps({'local_id': local_id, 'resumen': resumen}, cls=DecimalEncoder)}
+
     try:
-        # Consultar todas las reseñas por local_id (partition key)
-        response = tabla_resenas.query(
-            KeyConditionExpression=Key('local_id').eq(local_id)
-        )
-        
+        limite = leer_limite(params)
+        start_key = decodificar_token(params.get('next_token'))
+    except PaginacionError as e:
+        return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+
+    try:
+        query_kwargs = {
+            'KeyConditionExpression': Key('local_id').eq(local_id),
+            'Limit': limite
+        }
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+
+        response = tabla_resenas.query(**query_kwargs)
+        resenas = response.get('Items', [])
+
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'local_id': local_id,
-                'total_resenas': len(response['Items']),
-                'resenas': response['Items']
+                'count': len(resenas),
+                'resenas': resenas,
+                'next_token': codificar_token(response.get('LastEvaluatedKey'))
             }, cls=DecimalEncoder)
         }
     except Exception as e:
@@ -42,13 +42,14 @@ def lambda_handler(event, context):
     except Exception as e:
         return {'statusCode': 500, 'body': json.dumps({'error': f"Error al obtener pedido: {str(e)}"})}
 
-    # Extraer DNIs de empleados del historial de estados
-    historial_estados = pedido.get('historial_estados', [])
-    cocinero_dni = None
-    despachador_dni = None
-    repartidor_dni = None
+    # DNIs de los empleados que atendieron el pedido (snapshot empleados_asignados)
+    empleados_asignados = pedido.get('empleados_asignados') or {}
+    cocinero_dni = empleados_asignados.get('cocinero')
+    despachador_dni = empleados_asignados.get('despachador')
+    repartidor_dni = empleados_asignados.get('repartidor')
 
-    for estado in historial_estados:
+    # Los pedidos anteriores a la tabla de eventos los tienen en historial_estados
+    for estado in pedido.get('historial_estados', []):
         empleado = estado.get('empleado')
         if empleado:
             rol = empleado.get('rol', '').lower()
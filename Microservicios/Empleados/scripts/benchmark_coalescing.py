@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: coalescencia de un lote del stream de reseñas en
+actualizarPromedioEmpleado.
+
+Arma un lote sintético de registros INSERT / MODIFY / REMOVE (formato del
+stream de DynamoDB) sobre --empleados empleados y compara:
+  - antes: una escritura por empleado y por registro (3 por reseña),
+  - ahora: agrupar_por_empleado, una escritura por empleado y por lote.
+La latencia de cada escritura se simula con --latencia-ms (no accede a AWS),
+así que el resultado muestra cuántas escrituras se ahorran y cuánto pesa
+agrupar frente a esas escrituras.
+
+Uso (desde Microservicios/Empleados):
+    python scripts/benchmark_coalescing.py --registros 100 --empleados 12 --latencia-ms 8
+"""
+import argparse
+import os
+import sys
+import time
+import random
+from boto3.dynamodb.types import TypeSerializer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# El handler crea su recurso boto3 al importarse (sin llamadas de red)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('TABLE_EMPLEADOS', 'ChinaWok-Empleados')
+
+from resenhas.actualizarPromedioEmpleado import agrupar_por_empleado, calcular_deltas
+
+serializer = TypeSerializer()
+LOCAL_ID = 'LOCAL-BENCH'
+
+
+def imagen(resena):
+    return {k: serializer.serialize(v) for k, v in resena.items()}
+
+
+def resena_aleatoria(dnis, numero):
+    return {
+        'local_id': LOCAL_ID,
+        'resena_id': f'R{numero}',
+        'cocinero_dni': random.choice(dnis),
+        'despachador_dni': random.choice(dnis),
+        'repartidor_dni': random.choice(dnis),
+        'calificacion': str(round(random.uniform(1, 5), 2))
+    }
+
+
+def lote_sintetico(num_registros, num_empleados):
+    """Registros en orden del stream: 80% INSERT, 15% MODIFY, 5% REMOVE"""
+    dnis = [f'{70000000 + i}' for i in range(num_empleados)]
+    records = []
+    existentes = []
+
+    for secuencia in range(num_registros):
+        tipo = random.random()
+        datos = {'SequenceNumber': str(1000 + secuencia), 'ApproximateCreationDateTime': 1700000000 + secuencia}
+
+        if existentes and tipo > 0.95:
+            anterior = existentes.pop(random.randrange(len(existentes)))
+            evento, datos['OldImage'] = 'REMOVE', imagen(anterior)
+        elif existentes and tipo > 0.80:
+            anterior = random.choice(existentes)
+            nueva = dict(anterior, calificacion=str(round(random.uniform(1, 5), 2)))
+            existentes[existentes.index(anterior)] = nueva
+            evento, datos['OldImage'], datos['NewImage'] = 'MODIFY', imagen(anterior), imagen(nueva)
+        else:
+            nueva = resena_aleatoria(dnis, secuencia)
+            existentes.append(nueva)
+            evento, datos['NewImage'] = 'INSERT', imagen(nueva)
+
+        records.append({'eventName': evento, 'dynamodb': datos})
+
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Escrituras por lote con y sin coalescencia por empleado')
+    parser.add_argument('--registros', type=int, default=100, help='Registros por lote (batchSize)')
+    parser.add_argument('--empleados', type=int, default=12, help='Empleados distintos en el lote')
+    parser.add_argument('--latencia-ms', type=float, default=8.0, help='Latencia simulada de cada UpdateItem')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    lotes = [lote_sintetico(args.registros, args.empleados) for _ in range(args.repeticiones)]
+    latencia = args.latencia_ms / 1000
+
+    # Antes: cada registro escribe en cada empleado que toca
+    inicio = time.perf_counter()
+    escrituras_antes = sum(len(calcular_deltas(record)) for lote in lotes for record in lote)
+    cpu_antes = time.perf_counter() - inicio
+
+    # Ahora: una escritura por empleado y lote
+    inicio = time.perf_counter()
+    escrituras_ahora = sum(len(agrupar_por_empleado(lote)[0]) for lote in lotes)
+    cpu_ahora = time.perf_counter() - inicio
+
+    print(f"📊 {args.repeticiones} lotes de {args.registros} registros sobre {args.empleados} empleados")
+    for nombre, escrituras, cpu in (('por registro', escrituras_antes, cpu_antes), ('coalescido', escrituras_ahora, cpu_ahora)):
+        por_lote = escrituras / args.repeticiones
+        total_ms = (cpu / args.repeticiones + por_lote * latencia) * 1000
+        print(f"   {nombre:<13} {por_lote:7.1f} escrituras/lote   ~{total_ms:8.1f} ms/lote "
+              f"(cpu {cpu / args.repeticiones * 1000:.2f} ms)")
+
+    print(f"\n⚡ Escrituras: {escrituras_antes / max(escrituras_ahora, 1):.1f}x menos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Utils package compartido por los handlers de Empleados
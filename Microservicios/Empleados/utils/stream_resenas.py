@@ -0,0 +1,47 @@
+from decimal import Decimal, ROUND_HALF_UP
+from boto3.dynamodb.types import TypeDeserializer
+
+# Helpers para los consumidores del stream de la tabla de reseñas
+deserializer = TypeDeserializer()
+
+
+def deserializar_imagen(imagen):
+    """Convierte una imagen del stream (formato DynamoDB JSON) en un dict"""
+    if not imagen:
+        return None
+    return {k: deserializer.deserialize(v) for k, v in imagen.items()}
+
+
+def imagenes_registro(record):
+    """
+    Imagen anterior y nueva de la reseña según el tipo de evento
+    Returns: (dict o None, dict o None) - (anterior, nueva)
+    """
+    datos = record['dynamodb']
+    anterior = deserializar_imagen(datos.get('OldImage')) if record['eventName'] in ('MODIFY', 'REMOVE') else None
+    nueva = deserializar_imagen(datos.get('NewImage')) if record['eventName'] in ('INSERT', 'MODIFY') else None
+    return anterior, nueva
+
+
+def clave_secuencia(record):
+    """
+    SequenceNumber del registro con ceros a la izquierda (hasta 40 dígitos)
+    para que la comparación como string respete el orden del stream
+    """
+    return record['dynamodb']['SequenceNumber'].zfill(40)
+
+
+def creacion_registro(record):
+    """
+    ApproximateCreationDateTime del registro en segundos epoch. Se compara con
+    sembrado_hasta de los items cargados por DataPoblator: los registros
+    creados hasta ese instante ya están incluidos en los valores sembrados
+    """
+    return int(record['dynamodb']['ApproximateCreationDateTime'])
+
+
+def calcular_promedio(suma, num):
+    """Promedio con 2 decimales; 0 si no hay reseñas"""
+    if num <= 0:
+        return Decimal('0')
+    return (Decimal(suma) / Decimal(num)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -3,6 +3,7 @@ import json
 import uuid
 import boto3
 import logging
+from utils.catalogo import invalidar_catalogo
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -115,6 +116,7 @@ def lambda_handler(event, context):
 
         logger.info(f"Creando local con local_id: {item.get('local_id')}")
         table_locales.put_item(Item=item)
+        invalidar_catalogo()
         return _resp(201, item)
 
     except Exception as e:
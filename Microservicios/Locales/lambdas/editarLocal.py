@@ -1,4 +1,5 @@
 import os, json, boto3, logging
+from utils.catalogo import invalidar_catalogo
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -112,6 +113,7 @@ def lambda_handler(event, context):
             ReturnValues="UPDATED_NEW"
         )
 
+        invalidar_catalogo()
         return _resp(200, {"message": "Local actualizado", "updated": resp.get("Attributes")})
 
     except Exception as e:
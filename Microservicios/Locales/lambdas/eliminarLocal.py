@@ -1,4 +1,5 @@
 import os, json, boto3, logging
+from utils.catalogo import invalidar_catalogo
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,6 +44,7 @@ def lambda_handler(event, context):
         
         # Eliminar el local
         table_locales.delete_item(Key={"local_id": local_id})
+        invalidar_catalogo()
         return _resp(200, {"message": "Local eliminado y gerente actualizado a Cliente"})
         
     except Exception as e:
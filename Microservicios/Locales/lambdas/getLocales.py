@@ -1,14 +1,50 @@
-import os, json, boto3
-
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ.get('TABLE_LOCALES', 'ChinaWok-Locales'))
+import json
+from utils.catalogo import obtener_catalogo, exportar_locales
+from chinawok_shared.pagination import PaginacionError, leer_limite, decodificar_token, codificar_token
 
 def lambda_handler(event, context):
+    """
+    Listado de locales (sin la contraseña del gerente).
+    - sin parámetros: catálogo completo (cacheado en el contenedor)
+    - limit / next_token: página del catálogo ordenada por local_id
+    - exportar=true [&segmentos=N]: scan paralelo por segmentos, sin cache
+    """
+    params = event.get("queryStringParameters") or {}
+
     try:
-        # Realizamos un scan de los locales (página completa)
-        resp = table.scan()
-        items = resp.get("Items", [])
-        return _resp(200, items)
+        if str(params.get("exportar", "")).lower() == "true":
+            try:
+                segmentos = int(params.get("segmentos") or 4)
+            except ValueError:
+                return _resp(400, {"message": "segmentos debe ser un número entero"})
+            locales = exportar_locales(segmentos)
+            return _resp(200, {"locales": locales, "count": len(locales)})
+
+        locales = obtener_catalogo()
+
+        if "limit" not in params and "next_token" not in params:
+            return _resp(200, locales)
+
+        try:
+            limite = leer_limite(params)
+            start_key = decodificar_token(params.get("next_token"))
+        except PaginacionError as e:
+            return _resp(400, {"message": str(e)})
+
+        # El catálogo está ordenado por local_id: la página empieza después del último entregado
+        inicio = 0
+        if start_key:
+            ultimo = start_key.get("local_id", "")
+            inicio = next((i for i, local in enumerate(locales) if local["local_id"] > ultimo), len(locales))
+
+        pagina = locales[inicio:inicio + limite]
+        hay_mas = inicio + limite < len(locales)
+
+        return _resp(200, {
+            "locales": pagina,
+            "count": len(pagina),
+            "next_token": codificar_token({"local_id": pagina[-1]["local_id"]}) if hay_mas else None
+        })
     except Exception as e:
         return _resp(500, {"message": "Error al listar los locales", "error": str(e)})
 
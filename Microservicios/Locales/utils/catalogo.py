@@ -0,0 +1,100 @@
+import os
+import time
+import boto3
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+dynamodb = boto3.resource("dynamodb")
+TABLE_LOCALES = os.environ.get("TABLE_LOCALES", "ChinaWok-Locales")
+table_locales = dynamodb.Table(TABLE_LOCALES)
+
+# El catálogo completo se cachea en el contenedor caliente por poco tiempo.
+# crearLocal, editarLocal y eliminarLocal corren en otras funciones Lambda y
+# solo pueden vaciar su propio cache: los contenedores de getLocales ven los
+# cambios a más tardar cuando vence el TTL
+CATALOGO_TTL_SEGUNDOS = float(os.environ.get("CATALOGO_TTL_SEGUNDOS", "30"))
+
+# Segmentos máximos del scan paralelo de exportación
+MAX_SEGMENTOS = 16
+
+# Atributos públicos del local (nunca la contraseña del gerente)
+PROYECCION_LOCAL = {
+    "ProjectionExpression": "#id, #dir, #tel, #ap, #fin, #ger.#nom, #ger.#cor",
+    "ExpressionAttributeNames": {
+        "#id": "local_id",
+        "#dir": "direccion",
+        "#tel": "telefono",
+        "#ap": "hora_apertura",
+        "#fin": "hora_finalizacion",
+        "#ger": "gerente",
+        "#nom": "nombre",
+        "#cor": "correo"
+    }
+}
+
+_cache = {"expira": 0.0, "locales": None}
+_cache_lock = Lock()
+
+
+def _scan_kwargs():
+    """Parámetros de scan con la proyección pública"""
+    return {
+        "ProjectionExpression": PROYECCION_LOCAL["ProjectionExpression"],
+        "ExpressionAttributeNames": dict(PROYECCION_LOCAL["ExpressionAttributeNames"])
+    }
+
+
+def _escanear_segmento(scan, segmento=None, total_segmentos=None):
+    """Recorre todas las páginas de un scan (o de un segmento del scan)"""
+    kwargs = _scan_kwargs()
+    if total_segmentos:
+        kwargs.update(Segment=segmento, TotalSegments=total_segmentos, TableName=TABLE_LOCALES)
+
+    locales = []
+    while True:
+        response = scan(**kwargs)
+        locales.extend(response.get("Items", []))
+
+        if "LastEvaluatedKey" not in response:
+            return locales
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def exportar_locales(segmentos):
+    """
+    Scan paralelo por segmentos (Segment/TotalSegments) para exportaciones.
+    Usa el cliente (thread-safe) en lugar del recurso Table.
+    """
+    segmentos = max(1, min(int(segmentos), MAX_SEGMENTOS))
+    scan = dynamodb.meta.client.scan
+
+    with ThreadPoolExecutor(max_workers=segmentos) as executor:
+        partes = executor.map(lambda s: _escanear_segmento(scan, s, segmentos), range(segmentos))
+        return [local for parte in partes for local in parte]
+
+
+def obtener_catalogo():
+    """
+    Todos los locales ordenados por local_id. Se sirven desde el cache
+    mientras no venza el TTL (un scan completo por contenedor y TTL)
+    """
+    with _cache_lock:
+        if _cache["locales"] is not None and _cache["expira"] > time.monotonic():
+            print(f"[CACHE] catalogo HIT - locales: {len(_cache['locales'])}")
+            return _cache["locales"]
+
+    locales = sorted(_escanear_segmento(table_locales.scan), key=lambda local: local["local_id"])
+
+    with _cache_lock:
+        _cache.update(expira=time.monotonic() + CATALOGO_TTL_SEGUNDOS, locales=locales)
+    print(f"[CACHE] catalogo MISS - locales: {len(locales)}")
+    return locales
+
+
+def invalidar_catalogo():
+    """
+    Vacía el cache del catálogo en este contenedor. Se llama después de
+    guardar el local; el resto de los contenedores lo recargan al vencer el TTL
+    """
+    with _cache_lock:
+        _cache.update(expira=0.0, locales=None)
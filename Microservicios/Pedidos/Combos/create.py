@@ -3,7 +3,8 @@ import boto3
 import os
 import uuid
 from decimal import Decimal
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
+from utils.validation import compilar_validador, validar
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -29,6 +30,9 @@ COMBO_SCHEMA = {
     "additionalProperties": False
 }
 
+# Validador compilado una sola vez por contenedor
+COMBO_VALIDATOR = compilar_validador(COMBO_SCHEMA)
+
 
 def handler(event, context):
     """
@@ -42,7 +46,7 @@ def handler(event, context):
             body = event.get('body', event)
         
         # Validar schema
-        validate(instance=body, schema=COMBO_SCHEMA)
+        validar(COMBO_VALIDATOR, body)
         
         # Generar combo_id único usando UUID
         body['combo_id'] = str(uuid.uuid4())
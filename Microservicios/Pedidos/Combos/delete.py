@@ -1,6 +1,7 @@
 import json
 import boto3
 import os
+from utils.cache import invalidar_combo
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -68,6 +69,9 @@ def handler(event, context):
             }
         )
         
+        # Invalidar el combo en el cache de datos de referencia
+        invalidar_combo(local_id, combo_id)
+        
         return {
             'statusCode': 200,
             'headers': {
@@ -2,6 +2,7 @@ import json
 import boto3
 import os
 from boto3.dynamodb.conditions import Key
+from chinawok_shared.pagination import PaginacionError, leer_parametros, consultar_pagina
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -15,6 +16,8 @@ def handler(event, context):
     Soporta:
     - GET por local_id y combo_id (específico)
     - GET por local_id (todos los combos de un local)
+      paginado con limit y next_token (opaco)
+    - fields: lista separada por comas de atributos a retornar
     """
     try:
         # Obtener parámetros de query o path
@@ -36,13 +39,30 @@ def handler(event, context):
                 })
             }
         
+        # Parámetros de paginación y proyección
+        try:
+            limite, start_key, proyeccion = leer_parametros(params)
+        except PaginacionError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'error': 'Parámetros inválidos',
+                    'message': str(e)
+                })
+            }
+        
         # Si se proporciona combo_id, obtener un combo específico
         if combo_id:
             response = table.get_item(
                 Key={
                     'local_id': local_id,
                     'combo_id': combo_id
-                }
+                },
+                **proyeccion
             )
             
             if 'Item' not in response:
@@ -70,8 +90,12 @@ def handler(event, context):
         
         # Si solo se proporciona local_id, obtener todos los combos del local
         else:
-            response = table.query(
-                KeyConditionExpression=Key('local_id').eq(local_id)
+            items, next_token = consultar_pagina(
+                table,
+                limite,
+                start_key,
+                KeyConditionExpression=Key('local_id').eq(local_id),
+                **proyeccion
             )
             
             return {
@@ -81,8 +105,9 @@ def handler(event, context):
                     'Access-Control-Allow-Origin': '*'
                 },
                 'body': json.dumps({
-                    'data': response['Items'],
-                    'count': len(response['Items'])
+                    'data': items,
+                    'count': len(items),
+                    'next_token': next_token
                 }, default=str)
             }
             
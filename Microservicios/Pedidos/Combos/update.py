@@ -1,7 +1,9 @@
 import json
 import boto3
 import os
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
+from utils.cache import invalidar_combo
+from utils.validation import compilar_validador, validar
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -26,6 +28,9 @@ COMBO_UPDATE_SCHEMA = {
     "minProperties": 1
 }
 
+# Validador compilado una sola vez por contenedor
+COMBO_UPDATE_VALIDATOR = compilar_validador(COMBO_UPDATE_SCHEMA)
+
 
 def handler(event, context):
     """
@@ -70,7 +75,7 @@ def handler(event, context):
             }
         
         # Validar schema
-        validate(instance=update_data, schema=COMBO_UPDATE_SCHEMA)
+        validar(COMBO_UPDATE_VALIDATOR, update_data)
         
         # Construir expresión de actualización
         update_expression = "SET " + ", ".join([f"#{k} = :{k}" for k in update_data.keys()])
@@ -89,6 +94,9 @@ def handler(event, context):
             ReturnValues="ALL_NEW"
         )
         
+        # Invalidar el combo en el cache de datos de referencia
+        invalidar_combo(local_id, combo_id)
+        
         return {
             'statusCode': 200,
             'headers': {
@@ -2,26 +2,16 @@ import json
 import boto3
 import os
 import uuid
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from botocore.exceptions import ClientError
+from utils.cache import obtener_local, obtener_producto, obtener_combo
+from utils.validation import compilar_validador, validar
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('TABLE_OFERTAS', 'ChinaWok-Ofertas')
 table = dynamodb.Table(table_name)
 
-# Tabla de locales
-locales_table_name = os.environ.get('TABLE_LOCALES', 'ChinaWok-Locales')
-locales_table = dynamodb.Table(locales_table_name)
-
-# Tabla de productos
-productos_table_name = os.environ.get('TABLE_PRODUCTOS', 'ChinaWok-Productos')
-productos_table = dynamodb.Table(productos_table_name)
-
-# Tabla de combos
-combos_table_name = os.environ.get('TABLE_COMBOS', 'ChinaWok-Combos')
-combos_table = dynamodb.Table(combos_table_name)
-
 # Schema de validación (sin oferta_id ya que se genera automáticamente)
 OFERTA_SCHEMA = {
     "$schema": "http://json-schema.org/draft-07/schema#",
@@ -43,6 +33,9 @@ OFERTA_SCHEMA = {
     ]
 }
 
+# Validador compilado una sola vez por contenedor
+OFERTA_VALIDATOR = compilar_validador(OFERTA_SCHEMA)
+
 
 def verificar_local_existe(local_id):
     """
@@ -50,11 +43,7 @@ def verificar_local_existe(local_id):
     Returns: (bool, str) - (éxito, mensaje de error)
     """
     try:
-        response = locales_table.get_item(
-            Key={'local_id': local_id}
-        )
-        
-        if 'Item' not in response:
+        if obtener_local(local_id) is None:
             return False, f"El local '{local_id}' no existe"
         
         return True, None
@@ -69,14 +58,7 @@ def verificar_producto_existe(local_id, producto_nombre):
     Returns: (bool, str) - (éxito, mensaje de error)
     """
     try:
-        response = productos_table.get_item(
-            Key={
-                'local_id': local_id,
-                'nombre': producto_nombre
-            }
-        )
-        
-        if 'Item' not in response:
+        if obtener_producto(local_id, producto_nombre) is None:
             return False, f"El producto '{producto_nombre}' no existe en el local {local_id}"
         
         return True, None
@@ -91,14 +73,7 @@ def verificar_combo_existe(local_id, combo_id):
     Returns: (bool, str) - (éxito, mensaje de error)
     """
     try:
-        response = combos_table.get_item(
-            Key={
-                'local_id': local_id,
-                'combo_id': combo_id
-            }
-        )
-        
-        if 'Item' not in response:
+        if obtener_combo(local_id, combo_id) is None:
             return False, f"El combo '{combo_id}' no existe en el local {local_id}"
         
         return True, None
@@ -119,7 +94,7 @@ def handler(event, context):
             body = event.get('body', event)
         
         # Validar schema
-        validate(instance=body, schema=OFERTA_SCHEMA)
+        validar(OFERTA_VALIDATOR, body)
         
         # Validar que tenga producto_nombre o combo_id
         if 'producto_nombre' not in body and 'combo_id' not in body:
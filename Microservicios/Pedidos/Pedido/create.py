@@ -2,37 +2,36 @@ import json
 import boto3
 import os
 import uuid
-from datetime import datetime, timedelta
-from jsonschema import validate, ValidationError
+from datetime import datetime
+from jsonschema import ValidationError
 from botocore.exceptions import ClientError
 from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from utils.stock import reservar_stock_y_crear_pedido
+from utils.cache import obtener_local
+from utils.batch_lookup import LecturaIncompletaError, es_throttling
+from utils.validation import compilar_validador, validar
+from utils.estado_index import clave_estado_fecha
+from utils.eventos import construir_evento, operacion_put_evento
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('TABLE_PEDIDOS', 'ChinaWok-Pedidos')
 table = dynamodb.Table(table_name)
 
-# Tabla de productos
-productos_table_name = os.environ.get('TABLE_PRODUCTOS', 'ChinaWok-Productos')
-productos_table = dynamodb.Table(productos_table_name)
-
-# Tabla de combos
-combos_table_name = os.environ.get('TABLE_COMBOS', 'ChinaWok-Combos')
-combos_table = dynamodb.Table(combos_table_name)
-
-# Tabla de locales
-locales_table_name = os.environ.get('TABLE_LOCALES', 'ChinaWok-Locales')
-locales_table = dynamodb.Table(locales_table_name)
-
-# Tabla de usuarios
+# Tabla de usuarios (se lee desde el pool de hilos: meta.client es thread-safe,
+# los recursos Table no)
 usuarios_table_name = os.environ.get('TABLE_USUARIOS', 'ChinaWok-Usuarios')
-usuarios_table = dynamodb.Table(usuarios_table_name)
+dynamodb_client = dynamodb.meta.client
 
 # Agregar cliente de EventBridge
 eventbridge = boto3.client('events')
 EVENT_BUS_NAME = os.environ.get('EVENT_BUS_NAME', 'chinawok-pedidos-events')
 
-# Schema de validación (sin estado ni historial_estados en el request)
+# Pool de hilos reutilizado entre invocaciones para las verificaciones en paralelo
+validaciones_executor = ThreadPoolExecutor(max_workers=2)
+
+# Schema de validación (sin estado en el request)
 PEDIDO_SCHEMA = {
     "$schema": "http://json-schema.org/draft-07/schema#",
     "title": "Pedidos",
@@ -86,6 +85,9 @@ PEDIDO_SCHEMA = {
     "additionalProperties": False
 }
 
+# Validador compilado una sola vez por contenedor
+PEDIDO_VALIDATOR = compilar_validador(PEDIDO_SCHEMA)
+
 
 def verificar_local_existe(local_id):
     """
@@ -93,16 +95,14 @@ def verificar_local_existe(local_id):
     Returns: (bool, str) - (éxito, mensaje de error)
     """
     try:
-        response = locales_table.get_item(
-            Key={'local_id': local_id}
-        )
-        
-        if 'Item' not in response:
+        if obtener_local(local_id) is None:
             return False, f"El local '{local_id}' no existe"
         
         return True, None
         
     except ClientError as e:
+        if es_throttling(e):
+            raise LecturaIncompletaError(f"No se pudo leer el local '{local_id}' (throttling)") from e
         return False, f"Error al verificar local: {str(e)}"
 
 
@@ -112,7 +112,8 @@ def verificar_usuario_info_bancaria(usuario_correo):
     Returns: (bool, str) - (éxito, mensaje de error)
     """
     try:
-        response = usuarios_table.get_item(
+        response = dynamodb_client.get_item(
+            TableName=usuarios_table_name,
             Key={'correo': usuario_correo}
         )
         
@@ -134,66 +135,40 @@ def verificar_usuario_info_bancaria(usuario_correo):
         return True, None
         
     except ClientError as e:
+        if es_throttling(e):
+            raise LecturaIncompletaError(f"No se pudo leer el usuario '{usuario_correo}' (throttling)") from e
         return False, f"Error al verificar usuario: {str(e)}"
 
 
-def verificar_productos_stock(local_id, productos):
+def validar_pedido(local_id, usuario_correo):
     """
-    Verifica que los productos existan en el local y tengan stock suficiente
-    Returns: (bool, str) - (éxito, mensaje de error)
+    Ejecuta en paralelo las verificaciones de local y usuario.
+    Los productos y combos se validan al reservar stock en la transacción.
+    El throttling de DynamoDB se propaga como LecturaIncompletaError (503).
+    Los errores se reportan en orden fijo (local, luego usuario) para que la
+    respuesta no dependa de cuál termina primero.
+    Returns: (str, str) - (tipo de error, mensaje de error) o (None, None) si es válido
     """
-    for producto in productos:
-        nombre = producto['nombre']
-        cantidad = producto['cantidad']
-        
-        try:
-            # Obtener producto de DynamoDB
-            response = productos_table.get_item(
-                Key={
-                    'local_id': local_id,
-                    'nombre': nombre
-                }
-            )
-            
-            if 'Item' not in response:
-                return False, f"El producto '{nombre}' no existe en el local {local_id}"
-            
-            producto_db = response['Item']
-            stock_disponible = producto_db.get('stock', 0)
-            
-            if stock_disponible < cantidad:
-                return False, f"Stock insuficiente para '{nombre}'. Disponible: {stock_disponible}, Solicitado: {cantidad}"
-                
-        except ClientError as e:
-            return False, f"Error al verificar producto '{nombre}': {str(e)}"
+    def con_etiqueta(etiqueta, verificacion, *args):
+        exito, error_msg = verificacion(*args)
+        return (None, None) if exito else (etiqueta, error_msg)
     
-    return True, None
-
-
-def verificar_combos(local_id, combos):
-    """
-    Verifica que los combos existan
-    Returns: (bool, str) - (éxito, mensaje de error)
-    """
-    for combo in combos:
-        combo_id = combo['combo_id']
-        
-        try:
-            # Obtener combo de DynamoDB
-            response = combos_table.get_item(
-                Key={
-                    'local_id': local_id,
-                    'combo_id': combo_id
-                }
-            )
-            
-            if 'Item' not in response:
-                return False, f"El combo '{combo_id}' no existe en el local {local_id}"
-                
-        except ClientError as e:
-            return False, f"Error al verificar combo '{combo_id}': {str(e)}"
+    futures = [
+        validaciones_executor.submit(con_etiqueta, 'Error de validación de local', verificar_local_existe, local_id),
+        validaciones_executor.submit(con_etiqueta, 'Error de validación de usuario', verificar_usuario_info_bancaria, usuario_correo)
+    ]
+    
+    try:
+        for future in futures:
+            error, error_msg = future.result()
+            if error:
+                return error, error_msg
+    finally:
+        # Descartar las verificaciones que aún no comenzaron
+        for future in futures:
+            future.cancel()
     
-    return True, None
+    return None, None
 
 
 def convertir_floats_a_decimal(obj):
@@ -235,27 +210,24 @@ def handler(event, context):
         else:
             body = event.get('body', event)
         
-        # Validar schema (sin pedido_id, estado ni historial_estados)
-        validate(instance=body, schema=PEDIDO_SCHEMA)
+        # Validar schema (sin pedido_id ni estado)
+        validar(PEDIDO_VALIDATOR, body)
         
         # Generar pedido_id automáticamente
         body['pedido_id'] = str(uuid.uuid4())
         
         # Inicializar timestamps y estado automáticamente
         hora_inicio = datetime.utcnow()
-        # Estimamos 2-3 segundos para procesamiento (validaciones + EventBridge)
-        hora_fin = hora_inicio + timedelta(seconds=2.5)
         
         body['estado'] = 'procesando'
-        body['historial_estados'] = [
-            {
-                'estado': 'procesando',
-                'hora_inicio': hora_inicio.isoformat() + 'Z',
-                'hora_fin': hora_fin.isoformat() + 'Z',
-                'activo': True,
-                'empleado': None
-            }
-        ]
+        body['created_at'] = hora_inicio.isoformat() + 'Z'
+        # Sort key del GSI por estado; se mantiene sincronizada en cada transición
+        body['estado_created_at'] = clave_estado_fecha(body['estado'], body['created_at'])
+        # Snapshot del estado actual; el historial vive en la tabla de eventos
+        body['estado_desde'] = body['created_at']
+        body['empleado_actual'] = None
+        body['empleados_asignados'] = {}
+        body['version'] = 1
         
         # Validar que tenga productos o combos
         if 'productos' not in body and 'combos' not in body:
@@ -273,9 +245,9 @@ def handler(event, context):
         local_id = body.get('local_id')
         usuario_correo = body.get('usuario_correo')
         
-        # Verificar que el local existe
-        exito, error_msg = verificar_local_existe(local_id)
-        if not exito:
+        # Ejecutar en paralelo todas las verificaciones previas
+        error, error_msg = validar_pedido(local_id, usuario_correo)
+        if error:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -283,14 +255,18 @@ def handler(event, context):
                     'Access-Control-Allow-Origin': '*'
                 },
                 'body': json.dumps({
-                    'error': 'Error de validación de local',
+                    'error': error,
                     'message': error_msg
                 })
             }
         
-        # Verificar que el usuario existe y tiene información bancaria
-        exito, error_msg = verificar_usuario_info_bancaria(usuario_correo)
-        if not exito:
+        # Convertir floats a Decimal para DynamoDB
+        body = convertir_floats_a_decimal(body)
+        
+        # Reservar stock e insertar el pedido y su evento inicial en una sola transacción
+        evento_inicial = construir_evento(body, body['version'], body['estado'], body['created_at'], tipo='creacion')
+        error, error_msg = reservar_stock_y_crear_pedido(table_name, body, [operacion_put_evento(evento_inicial)])
+        if error:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -298,49 +274,11 @@ def handler(event, context):
                     'Access-Control-Allow-Origin': '*'
                 },
                 'body': json.dumps({
-                    'error': 'Error de validación de usuario',
+                    'error': error,
                     'message': error_msg
                 })
             }
         
-        # Verificar productos si existen
-        if 'productos' in body and body['productos']:
-            exito, error_msg = verificar_productos_stock(local_id, body['productos'])
-            if not exito:
-                return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'Error de validación de productos',
-                        'message': error_msg
-                    })
-                }
-        
-        # Verificar combos si existen
-        if 'combos' in body and body['combos']:
-            exito, error_msg = verificar_combos(local_id, body['combos'])
-            if not exito:
-                return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'Error de validación de combos',
-                        'message': error_msg
-                    })
-                }
-        
-        # Convertir floats a Decimal para DynamoDB
-        body = convertir_floats_a_decimal(body)
-        
-        # Insertar en DynamoDB
-        table.put_item(Item=body)
-        
         # Después de crear exitosamente el pedido en DynamoDB
         # Publicar evento a EventBridge
         try:
@@ -390,6 +328,21 @@ def handler(event, context):
             })
         }
         
+    except LecturaIncompletaError as e:
+        # Throttling de DynamoDB: el cliente puede reintentar
+        return {
+            'statusCode': 503,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Retry-After': '1'
+            },
+            'body': json.dumps({
+                'error': 'Servicio temporalmente saturado, intente nuevamente',
+                'message': str(e)
+            })
+        }
+        
     except Exception as e:
         return {
             'statusCode': 500,
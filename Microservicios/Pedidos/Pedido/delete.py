@@ -1,6 +1,9 @@
 import json
 import boto3
 import os
+from botocore.exceptions import ClientError
+from utils.stock import agrupar_cantidades, devolver_stock
+from utils.eventos import eliminar_eventos
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -60,13 +63,40 @@ def handler(event, context):
                 })
             }
         
-        # Eliminar el pedido
-        table.delete_item(
-            Key={
-                'local_id': local_id,
-                'pedido_id': pedido_id
+        # Eliminar el pedido (condicional para que solo un borrado devuelva el stock)
+        try:
+            response = table.delete_item(
+                Key={
+                    'local_id': local_id,
+                    'pedido_id': pedido_id
+                },
+                ConditionExpression='attribute_exists(pedido_id)',
+                ReturnValues='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'error': 'Pedido no encontrado'
+                })
             }
-        )
+        
+        # Devolver el stock reservado si el pedido se cancela antes de entregarse.
+        # Solo los pedidos con stock_reservado descontaron stock al crearse
+        pedido = response.get('Attributes', {})
+        if (pedido.get('stock_reservado')
+                and pedido.get('estado') != 'recibido'
+                and not pedido.get('stock_devuelto')):
+            devolver_stock(local_id, agrupar_cantidades(pedido.get('productos')))
+        
+        # El historial del pedido no tiene sentido sin el pedido
+        eliminar_eventos(local_id, pedido_id)
         
         return {
             'statusCode': 200,
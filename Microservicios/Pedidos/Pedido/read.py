@@ -2,6 +2,9 @@ import json
 import boto3
 import os
 from boto3.dynamodb.conditions import Key
+from chinawok_shared.pagination import PaginacionError, leer_parametros, consultar_pagina
+from utils.estado_index import PEDIDOS_ESTADO_INDEX, ESTADOS_PEDIDO
+from utils.eventos import expandir_historial
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -15,6 +18,12 @@ def handler(event, context):
     Soporta:
     - GET por local_id y pedido_id (específico)
     - GET por local_id (todos los pedidos de un local)
+      paginado con limit y next_token (opaco)
+    - GET por local_id y estado (usa el GSI local_id + estado#created_at),
+      ordenado por fecha de creación; orden=desc para los más recientes primero
+    - fields: lista separada por comas de atributos a retornar
+    - historial=true (con pedido_id): incluye historial_estados armado desde
+      la tabla de eventos
     """
     try:
         # Obtener parámetros de query o path
@@ -23,6 +32,9 @@ def handler(event, context):
         
         local_id = params.get('local_id') or path_params.get('local_id')
         pedido_id = params.get('pedido_id') or path_params.get('pedido_id')
+        estado = params.get('estado')
+        orden = params.get('orden', 'asc')
+        incluir_historial = params.get('historial') == 'true'
         
         if not local_id:
             return {
@@ -36,13 +48,34 @@ def handler(event, context):
                 })
             }
         
+        # Parámetros de paginación y proyección
+        try:
+            limite, start_key, proyeccion = leer_parametros(params)
+            if estado and estado not in ESTADOS_PEDIDO:
+                raise PaginacionError(f"estado debe ser uno de: {', '.join(ESTADOS_PEDIDO)}")
+            if orden not in ('asc', 'desc'):
+                raise PaginacionError("orden debe ser 'asc' o 'desc'")
+        except PaginacionError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'error': 'Parámetros inválidos',
+                    'message': str(e)
+                })
+            }
+        
         # Si se proporciona pedido_id, obtener un pedido específico
         if pedido_id:
             response = table.get_item(
                 Key={
                     'local_id': local_id,
                     'pedido_id': pedido_id
-                }
+                },
+                **proyeccion
             )
             
             if 'Item' not in response:
@@ -57,6 +90,39 @@ def handler(event, context):
                     })
                 }
             
+            pedido = response['Item']
+            
+            # Expandir el historial desde la tabla de eventos solo si se pide
+            if incluir_historial:
+                pedido['historial_estados'] = expandir_historial(
+                    local_id,
+                    pedido_id,
+                    pedido.get('historial_estados')
+                )
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'data': pedido
+                }, default=str)
+            }
+        
+        # Si se proporciona estado, consultar el GSI ordenado por fecha de creación
+        elif estado:
+            items, next_token = consultar_pagina(
+                table,
+                limite,
+                start_key,
+                IndexName=PEDIDOS_ESTADO_INDEX,
+                KeyConditionExpression=Key('local_id').eq(local_id) & Key('estado_created_at').begins_with(f"{estado}#"),
+                ScanIndexForward=(orden == 'asc'),
+                **proyeccion
+            )
+            
             return {
                 'statusCode': 200,
                 'headers': {
@@ -64,14 +130,20 @@ def handler(event, context):
                     'Access-Control-Allow-Origin': '*'
                 },
                 'body': json.dumps({
-                    'data': response['Item']
+                    'data': items,
+                    'count': len(items),
+                    'next_token': next_token
                 }, default=str)
             }
         
         # Si solo se proporciona local_id, obtener todos los pedidos del local
         else:
-            response = table.query(
-                KeyConditionExpression=Key('local_id').eq(local_id)
+            items, next_token = consultar_pagina(
+                table,
+                limite,
+                start_key,
+                KeyConditionExpression=Key('local_id').eq(local_id),
+                **proyeccion
             )
             
             return {
@@ -81,8 +153,9 @@ def handler(event, context):
                     'Access-Control-Allow-Origin': '*'
                 },
                 'body': json.dumps({
-                    'data': response['Items'],
-                    'count': len(response['Items'])
+                    'data': items,
+                    'count': len(items),
+                    'next_token': next_token
                 }, default=str)
             }
             
@@ -1,35 +1,26 @@
 import json
 import boto3
 import os
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from botocore.exceptions import ClientError
 from decimal import Decimal
+from datetime import datetime
+from utils.batch_lookup import obtener_productos_y_combos, LecturaIncompletaError
+from utils.cache import obtener_local
+from utils.stock import operaciones_ajuste_stock, ajustar_stock_y_actualizar_pedido
+from utils.validation import compilar_validador, validar
+from utils.estado_index import clave_estado_fecha, obtener_fecha_creacion
+from utils.eventos import construir_evento, operacion_put_evento
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('TABLE_PEDIDOS', 'ChinaWok-Pedidos')
 table = dynamodb.Table(table_name)
 
-# Tabla de productos
-productos_table_name = os.environ.get('TABLE_PRODUCTOS', 'ChinaWok-Productos')
-productos_table = dynamodb.Table(productos_table_name)
-
-# Tabla de combos
-combos_table_name = os.environ.get('TABLE_COMBOS', 'ChinaWok-Combos')
-combos_table = dynamodb.Table(combos_table_name)
-
-# Tabla de locales
-locales_table_name = os.environ.get('TABLE_LOCALES', 'ChinaWok-Locales')
-locales_table = dynamodb.Table(locales_table_name)
-
 # Tabla de usuarios
 usuarios_table_name = os.environ.get('TABLE_USUARIOS', 'ChinaWok-Usuarios')
 usuarios_table = dynamodb.Table(usuarios_table_name)
 
-# Tabla de empleados
-empleados_table_name = os.environ.get('TABLE_EMPLEADOS', 'ChinaWok-Empleados')
-empleados_table = dynamodb.Table(empleados_table_name)
-
 # Schema de validación (sin requerir todas las propiedades para update parcial)
 PEDIDO_UPDATE_SCHEMA = {
     "$schema": "http://json-schema.org/draft-07/schema#",
@@ -71,36 +62,15 @@ PEDIDO_UPDATE_SCHEMA = {
         "estado": {
             "type": "string",
             "enum": ["procesando", "cocinando", "empacando", "enviando", "recibido"]
-        },
-        "historial_estados": {
-            "type": "array",
-            "items": {
-                "type": "object",
-                "properties": {
-                    "estado": {
-                        "type": "string",
-                        "enum": ["procesando", "cocinando", "empacando", "enviando", "recibido"]
-                    },
-                    "hora_inicio": {"type": "string", "format": "date-time"},
-                    "hora_fin": {"type": "string", "format": "date-time"},
-                    "activo": {"type": "boolean"},
-                    "empleado": {
-                        "type": ["object", "null"],
-                        "properties": {
-                            "dni": {"type": "string"}
-                        },
-                        "required": ["dni"]
-                    }
-                },
-                "required": ["estado", "hora_inicio", "hora_fin", "activo"]
-            },
-            "minItems": 1
         }
     },
     "additionalProperties": False,
     "minProperties": 1
 }
 
+# Validador compilado una sola vez por contenedor
+PEDIDO_UPDATE_VALIDATOR = compilar_validador(PEDIDO_UPDATE_SCHEMA)
+
 
 def verificar_local_existe(local_id):
     """
@@ -108,11 +78,7 @@ def verificar_local_existe(local_id):
     Returns: (bool, str) - (éxito, mensaje de error)
     """
     try:
-        response = locales_table.get_item(
-            Key={'local_id': local_id}
-        )
-        
-        if 'Item' not in response:
+        if obtener_local(local_id) is None:
             return False, f"El local '{local_id}' no existe"
         
         return True, None
@@ -152,40 +118,35 @@ def verificar_usuario_info_bancaria(usuario_correo):
         return False, f"Error al verificar usuario: {str(e)}"
 
 
-def verificar_productos_stock(local_id, productos):
+def cargar_productos_y_combos(local_id, productos, combos):
+    """
+    Obtiene en un solo BatchGetItem todos los productos y combos del pedido.
+    LecturaIncompletaError (throttling) se propaga para responder 503.
+    Returns: (dict, dict, str) - (productos por nombre, combos por id, mensaje de error)
+    """
+    try:
+        productos_db, combos_db = obtener_productos_y_combos(local_id, productos, combos)
+        return productos_db, combos_db, None
+    except ClientError as e:
+        return None, None, f"Error al verificar productos y combos: {str(e)}"
+
+
+def verificar_productos_existen(local_id, productos, productos_db):
     """
-    Verifica que los productos existan en el local y tengan stock suficiente
+    Verifica que los productos existan en el local. El stock se valida al
+    reservar la diferencia en la transacción del update.
     Returns: (bool, str) - (éxito, mensaje de error)
     """
     for producto in productos:
         nombre = producto['nombre']
-        cantidad = producto['cantidad']
         
-        try:
-            # Obtener producto de DynamoDB
-            response = productos_table.get_item(
-                Key={
-                    'local_id': local_id,
-                    'nombre': nombre
-                }
-            )
-            
-            if 'Item' not in response:
-                return False, f"El producto '{nombre}' no existe en el local {local_id}"
-            
-            producto_db = response['Item']
-            stock_disponible = producto_db.get('stock', 0)
-            
-            if stock_disponible < cantidad:
-                return False, f"Stock insuficiente para '{nombre}'. Disponible: {stock_disponible}, Solicitado: {cantidad}"
-                
-        except ClientError as e:
-            return False, f"Error al verificar producto '{nombre}': {str(e)}"
+        if nombre not in productos_db:
+            return False, f"El producto '{nombre}' no existe en el local {local_id}"
     
     return True, None
 
 
-def verificar_combos(local_id, combos):
+def verificar_combos(local_id, combos, combos_db):
     """
     Verifica que los combos existan
     Returns: (bool, str) - (éxito, mensaje de error)
@@ -193,88 +154,12 @@ def verificar_combos(local_id, combos):
     for combo in combos:
         combo_id = combo['combo_id']
         
-        try:
-            # Obtener combo de DynamoDB
-            response = combos_table.get_item(
-                Key={
-                    'local_id': local_id,
-                    'combo_id': combo_id
-                }
-            )
-            
-            if 'Item' not in response:
-                return False, f"El combo '{combo_id}' no existe en el local {local_id}"
-                
-        except ClientError as e:
-            return False, f"Error al verificar combo '{combo_id}': {str(e)}"
+        if combo_id not in combos_db:
+            return False, f"El combo '{combo_id}' no existe en el local {local_id}"
     
     return True, None
 
 
-def enriquecer_empleados_historial(local_id, historial_estados):
-    """
-    Completa la información de los empleados en el historial consultando la BD.
-    Solo requiere el DNI en el request, el resto se obtiene de la BD.
-    Returns: (historial_enriquecido, error_msg) - (historial completo o None, mensaje de error o None)
-    """
-    historial_enriquecido = []
-    
-    for estado_item in historial_estados:
-        # Hacer una copia del estado actual
-        estado_enriquecido = dict(estado_item)
-        empleado = estado_item.get('empleado')
-        
-        # Si el empleado es None o null, mantenerlo así
-        if not empleado:
-            historial_enriquecido.append(estado_enriquecido)
-            continue
-        
-        dni = empleado.get('dni')
-        if not dni:
-            historial_enriquecido.append(estado_enriquecido)
-            continue
-        
-        try:
-            # Obtener empleado completo de DynamoDB
-            response = empleados_table.get_item(
-                Key={
-                    'local_id': local_id,
-                    'dni': dni
-                }
-            )
-            
-            if 'Item' not in response:
-                return None, f"El empleado con DNI '{dni}' no existe en el local {local_id}"
-            
-            empleado_db = response['Item']
-            
-            # Construir objeto empleado completo desde la BD
-            # El esquema de empleados tiene 'nombre', 'apellido' y 'role' (no 'rol')
-            nombre = empleado_db.get('nombre', '')
-            apellido = empleado_db.get('apellido', '')
-            nombre_completo = f"{nombre} {apellido}".strip()
-            
-            # Mapear 'role' de BD a 'rol' para el pedido (y convertir a minúsculas)
-            role_bd = empleado_db.get('role', '')
-            rol_pedido = role_bd.lower() if role_bd else ''
-            
-            estado_enriquecido['empleado'] = {
-                'dni': dni,
-                'nombre_completo': nombre_completo,
-                'rol': rol_pedido,
-                'calificacion_prom': float(empleado_db.get('calificacion_prom', 0))
-            }
-            
-            historial_enriquecido.append(estado_enriquecido)
-                
-        except ClientError as e:
-            return None, f"Error al obtener empleado '{dni}': {str(e)}"
-        except (ValueError, TypeError) as e:
-            return None, f"Error al procesar datos del empleado '{dni}': {str(e)}"
-    
-    return historial_enriquecido, None
-
-
 def convertir_floats_a_decimal(obj):
     """
     Convierte recursivamente todos los floats a Decimal para DynamoDB
@@ -346,7 +231,7 @@ def handler(event, context):
             }
         
         # Validar schema
-        validate(instance=update_data, schema=PEDIDO_UPDATE_SCHEMA)
+        validar(PEDIDO_UPDATE_VALIDATOR, update_data)
         
         # Obtener el pedido actual para verificaciones
         try:
@@ -415,9 +300,48 @@ def handler(event, context):
                 })
             }
         
+        # Cambiar productos o combos ajusta la reserva de stock; no se permite
+        # en pedidos ya entregados o cancelados (su stock ya se consumió o devolvió)
+        cambia_productos = 'productos' in update_data or 'combos' in update_data
+        if cambia_productos and (pedido.get('estado') == 'recibido' or pedido.get('stock_devuelto')):
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'error': 'Error de validación de productos',
+                    'message': 'No se pueden modificar los productos ni los combos de un pedido entregado o cancelado'
+                })
+            }
+        
+        # Obtener en un solo lote los productos nuevos y los anteriores
+        # (a estos últimos se les devuelve la diferencia) y los combos
+        productos_a_cargar = list(update_data.get('productos') or [])
+        if 'productos' in update_data:
+            productos_a_cargar += pedido.get('productos') or []
+        productos_db, combos_db, error_msg = cargar_productos_y_combos(
+            local_id,
+            productos_a_cargar,
+            update_data.get('combos') or []
+        )
+        if error_msg:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'error': 'Error de validación de productos',
+                    'message': error_msg
+                })
+            }
+
         # Verificar productos si se están actualizando
         if 'productos' in update_data and update_data['productos']:
-            exito, error_msg = verificar_productos_stock(local_id, update_data['productos'])
+            exito, error_msg = verificar_productos_existen(local_id, update_data['productos'], productos_db)
             if not exito:
                 return {
                     'statusCode': 400,
@@ -433,7 +357,7 @@ def handler(event, context):
         
         # Verificar combos si se están actualizando
         if 'combos' in update_data and update_data['combos']:
-            exito, error_msg = verificar_combos(local_id, update_data['combos'])
+            exito, error_msg = verificar_combos(local_id, update_data['combos'], combos_db)
             if not exito:
                 return {
                     'statusCode': 400,
@@ -447,23 +371,30 @@ def handler(event, context):
                     })
                 }
         
-        # Enriquecer empleados en historial_estados si se está actualizando
-        if 'historial_estados' in update_data and update_data['historial_estados']:
-            historial_enriquecido, error_msg = enriquecer_empleados_historial(local_id, update_data['historial_estados'])
-            if historial_enriquecido is None:
-                return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'Error al enriquecer datos de empleados',
-                        'message': error_msg
-                    })
-                }
-            # Reemplazar con el historial enriquecido
-            update_data['historial_estados'] = historial_enriquecido
+        # Operaciones que ajustan la reserva de stock a los productos nuevos
+        operaciones_stock = None
+        if cambia_productos:
+            operaciones_stock = operaciones_ajuste_stock(
+                pedido,
+                update_data.get('productos'),
+                update_data.get('combos'),
+                productos_db
+            )
+            if 'productos' in update_data:
+                update_data['stock_reservado'] = True
+        
+        # Un cambio de estado actualiza el snapshot y se registra como evento
+        cambia_estado = 'estado' in update_data and update_data['estado'] != pedido.get('estado')
+        version_nueva = pedido.get('version', 0) + 1
+        if cambia_estado:
+            ahora = datetime.utcnow().isoformat() + 'Z'
+            # Mantener sincronizada la sort key del GSI por estado
+            update_data['estado_created_at'] = clave_estado_fecha(
+                update_data['estado'],
+                obtener_fecha_creacion(pedido)
+            )
+            update_data['estado_desde'] = ahora
+            update_data['empleado_actual'] = None
         
         # Convertir floats a Decimal para DynamoDB
         update_data = convertir_floats_a_decimal(update_data)
@@ -473,20 +404,74 @@ def handler(event, context):
         expression_attribute_names = {f"#{k}": k for k in update_data.keys()}
         expression_attribute_values = {f":{k}": v for k, v in update_data.items()}
         
-        # Actualizar en DynamoDB
-        response = table.update_item(
-            Key={
+        # Control de concurrencia optimista con el workflow (atributo version)
+        update_expression += ", #version = :version_nueva"
+        expression_attribute_names['#version'] = 'version'
+        expression_attribute_values[':version_nueva'] = version_nueva
+        if 'version' in pedido:
+            condition_expression = "#version = :version_leida"
+            expression_attribute_values[':version_leida'] = pedido['version']
+        else:
+            condition_expression = "attribute_not_exists(#version)"
+        
+        update_kwargs = {
+            'Key': {
                 'local_id': local_id,
                 'pedido_id': pedido_id
             },
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_attribute_names,
-            ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="ALL_NEW"
-        )
+            'UpdateExpression': update_expression,
+            'ConditionExpression': condition_expression,
+            'ExpressionAttributeNames': expression_attribute_names,
+            'ExpressionAttributeValues': expression_attribute_values
+        }
+        
+        # Actualizar en DynamoDB
+        try:
+            operaciones_pedido = [{'Update': {'TableName': table_name, **update_kwargs}}]
+            if cambia_estado:
+                evento = construir_evento(pedido, version_nueva, update_data['estado'], ahora, tipo='actualizacion')
+                operaciones_pedido.append(operacion_put_evento(evento))
+            
+            if operaciones_stock is not None:
+                # Ajuste de stock, snapshot y evento en una sola transacción
+                error, error_msg = ajustar_stock_y_actualizar_pedido(local_id, operaciones_stock, operaciones_pedido)
+                if error:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({
+                            'error': error,
+                            'message': error_msg
+                        })
+                    }
+                pedido_actualizado = {**pedido, **update_data, 'version': version_nueva}
+            elif cambia_estado:
+                # Snapshot y evento en una sola transacción
+                dynamodb.meta.client.transact_write_items(TransactItems=operaciones_pedido)
+                pedido_actualizado = {**pedido, **update_data, 'version': version_nueva}
+            else:
+                response = table.update_item(ReturnValues="ALL_NEW", **update_kwargs)
+                pedido_actualizado = response['Attributes']
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('ConditionalCheckFailedException', 'TransactionCanceledException'):
+                return {
+                    'statusCode': 409,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'error': 'Conflicto de concurrencia',
+                        'message': 'El pedido fue modificado por otro proceso, vuelva a intentarlo'
+                    })
+                }
+            raise
         
         # Convertir Decimal a float para la respuesta JSON
-        data_respuesta = convertir_decimal_a_float(response['Attributes'])
+        data_respuesta = convertir_decimal_a_float(pedido_actualizado)
         
         return {
             'statusCode': 200,
@@ -513,6 +498,21 @@ def handler(event, context):
             })
         }
         
+    except LecturaIncompletaError as e:
+        # Throttling de DynamoDB: el cliente puede reintentar
+        return {
+            'statusCode': 503,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Retry-After': '1'
+            },
+            'body': json.dumps({
+                'error': 'Servicio temporalmente saturado, intente nuevamente',
+                'message': str(e)
+            })
+        }
+        
     except Exception as e:
         return {
             'statusCode': 500,
@@ -2,8 +2,9 @@ import json
 import boto3
 import os
 from decimal import Decimal
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from botocore.exceptions import ClientError
+from utils.validation import compilar_validador, validar
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -43,6 +44,9 @@ PRODUCTO_SCHEMA = {
     "additionalProperties": False
 }
 
+# Validador compilado una sola vez por contenedor
+PRODUCTO_VALIDATOR = compilar_validador(PRODUCTO_SCHEMA)
+
 
 def convertir_floats_a_decimal(obj):
     """
@@ -69,7 +73,7 @@ def handler(event, context):
             body = event.get('body', event)
         
         # Validar schema
-        validate(instance=body, schema=PRODUCTO_SCHEMA)
+        validar(PRODUCTO_VALIDATOR, body)
         
         local_id = body.get('local_id')
         nombre = body.get('nombre')
@@ -1,6 +1,7 @@
 import json
 import boto3
 import os
+from utils.cache import invalidar_producto
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -68,6 +69,9 @@ def handler(event, context):
             }
         )
         
+        # Invalidar el producto en el cache de datos de referencia
+        invalidar_producto(local_id, nombre)
+        
         return {
             'statusCode': 200,
             'headers': {
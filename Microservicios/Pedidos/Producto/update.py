@@ -2,7 +2,9 @@ import json
 import boto3
 import os
 from decimal import Decimal
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
+from utils.cache import invalidar_producto
+from utils.validation import compilar_validador, validar
 
 # Cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -40,6 +42,9 @@ PRODUCTO_UPDATE_SCHEMA = {
     "minProperties": 1
 }
 
+# Validador compilado una sola vez por contenedor
+PRODUCTO_UPDATE_VALIDATOR = compilar_validador(PRODUCTO_UPDATE_SCHEMA)
+
 
 def convertir_floats_a_decimal(obj):
     """
@@ -97,7 +102,7 @@ def handler(event, context):
             }
         
         # Validar schema
-        validate(instance=update_data, schema=PRODUCTO_UPDATE_SCHEMA)
+        validar(PRODUCTO_UPDATE_VALIDATOR, update_data)
         
         # Verificar que el producto existe antes de actualizar
         existing_product = table.get_item(
@@ -140,6 +145,9 @@ def handler(event, context):
             ReturnValues="ALL_NEW"
         )
         
+        # Invalidar el producto en el cache de datos de referencia
+        invalidar_producto(local_id, nombre)
+        
         return {
             'statusCode': 200,
             'headers': {
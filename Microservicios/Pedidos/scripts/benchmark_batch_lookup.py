@@ -0,0 +1,133 @@
+"""
+Micro-benchmark: lectura de los productos de un pedido con un GetItem por
+línea (implementación anterior) vs. un BatchGetItem paginado
+(utils.batch_lookup), con p50 / p99 por tamaño de carrito.
+
+Corre contra un DynamoDB local (DynamoDB Local en Docker:
+`docker run -p 8000:8000 amazon/dynamodb-local`), nunca contra las tablas
+reales: crea sus propias tablas de productos y combos, las llena con
+--productos productos y las borra al terminar (salvo --conservar).
+El endpoint se toma de AWS_ENDPOINT_URL_DYNAMODB (por defecto localhost:8000).
+
+Uso (desde Microservicios/Pedidos):
+    python scripts/benchmark_batch_lookup.py --carritos 1 3 6 12 25 50 --repeticiones 200
+"""
+import argparse
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# DynamoDB Local acepta cualquier credencial; las tablas son propias del benchmark
+os.environ.setdefault('AWS_ENDPOINT_URL_DYNAMODB', 'http://localhost:8000')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+os.environ.setdefault('TABLE_PRODUCTOS', 'ChinaWok-Productos-Benchmark')
+os.environ.setdefault('TABLE_COMBOS', 'ChinaWok-Combos-Benchmark')
+
+from utils.batch_lookup import dynamodb, obtener_productos_y_combos, productos_table_name, combos_table_name
+
+LOCAL_ID = 'LOCAL-BENCH'
+
+
+def crear_tabla(nombre, sort_key):
+    tabla = dynamodb.create_table(
+        TableName=nombre,
+        KeySchema=[
+            {'AttributeName': 'local_id', 'KeyType': 'HASH'},
+            {'AttributeName': sort_key, 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'local_id', 'AttributeType': 'S'},
+            {'AttributeName': sort_key, 'AttributeType': 'S'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    tabla.wait_until_exists()
+    return tabla
+
+
+def preparar_tablas(num_productos):
+    """Crea las tablas del benchmark y carga los productos del local"""
+    productos_table = crear_tabla(productos_table_name, 'nombre')
+    crear_tabla(combos_table_name, 'combo_id')
+
+    with productos_table.batch_writer() as batch:
+        for i in range(num_productos):
+            batch.put_item(Item={'local_id': LOCAL_ID, 'nombre': f'Producto {i:04d}', 'stock': 1000, 'precio': 10})
+    return productos_table
+
+
+def borrar_tablas():
+    for nombre in (productos_table_name, combos_table_name):
+        dynamodb.Table(nombre).delete()
+
+
+def leer_uno_por_uno(productos_table, productos):
+    """Implementación anterior: un GetItem por producto"""
+    return {
+        p['nombre']: productos_table.get_item(Key={'local_id': LOCAL_ID, 'nombre': p['nombre']}).get('Item')
+        for p in productos
+    }
+
+
+def leer_en_lote(productos_table, productos):
+    productos_db, _ = obtener_productos_y_combos(LOCAL_ID, productos, [])
+    return productos_db
+
+
+def percentil(tiempos, p):
+    """Percentil por rango más cercano sobre tiempos ya ordenados"""
+    return tiempos[min(len(tiempos) - 1, int(len(tiempos) * p / 100))]
+
+
+def medir(funcion, productos_table, carrito, num_productos, repeticiones):
+    """p50 y p99 (ms) de `repeticiones` carritos aleatorios de `carrito` líneas"""
+    tiempos = []
+    for _ in range(repeticiones):
+        productos = [{'nombre': f'Producto {i:04d}', 'cantidad': 1} for i in random.sample(range(num_productos), carrito)]
+        inicio = time.perf_counter()
+        funcion(productos_table, productos)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tiempos.sort()
+    return percentil(tiempos, 50), percentil(tiempos, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara GetItem por línea vs BatchGetItem contra DynamoDB local')
+    parser.add_argument('--carritos', type=int, nargs='+', default=[1, 3, 6, 12, 25, 50],
+                        help='Tamaños de carrito (líneas por pedido) a medir')
+    parser.add_argument('--productos', type=int, default=200, help='Productos cargados en el local')
+    parser.add_argument('--repeticiones', type=int, default=200, help='Carritos por tamaño (>= 100 para un p99 útil)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--conservar', action='store_true', help='No borrar las tablas del benchmark al terminar')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    carritos = sorted(c for c in args.carritos if 0 < c <= args.productos)
+    print(f"📊 DynamoDB en {os.environ['AWS_ENDPOINT_URL_DYNAMODB']}, {args.productos} productos, "
+          f"{args.repeticiones} carritos por tamaño")
+
+    productos_table = preparar_tablas(args.productos)
+    try:
+        # Calentar conexiones antes de medir
+        leer_en_lote(productos_table, [{'nombre': 'Producto 0000', 'cantidad': 1}])
+
+        print(f"\n   {'carrito':>7} | {'GetItem x N p50':>15} {'p99':>8} | {'BatchGetItem p50':>16} {'p99':>8} | {'p50 x':>6}")
+        for carrito in carritos:
+            antes_p50, antes_p99 = medir(leer_uno_por_uno, productos_table, carrito, args.productos, args.repeticiones)
+            lote_p50, lote_p99 = medir(leer_en_lote, productos_table, carrito, args.productos, args.repeticiones)
+            print(f"   {carrito:>7} | {antes_p50:12.1f} ms {antes_p99:5.1f} ms | {lote_p50:13.1f} ms {lote_p99:5.1f} ms | "
+                  f"{antes_p50 / lote_p50:5.1f}x")
+    finally:
+        if args.conservar:
+            print(f"\n✅ Tablas conservadas: {productos_table_name}, {combos_table_name}")
+        else:
+            borrar_tablas()
+
+
+if __name__ == "__main__":
+    main()
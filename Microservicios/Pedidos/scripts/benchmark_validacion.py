@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: costo de validar el body de un pedido con
+jsonschema.validate (recompila el schema en cada llamada, como antes) vs.
+el validador compilado una vez por contenedor (utils.validation).
+
+No accede a AWS: solo importa los schemas de los handlers.
+
+Uso (desde Microservicios/Pedidos):
+    python scripts/benchmark_validacion.py --iteraciones 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# Los handlers crean sus recursos boto3 al importarse (sin llamadas de red)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from jsonschema import validate, FormatChecker
+from utils.validation import compilar_validador, validar
+from Pedido.create import PEDIDO_SCHEMA
+
+PEDIDO_EJEMPLO = {
+    "local_id": "LOCAL-001",
+    "usuario_correo": "cliente@chinawok.pe",
+    "direccion": "Av. Siempre Viva 742",
+    "costo": 45.5,
+    "productos": [{"nombre": f"Producto {i}", "cantidad": 1} for i in range(10)],
+    "combos": [{"combo_id": "COMBO-001", "cantidad": 2}],
+    "fecha_entrega_aproximada": "2025-01-01T12:00:00Z"
+}
+
+
+def medir(nombre, funcion, iteraciones):
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion()
+    total = time.perf_counter() - inicio
+    print(f"   {nombre:<28} {total / iteraciones * 1e6:9.1f} µs/validación")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara validate() por request vs validador precompilado')
+    parser.add_argument('--iteraciones', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"📊 {args.iteraciones} validaciones del schema de pedidos")
+
+    inicio = time.perf_counter()
+    validador = compilar_validador(PEDIDO_SCHEMA)
+    print(f"   {'compilación (una vez)':<28} {(time.perf_counter() - inicio) * 1e6:9.1f} µs")
+
+    antes = medir('jsonschema.validate', lambda: validate(PEDIDO_EJEMPLO, PEDIDO_SCHEMA, format_checker=FormatChecker()), args.iteraciones)
+    despues = medir('validador compilado', lambda: validar(validador, PEDIDO_EJEMPLO), args.iteraciones)
+    print(f"\n⚡ Aceleración: {antes / despues:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import time
+import random
+import boto3
+from botocore.exceptions import ClientError
+
+# Cliente DynamoDB compartido
+dynamodb = boto3.resource('dynamodb')
+
+productos_table_name = os.environ.get('TABLE_PRODUCTOS', 'ChinaWok-Productos')
+combos_table_name = os.environ.get('TABLE_COMBOS', 'ChinaWok-Combos')
+
+# Límite de claves por llamada a BatchGetItem
+MAX_CLAVES_POR_LOTE = 100
+MAX_REINTENTOS = 5
+
+# Errores de capacidad que botocore devuelve tras agotar sus propios reintentos
+CODIGOS_THROTTLING = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+}
+
+
+class LecturaIncompletaError(Exception):
+    """
+    DynamoDB siguió devolviendo UnprocessedKeys tras agotar los reintentos
+    (throttling). Es transitorio: los handlers lo traducen a 503 para que el
+    cliente reintente.
+    """
+
+
+def es_throttling(error):
+    """True si el ClientError es de capacidad (transitorio) y no de datos"""
+    return isinstance(error, ClientError) and error.response['Error']['Code'] in CODIGOS_THROTTLING
+
+
+def _clave_hashable(key):
+    """Convierte un dict de clave en una tupla ordenada para usarla como índice"""
+    return tuple(sorted(key.items()))
+
+
+def batch_get_items(claves_por_tabla, max_reintentos=MAX_REINTENTOS):
+    """
+    Obtiene en lote los items de varias tablas con BatchGetItem.
+    Divide las claves en páginas de 100 y reintenta las UnprocessedKeys
+    con backoff exponencial.
+
+    Args:
+        claves_por_tabla: dict {nombre_tabla: [key, ...]}
+
+    Returns:
+        dict {nombre_tabla: {clave_tupla: item}}
+    """
+    resultado = {tabla: {} for tabla in claves_por_tabla}
+
+    # Aplanar y deduplicar las claves manteniendo el orden
+    pendientes = []
+    vistos = set()
+    for tabla, claves in claves_por_tabla.items():
+        for key in claves:
+            marca = (tabla, _clave_hashable(key))
+            if marca not in vistos:
+                vistos.add(marca)
+                pendientes.append((tabla, key))
+
+    for inicio in range(0, len(pendientes), MAX_CLAVES_POR_LOTE):
+        request_items = {}
+        for tabla, key in pendientes[inicio:inicio + MAX_CLAVES_POR_LOTE]:
+            request_items.setdefault(tabla, {'Keys': []})['Keys'].append(key)
+
+        intento = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+
+            for tabla, items in response.get('Responses', {}).items():
+                for item in items:
+                    # Reconstruir la clave con los mismos atributos solicitados
+                    atributos = claves_por_tabla[tabla][0].keys()
+                    key = {attr: item[attr] for attr in atributos}
+                    resultado[tabla][_clave_hashable(key)] = item
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                intento += 1
+                if intento > max_reintentos:
+                    raise LecturaIncompletaError('No se pudieron obtener todos los items tras varios reintentos (UnprocessedKeys)')
+                time.sleep((2 ** intento) * 0.05 + random.uniform(0, 0.05))
+
+    return resultado
+
+
+def obtener_productos_y_combos(local_id, productos, combos):
+    """
+    Obtiene en una sola llamada todos los productos y combos de un pedido
+
+    Returns:
+        (dict, dict) - (nombre -> producto, combo_id -> combo)
+    """
+    claves = {}
+    if productos:
+        claves[productos_table_name] = [
+            {'local_id': local_id, 'nombre': p['nombre']} for p in productos
+        ]
+    if combos:
+        claves[combos_table_name] = [
+            {'local_id': local_id, 'combo_id': c['combo_id']} for c in combos
+        ]
+
+    if not claves:
+        return {}, {}
+
+    resultado = batch_get_items(claves)
+
+    productos_db = {
+        item['nombre']: item
+        for item in resultado.get(productos_table_name, {}).values()
+    }
+    combos_db = {
+        item['combo_id']: item
+        for item in resultado.get(combos_table_name, {}).values()
+    }
+
+    return productos_db, combos_db
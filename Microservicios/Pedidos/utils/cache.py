@@ -0,0 +1,113 @@
+import os
+import time
+import boto3
+from collections import OrderedDict
+from threading import Lock
+
+# Cliente DynamoDB compartido. Se usa meta.client (thread-safe, a diferencia
+# de los recursos Table) porque create.py consulta el cache desde varios hilos
+dynamodb = boto3.resource('dynamodb')
+client = dynamodb.meta.client
+
+locales_table_name = os.environ.get('TABLE_LOCALES', 'ChinaWok-Locales')
+productos_table_name = os.environ.get('TABLE_PRODUCTOS', 'ChinaWok-Productos')
+combos_table_name = os.environ.get('TABLE_COMBOS', 'ChinaWok-Combos')
+
+# Configuración del cache (sobrevive entre invocaciones de un contenedor caliente)
+CACHE_TTL_SEGUNDOS = float(os.environ.get('CACHE_TTL_SEGUNDOS', '60'))
+CACHE_MAX_ITEMS = int(os.environ.get('CACHE_MAX_ITEMS', '1024'))
+
+
+class TTLCache:
+    """Cache en memoria con expiración por TTL y desalojo LRU por tamaño"""
+
+    def __init__(self, nombre, ttl_segundos=CACHE_TTL_SEGUNDOS, max_items=CACHE_MAX_ITEMS):
+        self.nombre = nombre
+        self.ttl_segundos = ttl_segundos
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, clave):
+        """Returns: (bool, valor) - (hit, valor cacheado)"""
+        with self.lock:
+            entrada = self.items.get(clave)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self.items.move_to_end(clave)
+                self.hits += 1
+                return True, entrada[1]
+
+            if entrada is not None:
+                del self.items[clave]
+            self.misses += 1
+            return False, None
+
+    def set(self, clave, valor):
+        with self.lock:
+            self.items[clave] = (time.monotonic() + self.ttl_segundos, valor)
+            self.items.move_to_end(clave)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+    def invalidar(self, clave=None):
+        """Elimina una clave del cache, o todo el cache si no se indica clave"""
+        with self.lock:
+            if clave is None:
+                self.items.clear()
+            else:
+                self.items.pop(clave, None)
+
+    def log_estadisticas(self, evento):
+        print(f"[CACHE] {self.nombre} {evento} - hits: {self.hits}, misses: {self.misses}, items: {len(self.items)}")
+
+
+# Los locales se modifican desde el servicio Locales, que no comparte
+# contenedor con Pedidos: su única invalidación es el TTL. Productos y combos
+# además se invalidan en el contenedor que los modifica (invalidar_*)
+locales_cache = TTLCache('locales')
+productos_cache = TTLCache('productos')
+combos_cache = TTLCache('combos')
+
+
+def _obtener_con_cache(cache, table_name, key):
+    """
+    Obtiene un item usando el cache. Solo se cachean items existentes para
+    que un recurso recién creado no quede oculto hasta que expire el TTL.
+    """
+    clave = tuple(key.values())
+    hit, item = cache.get(clave)
+    if hit:
+        cache.log_estadisticas('HIT')
+        return item
+
+    response = client.get_item(TableName=table_name, Key=key)
+    item = response.get('Item')
+    if item is not None:
+        cache.set(clave, item)
+    cache.log_estadisticas('MISS')
+    return item
+
+
+def obtener_local(local_id):
+    """Retorna el local o None si no existe"""
+    return _obtener_con_cache(locales_cache, locales_table_name, {'local_id': local_id})
+
+
+def obtener_producto(local_id, nombre):
+    """Retorna el producto o None si no existe"""
+    return _obtener_con_cache(productos_cache, productos_table_name, {'local_id': local_id, 'nombre': nombre})
+
+
+def obtener_combo(local_id, combo_id):
+    """Retorna el combo o None si no existe"""
+    return _obtener_con_cache(combos_cache, combos_table_name, {'local_id': local_id, 'combo_id': combo_id})
+
+
+def invalidar_producto(local_id, nombre):
+    productos_cache.invalidar((local_id, nombre))
+
+
+def invalidar_combo(local_id, combo_id):
+    combos_cache.invalidar((local_id, combo_id))
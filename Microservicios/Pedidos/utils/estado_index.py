@@ -0,0 +1,24 @@
+import os
+
+# GSI de pedidos por estado: PK local_id, SK "estado#created_at"
+PEDIDOS_ESTADO_INDEX = os.environ.get('PEDIDOS_ESTADO_INDEX', 'local_id-estado_created_at-index')
+
+ESTADOS_PEDIDO = ['procesando', 'cocinando', 'empacando', 'enviando', 'recibido']
+
+
+def obtener_fecha_creacion(pedido):
+    """
+    Retorna la fecha de creación del pedido. Los pedidos anteriores a
+    created_at usan la hora de inicio del primer estado del historial.
+    """
+    if pedido.get('created_at'):
+        return pedido['created_at']
+    historial = pedido.get('historial_estados') or []
+    if historial:
+        return historial[0].get('hora_inicio', '')
+    return ''
+
+
+def clave_estado_fecha(estado, created_at):
+    """Construye el valor de estado_created_at (sort key del GSI)"""
+    return f"{estado}#{created_at}"
@@ -0,0 +1,108 @@
+import os
+import boto3
+from boto3.dynamodb.conditions import Key
+
+# Tabla append-only con el historial de estados de cada pedido.
+# PK pedido_key ("local_id#pedido_id"), SK secuencia (= versión del pedido)
+dynamodb = boto3.resource('dynamodb')
+eventos_table_name = os.environ.get('TABLE_PEDIDO_EVENTOS', 'ChinaWok-PedidoEventos')
+eventos_table = dynamodb.Table(eventos_table_name)
+
+
+def clave_eventos(local_id, pedido_id):
+    """Partition key de los eventos de un pedido"""
+    return f"{local_id}#{pedido_id}"
+
+
+def construir_evento(pedido, secuencia, estado, hora, empleado=None, tipo='transicion'):
+    """Evento inmutable de la tabla de eventos; la secuencia es la versión del pedido"""
+    return {
+        'pedido_key': clave_eventos(pedido['local_id'], pedido['pedido_id']),
+        'secuencia': secuencia,
+        'local_id': pedido['local_id'],
+        'pedido_id': pedido['pedido_id'],
+        'tipo': tipo,
+        'estado': estado,
+        'hora': hora,
+        'empleado': empleado
+    }
+
+
+def operacion_put_evento(evento):
+    """Operación de TransactWriteItems que agrega el evento (nunca sobrescribe)"""
+    return {
+        'Put': {
+            'TableName': eventos_table_name,
+            'Item': evento,
+            'ConditionExpression': 'attribute_not_exists(secuencia)'
+        }
+    }
+
+
+def listar_eventos(local_id, pedido_id):
+    """Retorna todos los eventos del pedido en orden de secuencia"""
+    query_kwargs = {
+        'KeyConditionExpression': Key('pedido_key').eq(clave_eventos(local_id, pedido_id))
+    }
+    eventos = []
+
+    while True:
+        response = eventos_table.query(**query_kwargs)
+        eventos.extend(response.get('Items', []))
+
+        if 'LastEvaluatedKey' not in response:
+            return eventos
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def eliminar_eventos(local_id, pedido_id):
+    """
+    Borra todos los eventos de un pedido eliminado (BatchWriteItem de a 25;
+    batch_writer reintenta los UnprocessedItems)
+    Returns: int - cantidad de eventos eliminados
+    """
+    query_kwargs = {
+        'KeyConditionExpression': Key('pedido_key').eq(clave_eventos(local_id, pedido_id)),
+        'ProjectionExpression': 'pedido_key, secuencia'
+    }
+    eliminados = 0
+
+    with eventos_table.batch_writer() as batch:
+        while True:
+            response = eventos_table.query(**query_kwargs)
+            for evento in response.get('Items', []):
+                batch.delete_item(Key={'pedido_key': evento['pedido_key'], 'secuencia': evento['secuencia']})
+                eliminados += 1
+
+            if 'LastEvaluatedKey' not in response:
+                return eliminados
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def expandir_historial(local_id, pedido_id, historial_en_linea=None):
+    """
+    Reconstruye historial_estados (estado, hora_inicio, hora_fin, activo,
+    empleado) a partir de los eventos del pedido. Los pedidos anteriores a
+    la tabla de eventos conservan su historial en línea, que va primero.
+    """
+    historial = [dict(estado) for estado in historial_en_linea or []]
+    eventos = listar_eventos(local_id, pedido_id)
+
+    for evento in eventos:
+        # El evento cierra la entrada que estaba activa
+        for estado in historial:
+            if estado.get('activo'):
+                estado['activo'] = False
+                estado['hora_fin'] = evento['hora']
+
+        finalizado = evento['estado'] == 'recibido'
+        historial.append({
+            'estado': evento['estado'],
+            'hora_inicio': evento['hora'],
+            'hora_fin': evento['hora'] if finalizado else None,
+            'activo': not finalizado,
+            'empleado': evento.get('empleado'),
+            'tipo': evento.get('tipo', 'transicion')
+        })
+
+    return historial
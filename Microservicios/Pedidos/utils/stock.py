@@ -0,0 +1,250 @@
+import os
+import boto3
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeDeserializer
+
+# Cliente DynamoDB compartido (meta.client serializa tipos de Python automáticamente)
+dynamodb = boto3.resource('dynamodb')
+client = dynamodb.meta.client
+
+productos_table_name = os.environ.get('TABLE_PRODUCTOS', 'ChinaWok-Productos')
+productos_table = dynamodb.Table(productos_table_name)
+combos_table_name = os.environ.get('TABLE_COMBOS', 'ChinaWok-Combos')
+
+# Límite de operaciones por llamada a TransactWriteItems
+MAX_ITEMS_POR_TRANSACCION = 100
+
+deserializer = TypeDeserializer()
+
+
+def agrupar_cantidades(productos):
+    """
+    Suma las cantidades de productos repetidos en el pedido
+    (una transacción no puede tocar dos veces el mismo item)
+    Returns: dict {nombre: cantidad}
+    """
+    cantidades = {}
+    for producto in productos or []:
+        nombre = producto['nombre']
+        cantidades[nombre] = cantidades.get(nombre, 0) + int(producto['cantidad'])
+    return cantidades
+
+
+def _valor_atributo(valor):
+    """Deserializa un atributo en formato DynamoDB si viene sin convertir"""
+    if isinstance(valor, dict) and len(valor) == 1:
+        return deserializer.deserialize(valor)
+    return valor
+
+
+def _explicar_cancelacion(local_id, bloque, razones):
+    """
+    Traduce las CancellationReasons de una transacción a los mensajes de validación
+    Returns: (str, str) - (tipo de error, mensaje de error)
+    """
+    for (_, descriptor), razon in zip(bloque, razones):
+        if razon.get('Code') != 'ConditionalCheckFailed':
+            continue
+
+        tipo = descriptor[0]
+        if tipo == 'producto':
+            _, nombre, cantidad = descriptor
+            item = razon.get('Item')
+            if not item:
+                return 'Error de validación de productos', f"El producto '{nombre}' no existe en el local {local_id}"
+            stock_disponible = _valor_atributo(item.get('stock', 0))
+            return 'Error de validación de productos', f"Stock insuficiente para '{nombre}'. Disponible: {stock_disponible}, Solicitado: {cantidad}"
+
+        if tipo == 'combo':
+            return 'Error de validación de combos', f"El combo '{descriptor[1]}' no existe en el local {local_id}"
+
+        if tipo == 'pedido':
+            return 'Error de validación de pedido', f"El pedido '{descriptor[1]}' ya existe"
+
+    return 'Error de reserva de stock', 'El stock fue modificado por otro pedido en simultáneo, intente nuevamente'
+
+
+def reservar_stock_y_crear_pedido(pedidos_table_name, pedido, operaciones_extra=None):
+    """
+    Descuenta el stock de cada producto (condicionado a stock >= cantidad),
+    verifica que los combos existan e inserta el pedido en una sola
+    TransactWriteItems. Si el pedido supera el límite de la transacción se
+    divide en bloques y, ante un fallo, se devuelve el stock ya reservado.
+    operaciones_extra (p. ej. el evento inicial) van en el mismo bloque que el pedido.
+    Returns: (str, str) - (tipo de error, mensaje de error) o (None, None) si se creó
+    """
+    local_id = pedido['local_id']
+    operaciones = []
+
+    # Marca que este pedido sí descontó stock: solo los pedidos con la marca
+    # lo devuelven al cancelarse (los antiguos o cargados por DataGenerator no)
+    pedido['stock_reservado'] = True
+
+    for nombre, cantidad in agrupar_cantidades(pedido.get('productos')).items():
+        operaciones.append(({
+            'Update': {
+                'TableName': productos_table_name,
+                'Key': {'local_id': local_id, 'nombre': nombre},
+                'UpdateExpression': 'SET #stock = #stock - :cantidad',
+                'ConditionExpression': 'attribute_exists(#nombre) AND #stock >= :cantidad',
+                'ExpressionAttributeNames': {'#stock': 'stock', '#nombre': 'nombre'},
+                'ExpressionAttributeValues': {':cantidad': cantidad},
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+            }
+        }, ('producto', nombre, cantidad)))
+
+    for combo_id in dict.fromkeys(c['combo_id'] for c in pedido.get('combos') or []):
+        operaciones.append(({
+            'ConditionCheck': {
+                'TableName': combos_table_name,
+                'Key': {'local_id': local_id, 'combo_id': combo_id},
+                'ConditionExpression': 'attribute_exists(combo_id)'
+            }
+        }, ('combo', combo_id)))
+
+    # El pedido va al final para que se inserte junto con el último bloque
+    finales = [({
+        'Put': {
+            'TableName': pedidos_table_name,
+            'Item': pedido,
+            'ConditionExpression': 'attribute_not_exists(pedido_id)'
+        }
+    }, ('pedido', pedido['pedido_id']))]
+    finales.extend((operacion, ('extra',)) for operacion in operaciones_extra or [])
+
+    bloques = [
+        operaciones[inicio:inicio + MAX_ITEMS_POR_TRANSACCION]
+        for inicio in range(0, len(operaciones), MAX_ITEMS_POR_TRANSACCION)
+    ]
+    if bloques and len(bloques[-1]) + len(finales) <= MAX_ITEMS_POR_TRANSACCION:
+        bloques[-1].extend(finales)
+    else:
+        bloques.append(finales)
+
+    reservados = {}
+    for bloque in bloques:
+        try:
+            client.transact_write_items(TransactItems=[operacion for operacion, _ in bloque])
+        except ClientError as e:
+            # Compensar los bloques anteriores que sí se confirmaron
+            if reservados:
+                devolver_stock(local_id, reservados)
+
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+
+            return _explicar_cancelacion(local_id, bloque, e.response.get('CancellationReasons', []))
+
+        for _, descriptor in bloque:
+            if descriptor[0] == 'producto':
+                reservados[descriptor[1]] = descriptor[2]
+
+    return None, None
+
+
+def devolver_stock(local_id, cantidades):
+    """
+    Suma de vuelta al inventario las cantidades indicadas ({nombre: cantidad}).
+    Los productos eliminados del local se ignoran.
+    """
+    for nombre, cantidad in cantidades.items():
+        try:
+            productos_table.update_item(
+                Key={'local_id': local_id, 'nombre': nombre},
+                UpdateExpression='ADD #stock :cantidad',
+                ConditionExpression='attribute_exists(#nombre)',
+                ExpressionAttributeNames={'#stock': 'stock', '#nombre': 'nombre'},
+                ExpressionAttributeValues={':cantidad': cantidad}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            print(f"Producto '{nombre}' ya no existe en el local {local_id}, no se devuelve stock")
+
+
+def operaciones_ajuste_stock(pedido, productos_nuevos, combos_nuevos, productos_existentes):
+    """
+    Operaciones de TransactWriteItems para cambiar los productos/combos de un
+    pedido ya creado: se descuenta (o devuelve) solo la diferencia con lo que
+    el pedido tenía reservado. Un pedido sin stock_reservado no tiene nada
+    reservado, así que se reserva la cantidad completa.
+    productos_nuevos / combos_nuevos en None significa que no cambian.
+    productos_existentes: productos del local por nombre (batch_lookup); las
+    devoluciones a productos que ya no existen se omiten.
+    Returns: list - [(operación, descriptor), ...]
+    """
+    local_id = pedido['local_id']
+    operaciones = []
+
+    if productos_nuevos is not None:
+        anteriores = agrupar_cantidades(pedido.get('productos')) if pedido.get('stock_reservado') else {}
+        nuevas = agrupar_cantidades(productos_nuevos)
+
+        for nombre in dict.fromkeys(list(nuevas) + list(anteriores)):
+            diferencia = nuevas.get(nombre, 0) - anteriores.get(nombre, 0)
+
+            if diferencia > 0:
+                operaciones.append(({
+                    'Update': {
+                        'TableName': productos_table_name,
+                        'Key': {'local_id': local_id, 'nombre': nombre},
+                        'UpdateExpression': 'SET #stock = #stock - :cantidad',
+                        'ConditionExpression': 'attribute_exists(#nombre) AND #stock >= :cantidad',
+                        'ExpressionAttributeNames': {'#stock': 'stock', '#nombre': 'nombre'},
+                        'ExpressionAttributeValues': {':cantidad': diferencia},
+                        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                    }
+                }, ('producto', nombre, diferencia)))
+
+            elif diferencia < 0 and nombre in productos_existentes:
+                operaciones.append(({
+                    'Update': {
+                        'TableName': productos_table_name,
+                        'Key': {'local_id': local_id, 'nombre': nombre},
+                        'UpdateExpression': 'ADD #stock :cantidad',
+                        'ConditionExpression': 'attribute_exists(#nombre)',
+                        'ExpressionAttributeNames': {'#stock': 'stock', '#nombre': 'nombre'},
+                        'ExpressionAttributeValues': {':cantidad': -diferencia}
+                    }
+                }, ('devolucion', nombre)))
+
+    for combo_id in dict.fromkeys(c['combo_id'] for c in combos_nuevos or []):
+        operaciones.append(({
+            'ConditionCheck': {
+                'TableName': combos_table_name,
+                'Key': {'local_id': local_id, 'combo_id': combo_id},
+                'ConditionExpression': 'attribute_exists(combo_id)'
+            }
+        }, ('combo', combo_id)))
+
+    return operaciones
+
+
+def ajustar_stock_y_actualizar_pedido(local_id, operaciones_stock, operaciones_pedido):
+    """
+    Aplica el ajuste de stock y la actualización del pedido (y su evento) en
+    una sola TransactWriteItems, de modo que la reserva nunca se desincroniza
+    de los productos guardados en el pedido.
+    Si falló la condición del pedido (versión) se relanza el ClientError para
+    que el handler responda como cualquier otro conflicto de concurrencia.
+    Returns: (str, str) - (tipo de error, mensaje de error) o (None, None)
+    """
+    if len(operaciones_stock) + len(operaciones_pedido) > MAX_ITEMS_POR_TRANSACCION:
+        return 'Error de validación de productos', f"El pedido no puede modificar más de {MAX_ITEMS_POR_TRANSACCION - len(operaciones_pedido)} productos y combos a la vez"
+
+    try:
+        client.transact_write_items(
+            TransactItems=[operacion for operacion, _ in operaciones_stock] + operaciones_pedido
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+
+        razones = e.response.get('CancellationReasons', [])
+        razones_stock = razones[:len(operaciones_stock)]
+        razones_pedido = razones[len(operaciones_stock):]
+        if any(razon.get('Code') == 'ConditionalCheckFailed' for razon in razones_pedido):
+            raise
+        return _explicar_cancelacion(local_id, operaciones_stock, razones_stock)
+
+    return None, None
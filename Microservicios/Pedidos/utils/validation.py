@@ -0,0 +1,30 @@
+from jsonschema import Draft7Validator, FormatChecker, ValidationError
+
+# Un solo FormatChecker compartido por todos los validadores
+format_checker = FormatChecker()
+
+
+def compilar_validador(schema):
+    """
+    Verifica el schema contra el metaschema una sola vez (al importar el
+    handler) y retorna un validador reutilizable con chequeo de formatos
+    """
+    Draft7Validator.check_schema(schema)
+    return Draft7Validator(schema, format_checker=format_checker)
+
+
+def validar(validador, instance):
+    """
+    Valida la instancia y reporta todos los errores juntos.
+    Raises: ValidationError con los mensajes de todos los errores encontrados
+    """
+    errores = sorted(validador.iter_errors(instance), key=lambda e: list(e.absolute_path))
+    if not errores:
+        return
+
+    mensajes = []
+    for error in errores:
+        ruta = '.'.join(str(p) for p in error.absolute_path)
+        mensajes.append(f"{ruta}: {error.message}" if ruta else error.message)
+
+    raise ValidationError('; '.join(mensajes))
@@ -0,0 +1,188 @@
+"""
+Harness de concurrencia: varios workflows reclaman empleados del mismo local
+al mismo tiempo con asignar_empleado_y_actualizar_pedido.
+
+Crea un local de prueba (HARNESS-<uuid>) con --empleados cocineros libres y
+--pedidos pedidos en "procesando", lanza una asignación por pedido en
+procesos separados (como Lambdas independientes) y verifica que:
+  - ninguna asignación lance una excepción por la contención (p. ej. un
+    TransactionConflict sobre el empleado),
+  - ningún empleado quede asignado a dos pedidos,
+  - se asignen exactamente min(pedidos, empleados),
+  - cada empleado asignado quede ocupado y fuera del índice de disponibles,
+  - cada pedido asignado esté en "cocinando" con su evento en PedidoEventos.
+Al terminar borra los datos de prueba (salvo --conservar).
+
+Usa las tablas configuradas en el entorno (TABLE_PEDIDOS, TABLE_EMPLEADOS,
+TABLE_PEDIDO_EVENTOS). Para DynamoDB Local, exportar
+AWS_ENDPOINT_URL_DYNAMODB=http://localhost:8000.
+
+Uso (desde Microservicios/Stepfunctions):
+    python scripts/harness_asignacion_concurrente.py --pedidos 20 --empleados 5
+"""
+import argparse
+import os
+import sys
+import uuid
+import random
+from decimal import Decimal
+from datetime import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('TABLE_PEDIDOS', 'ChinaWok-Pedidos')
+os.environ.setdefault('TABLE_EMPLEADOS', 'ChinaWok-Empleados')
+os.environ.setdefault('TABLE_PEDIDO_EVENTOS', 'ChinaWok-PedidoEventos')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'workflow'))
+
+from boto3.dynamodb.conditions import Key
+from utils.dynamodb_helper import (
+    dynamodb,
+    clave_disponibilidad,
+    clave_eventos,
+    asignar_empleado_y_actualizar_pedido
+)
+
+ROL = 'Cocinero'
+
+
+def crear_datos(local_id, num_pedidos, num_empleados):
+    """Inserta los empleados libres y los pedidos en "procesando" del local de prueba"""
+    ahora = datetime.now().isoformat()
+
+    with dynamodb.Table(os.environ['TABLE_EMPLEADOS']).batch_writer() as batch:
+        for i in range(num_empleados):
+            batch.put_item(Item={
+                'local_id': local_id,
+                'dni': f'{90000000 + i}',
+                'nombre': 'Harness',
+                'apellido': str(i),
+                'role': ROL,
+                'calificacion_prom': Decimal(str(round(random.uniform(3.5, 5.0), 2))),
+                'ocupado': False,
+                'disponible_rol': clave_disponibilidad(local_id, ROL)
+            })
+
+    pedido_ids = [str(uuid.uuid4()) for _ in range(num_pedidos)]
+    with dynamodb.Table(os.environ['TABLE_PEDIDOS']).batch_writer() as batch:
+        for pedido_id in pedido_ids:
+            batch.put_item(Item={
+                'local_id': local_id,
+                'pedido_id': pedido_id,
+                'estado': 'procesando',
+                'created_at': ahora,
+                'estado_created_at': f'procesando#{ahora}',
+                'estado_desde': ahora,
+                'empleado_actual': None,
+                'empleados_asignados': {},
+                'version': 1
+            })
+
+    return pedido_ids
+
+
+def asignar(local_id, pedido_id):
+    """
+    Un workflow: reclama un cocinero para el pedido. Returns: DNI, None o
+    'error: ...' si lanzó (en Step Functions sería un reintento del paso)
+    """
+    try:
+        empleado, _ = asignar_empleado_y_actualizar_pedido(local_id, pedido_id, ROL, 'cocinando')
+        return empleado['dni'] if empleado else None
+    except Exception as e:
+        return f'error: {type(e).__name__}: {e}'
+
+
+def verificar(local_id, pedido_ids, asignaciones, num_empleados):
+    """Returns: list de fallas encontradas"""
+    fallas = []
+    dnis = [dni for dni in asignaciones if dni and not dni.startswith('error')]
+    errores = [dni for dni in asignaciones if dni and dni.startswith('error')]
+
+    repetidos = [dni for dni, veces in Counter(dnis).items() if veces > 1]
+    if repetidos:
+        fallas.append(f'Empleados asignados a más de un pedido: {repetidos}')
+    if errores:
+        fallas.append(f'Asignaciones que lanzaron una excepción: {errores}')
+
+    esperados = min(len(pedido_ids), num_empleados)
+    if len(dnis) != esperados:
+        fallas.append(f'Se asignaron {len(dnis)} empleados, se esperaban {esperados}')
+
+    empleados = dynamodb.Table(os.environ['TABLE_EMPLEADOS']).query(
+        KeyConditionExpression=Key('local_id').eq(local_id)
+    )['Items']
+    for empleado in empleados:
+        asignado = empleado['dni'] in dnis
+        if asignado != bool(empleado.get('ocupado')) or asignado == ('disponible_rol' in empleado):
+            fallas.append(f"Empleado {empleado['dni']} inconsistente (ocupado={empleado.get('ocupado')}, asignado={asignado})")
+
+    pedidos_table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+    eventos_table = dynamodb.Table(os.environ['TABLE_PEDIDO_EVENTOS'])
+    for pedido_id, dni in zip(pedido_ids, asignaciones):
+        pedido = pedidos_table.get_item(Key={'local_id': local_id, 'pedido_id': pedido_id})['Item']
+        eventos = eventos_table.query(
+            KeyConditionExpression=Key('pedido_key').eq(clave_eventos(local_id, pedido_id))
+        )['Items']
+        if dni and not dni.startswith('error'):
+            if pedido['estado'] != 'cocinando' or pedido['empleados_asignados'].get(ROL.lower()) != dni or len(eventos) != 1:
+                fallas.append(f'Pedido {pedido_id} no refleja la asignación de {dni}')
+        elif pedido['estado'] != 'procesando' or eventos:
+            fallas.append(f'Pedido {pedido_id} avanzó sin empleado asignado')
+
+    return fallas
+
+
+def limpiar(local_id, pedido_ids):
+    eventos_table = dynamodb.Table(os.environ['TABLE_PEDIDO_EVENTOS'])
+    with dynamodb.Table(os.environ['TABLE_PEDIDOS']).batch_writer() as batch:
+        for pedido_id in pedido_ids:
+            batch.delete_item(Key={'local_id': local_id, 'pedido_id': pedido_id})
+            for evento in eventos_table.query(
+                KeyConditionExpression=Key('pedido_key').eq(clave_eventos(local_id, pedido_id))
+            )['Items']:
+                eventos_table.delete_item(Key={'pedido_key': evento['pedido_key'], 'secuencia': evento['secuencia']})
+
+    empleados_table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
+    with empleados_table.batch_writer() as batch:
+        for empleado in empleados_table.query(KeyConditionExpression=Key('local_id').eq(local_id))['Items']:
+            batch.delete_item(Key={'local_id': local_id, 'dni': empleado['dni']})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Asignaciones concurrentes de empleados sobre un local de prueba')
+    parser.add_argument('--pedidos', type=int, default=20)
+    parser.add_argument('--empleados', type=int, default=5)
+    parser.add_argument('--procesos', type=int, default=None, help='Workflows en paralelo (por defecto uno por pedido)')
+    parser.add_argument('--conservar', action='store_true', help='No borrar los datos de prueba al terminar')
+    args = parser.parse_args()
+
+    local_id = f'HARNESS-{uuid.uuid4()}'
+    print(f"🧪 Local de prueba {local_id}: {args.pedidos} pedidos, {args.empleados} {ROL.lower()}s")
+
+    pedido_ids = crear_datos(local_id, args.pedidos, args.empleados)
+    try:
+        with ProcessPoolExecutor(max_workers=args.procesos or args.pedidos) as executor:
+            asignaciones = list(executor.map(asignar, [local_id] * len(pedido_ids), pedido_ids))
+
+        fallas = verificar(local_id, pedido_ids, asignaciones, args.empleados)
+    finally:
+        if not args.conservar:
+            limpiar(local_id, pedido_ids)
+
+    asignados = sum(1 for dni in asignaciones if dni and not dni.startswith('error'))
+    errores = sum(1 for dni in asignaciones if dni and dni.startswith('error'))
+    print(f"   Asignados: {asignados}, sin empleado (ServicioSaturado): {asignaciones.count(None)}, "
+          f"con excepción: {errores}")
+
+    if fallas:
+        print("❌ Fallas:")
+        for falla in fallas:
+            print(f"   - {falla}")
+        sys.exit(1)
+    print("✅ Sin asignaciones duplicadas")
+
+
+if __name__ == "__main__":
+    main()
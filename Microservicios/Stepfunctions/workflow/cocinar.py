@@ -5,9 +5,7 @@ import os
 sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
-    buscar_empleado_disponible,
-    marcar_empleado_ocupado,
-    actualizar_estado_pedido_con_empleado
+    asignar_empleado_y_actualizar_pedido
 )
 from utils.json_encoder import json_dumps
 
@@ -35,23 +33,18 @@ def lambda_handler(event, context):
         if pedido.get('estado') != 'procesando':
             raise ValueError(f'El pedido debe estar en estado "procesando", actualmente está en "{pedido.get("estado")}"')
         
-        # Buscar cocinero disponible
-        cocinero = buscar_empleado_disponible(local_id, 'Cocinero')
-        
-        if not cocinero:
-            raise Exception('No hay cocineros disponibles en este momento')
-        
-        # Marcar cocinero como ocupado
-        marcar_empleado_ocupado(local_id, cocinero['dni'])
-        
-        # Actualizar estado del pedido
-        pedido_actualizado = actualizar_estado_pedido_con_empleado(
+        # Reclamar cocinero libre y avanzar el pedido en una sola transacción
+        cocinero, pedido_actualizado = asignar_empleado_y_actualizar_pedido(
             local_id,
             pedido_id,
+            'Cocinero',
             'cocinando',
-            cocinero
+            pedido
         )
         
+        if not cocinero:
+            raise Exception('No hay cocineros disponibles en este momento')
+        
         print(f"Pedido asignado a cocinero {cocinero['dni']}")
         
         result = {
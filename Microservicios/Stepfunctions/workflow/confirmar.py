@@ -6,8 +6,7 @@ sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
     marcar_empleado_libre,
-    finalizar_pedido,
-    agregar_pedido_a_usuario
+    finalizar_pedido
 )
 from utils.json_encoder import json_dumps
 
@@ -31,7 +30,6 @@ def lambda_handler(event, context):
     try:
         # Obtener información del pedido
         pedido = obtener_pedido(local_id, pedido_id)
-        usuario_correo = pedido.get('usuario_correo')
         
         # Validar que el pedido esté en estado "enviando"
         if pedido.get('estado') != 'enviando':
@@ -43,11 +41,7 @@ def lambda_handler(event, context):
             print(f'Repartidor {repartidor_dni} liberado')
         
         # Finalizar pedido (actualizar estado a recibido y cerrar historial)
-        pedido_actualizado = finalizar_pedido(local_id, pedido_id)
-        
-        # Agregar pedido al historial del usuario
-        if usuario_correo:
-            agregar_pedido_a_usuario(usuario_correo, pedido_id)
+        pedido_actualizado = finalizar_pedido(local_id, pedido_id, pedido)
         
         print(f'Pedido confirmado y completado: {pedido_id}')
         
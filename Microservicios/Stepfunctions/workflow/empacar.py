@@ -5,10 +5,8 @@ import os
 sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
-    buscar_empleado_disponible,
-    marcar_empleado_ocupado,
     marcar_empleado_libre,
-    actualizar_estado_pedido_con_empleado
+    asignar_empleado_y_actualizar_pedido
 )
 from utils.json_encoder import json_dumps
 
@@ -37,23 +35,18 @@ def lambda_handler(event, context):
         if pedido.get('estado') != 'cocinando':
             raise ValueError(f'El pedido debe estar en estado "cocinando", actualmente está en "{pedido.get("estado")}"')
         
-        # Buscar despachador disponible
-        despachador = buscar_empleado_disponible(local_id, 'Despachador')
-        
-        if not despachador:
-            raise Exception('No hay despachadores disponibles en este momento')
-        
-        # Marcar despachador como ocupado
-        marcar_empleado_ocupado(local_id, despachador['dni'])
-        
-        # Actualizar estado del pedido (esto liberará automáticamente al cocinero)
-        pedido_actualizado = actualizar_estado_pedido_con_empleado(
+        # Reclamar despachador libre y avanzar el pedido en una sola transacción
+        despachador, pedido_actualizado = asignar_empleado_y_actualizar_pedido(
             local_id,
             pedido_id,
+            'Despachador',
             'empacando',
-            despachador
+            pedido
         )
         
+        if not despachador:
+            raise Exception('No hay despachadores disponibles en este momento')
+        
         # Liberar al cocinero explícitamente si hay uno
         empleado_anterior_dni = pedido_actualizado.get('_empleado_anterior_dni')
         if empleado_anterior_dni:
@@ -5,8 +5,10 @@ import os
 sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
+    obtener_empleado_actual,
     marcar_empleado_libre,
-    resetear_pedido_a_inicial
+    resetear_pedido_a_inicial,
+    devolver_stock_pedido
 )
 
 def lambda_handler(event, context):
@@ -17,6 +19,7 @@ def lambda_handler(event, context):
     pedido_id = event.get('pedido_id')
     motivo = event.get('motivo', 'error_workflow')
     resetear_estado = event.get('resetear_estado', True)
+    devolver_stock = event.get('devolver_stock', False)
     
     if not local_id or not pedido_id:
         print('Faltan parámetros, no se puede liberar empleados')
@@ -25,25 +28,32 @@ def lambda_handler(event, context):
     try:
         # Obtener el pedido para ver qué empleados están asignados
         pedido = obtener_pedido(local_id, pedido_id)
-        historial = pedido.get('historial_estados', [])
+        empleado_actual = obtener_empleado_actual(pedido)
         
         empleados_liberados = []
         
-        # Buscar en el historial los empleados que estaban activos
-        for estado in historial:
-            if estado.get('activo') and estado.get('empleado'):
-                empleado_dni = estado['empleado']['dni']
-                empleado_rol = estado['empleado']['rol']
-                
-                try:
-                    marcar_empleado_libre(local_id, empleado_dni)
-                    empleados_liberados.append({
-                        'dni': empleado_dni,
-                        'rol': empleado_rol
-                    })
-                    print(f'Empleado {empleado_rol} {empleado_dni} liberado por {motivo}')
-                except Exception as e:
-                    print(f'Error liberando empleado {empleado_dni}: {str(e)}')
+        # Liberar al empleado asignado al estado actual
+        if empleado_actual:
+            empleado_dni = empleado_actual['dni']
+            empleado_rol = empleado_actual['rol']
+            
+            try:
+                marcar_empleado_libre(local_id, empleado_dni)
+                empleados_liberados.append({
+                    'dni': empleado_dni,
+                    'rol': empleado_rol
+                })
+                print(f'Empleado {empleado_rol} {empleado_dni} liberado por {motivo}')
+            except Exception as e:
+                print(f'Error liberando empleado {empleado_dni}: {str(e)}')
+        
+        # Devolver el stock reservado si el pedido se cancela (solo si lo reservó)
+        stock_devuelto = {}
+        if devolver_stock and pedido.get('stock_reservado'):
+            try:
+                stock_devuelto = devolver_stock_pedido(local_id, pedido_id)
+            except Exception as e:
+                print(f'Error devolviendo stock del pedido: {str(e)}')
         
         # Resetear el pedido a estado inicial si se solicita
         if resetear_estado:
@@ -59,6 +69,7 @@ def lambda_handler(event, context):
             'liberados': len(empleados_liberados),
             'empleados': empleados_liberados,
             'pedido_reseteado': resetear_estado,
+            'stock_devuelto': stock_devuelto,
             'motivo': motivo
         }
         
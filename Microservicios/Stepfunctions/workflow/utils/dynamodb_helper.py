@@ -1,9 +1,12 @@
 import boto3
 import os
 import json
+import time
+import random
 from datetime import datetime
 from boto3.dynamodb.conditions import Key, Attr
 from decimal import Decimal
+from botocore.exceptions import ClientError
 
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 
@@ -30,32 +33,51 @@ def obtener_pedido(local_id, pedido_id):
         print(f'Error obteniendo pedido: {str(e)}')
         raise
 
-def buscar_empleado_disponible(local_id, role):
-    """Busca un empleado disponible (ocupado=False) del tipo especificado"""
+def clave_estado_fecha(pedido, estado):
+    """
+    Construye la sort key "estado#created_at" del GSI de pedidos por estado.
+    Los pedidos sin created_at usan la hora de inicio del primer estado.
+    """
+    created_at = pedido.get('created_at')
+    if not created_at:
+        historial = pedido.get('historial_estados') or [{}]
+        created_at = historial[0].get('hora_inicio', '')
+    return f"{estado}#{created_at}"
+
+# Índice disperso de empleados libres: PK "local_id#role", SK calificacion_prom
+EMPLEADOS_DISPONIBLES_INDEX = os.environ.get('EMPLEADOS_DISPONIBLES_INDEX', 'disponible_rol-calificacion_prom-index')
+
+def clave_disponibilidad(local_id, role):
+    """Valor de disponible_rol mientras el empleado está libre"""
+    return f'{local_id}#{role}'
+
+def buscar_empleados_disponibles(local_id, role, limite=1):
+    """Retorna hasta `limite` empleados libres del rol, de mejor a peor calificación"""
     table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
     
+    # Solo los empleados libres están en el índice; en orden descendente
+    # los primeros son los de mejor calificación
+    response = table.query(
+        IndexName=EMPLEADOS_DISPONIBLES_INDEX,
+        KeyConditionExpression=Key('disponible_rol').eq(clave_disponibilidad(local_id, role)),
+        ScanIndexForward=False,
+        Limit=limite
+    )
+    
+    return response.get('Items', [])
+
+def buscar_empleado_disponible(local_id, role):
+    """Busca el empleado libre del tipo especificado con mejor calificación"""
     try:
         print(f'Buscando {role} disponible en local {local_id}')
         
-        response = table.query(
-            KeyConditionExpression=Key('local_id').eq(local_id),
-            FilterExpression=Attr('role').eq(role) & Attr('ocupado').eq(False)
-        )
-        
-        empleados = response.get('Items', [])
-        
-        print(f'Empleados encontrados con role={role} y ocupado=False: {len(empleados)}')
+        empleados = buscar_empleados_disponibles(local_id, role)
         
         if not empleados:
             print(f'No se encontraron {role}s disponibles en local {local_id}')
             return None
         
-        # Retornar el empleado con mejor calificación
-        empleado = sorted(
-            empleados, 
-            key=lambda x: float(x.get('calificacion_prom', 0)), 
-            reverse=True
-        )[0]
+        empleado = empleados[0]
         
         print(f'Empleado {role} seleccionado: {empleado["dni"]} - {empleado["nombre"]} {empleado["apellido"]} (calificación: {empleado.get("calificacion_prom")})')
         
@@ -68,7 +90,7 @@ def buscar_empleado_disponible(local_id, role):
         raise
 
 def marcar_empleado_ocupado(local_id, dni):
-    """Marca un empleado como ocupado (ocupado=True)"""
+    """Marca un empleado como ocupado (ocupado=True) y lo saca del índice de disponibles"""
     table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
     
     try:
@@ -77,7 +99,7 @@ def marcar_empleado_ocupado(local_id, dni):
                 'local_id': local_id,
                 'dni': dni
             },
-            UpdateExpression='SET ocupado = :ocupado',
+            UpdateExpression='SET ocupado = :ocupado REMOVE disponible_rol',
             ExpressionAttributeValues={
                 ':ocupado': True
             },
@@ -92,18 +114,32 @@ def marcar_empleado_ocupado(local_id, dni):
         raise
 
 def marcar_empleado_libre(local_id, dni):
-    """Marca un empleado como libre (ocupado=False)"""
+    """Marca un empleado como libre (ocupado=False) y lo devuelve al índice de disponibles"""
     table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
     
     try:
+        # El rol es necesario para la clave del índice
+        empleado = table.get_item(
+            Key={
+                'local_id': local_id,
+                'dni': dni
+            },
+            ProjectionExpression='#role',
+            ExpressionAttributeNames={'#role': 'role'}
+        ).get('Item')
+        
+        if not empleado:
+            raise Exception(f'Empleado {dni} no encontrado')
+        
         response = table.update_item(
             Key={
                 'local_id': local_id,
                 'dni': dni
             },
-            UpdateExpression='SET ocupado = :ocupado',
+            UpdateExpression='SET ocupado = :ocupado, disponible_rol = :disponible_rol',
             ExpressionAttributeValues={
-                ':ocupado': False
+                ':ocupado': False,
+                ':disponible_rol': clave_disponibilidad(local_id, empleado['role'])
             },
             ReturnValues='ALL_NEW'
         )
@@ -137,173 +173,397 @@ def validar_transicion_estado(estado_actual, estado_nuevo):
         print(f'Error en validación de estado: {str(e)}')
         raise
 
-def actualizar_estado_pedido_con_empleado(local_id, pedido_id, nuevo_estado, empleado):
-    """Actualiza el estado de un pedido agregando nuevo historial con empleado"""
-    table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+def datos_empleado_historial(empleado):
+    """Resumen del empleado que se guarda en el pedido y en sus eventos"""
+    # Convertir float a Decimal para DynamoDB
+    calificacion = empleado.get('calificacion_prom', 0)
+    if isinstance(calificacion, float):
+        calificacion = Decimal(str(calificacion))
+    elif isinstance(calificacion, str):
+        calificacion = Decimal(calificacion)
     
-    try:
-        ahora = datetime.now().isoformat()
-        
-        # Obtener el pedido actual para validar y actualizar el historial
-        pedido = obtener_pedido(local_id, pedido_id)
-        estado_actual = pedido.get('estado')
-        
-        # Validar que la transición sea válida
+    return {
+        'dni': empleado['dni'],
+        'nombre_completo': f"{empleado['nombre']} {empleado['apellido']}",
+        'rol': empleado['role'].lower(),
+        'calificacion_prom': calificacion
+    }
+
+def obtener_empleado_actual(pedido):
+    """
+    Empleado asignado al estado actual (o None). Los pedidos anteriores a la
+    tabla de eventos lo tienen en la entrada activa de historial_estados.
+    """
+    if 'empleado_actual' in pedido:
+        return pedido['empleado_actual']
+    
+    for estado in pedido.get('historial_estados', []):
+        if estado.get('activo', False) and estado.get('empleado'):
+            return estado['empleado']
+    return None
+
+def empleado_actual_dni(pedido):
+    """DNI del empleado asignado al estado actual"""
+    return (obtener_empleado_actual(pedido) or {}).get('dni')
+
+def clave_eventos(local_id, pedido_id):
+    """Partition key de los eventos de un pedido"""
+    return f'{local_id}#{pedido_id}'
+
+def construir_evento_pedido(pedido, secuencia, estado, hora, empleado=None, tipo='transicion'):
+    """Evento inmutable de la tabla de eventos; la secuencia es la versión del pedido"""
+    return {
+        'pedido_key': clave_eventos(pedido['local_id'], pedido['pedido_id']),
+        'secuencia': secuencia,
+        'local_id': pedido['local_id'],
+        'pedido_id': pedido['pedido_id'],
+        'tipo': tipo,
+        'estado': estado,
+        'hora': hora,
+        'empleado': empleado
+    }
+
+def condicion_version(pedido, valores):
+    """
+    Control de concurrencia optimista: la escritura solo procede si el pedido
+    sigue en la versión leída (los pedidos antiguos no tienen versión)
+    """
+    if 'version' not in pedido:
+        return 'attribute_not_exists(version)'
+    valores[':version_leida'] = pedido['version']
+    return 'version = :version_leida'
+
+def construir_transicion_pedido(pedido, nuevo_estado, empleado, tipo='transicion'):
+    """
+    Prepara el paso del pedido al nuevo estado: un update_item del snapshot
+    (estado actual, empleado actual y versión) condicionado a que el estado y
+    la versión no hayan cambiado desde la lectura, y el evento a agregar en la
+    tabla de eventos con la nueva versión como secuencia
+    Returns: (dict, dict, str) - (parámetros de update_item, evento, DNI del empleado anterior)
+    """
+    ahora = datetime.now().isoformat()
+    estado_actual = pedido.get('estado')
+    
+    # Validar que la transición sea válida
+    if tipo == 'transicion':
         validar_transicion_estado(estado_actual, nuevo_estado)
-        
-        historial_actual = pedido.get('historial_estados', [])
-        
-        # Cerrar el estado activo anterior y extraer DNI del empleado anterior
-        empleado_anterior_dni = None
-        for estado in historial_actual:
-            if estado.get('activo', False):
-                estado['activo'] = False
-                estado['hora_fin'] = ahora
-                # Extraer DNI del empleado que estaba en el estado anterior
-                if estado.get('empleado'):
-                    empleado_anterior_dni = estado['empleado'].get('dni')
-        
-        # Crear nuevo estado
-        nuevo_historial = {
-            'estado': nuevo_estado,
-            'hora_inicio': ahora,
-            'hora_fin': ahora,
-            'activo': True
-        }
-        
-        if empleado:
-            # Convertir float a Decimal para DynamoDB
-            calificacion = empleado.get('calificacion_prom', 0)
-            if isinstance(calificacion, float):
-                calificacion = Decimal(str(calificacion))
-            elif isinstance(calificacion, str):
-                calificacion = Decimal(calificacion)
-            
-            nuevo_historial['empleado'] = {
-                'dni': empleado['dni'],
-                'nombre_completo': f"{empleado['nombre']} {empleado['apellido']}",
-                'rol': empleado['role'].lower(),
-                'calificacion_prom': calificacion
+    
+    datos_empleado = datos_empleado_historial(empleado) if empleado else None
+    version_nueva = pedido.get('version', 0) + 1
+    
+    clausulas = [
+        'estado = :estado',
+        'estado_created_at = :estado_created_at',
+        'estado_desde = :ahora',
+        'empleado_actual = :empleado',
+        'version = :version_nueva'
+    ]
+    nombres = {}
+    valores = {
+        ':estado': nuevo_estado,
+        ':estado_created_at': clave_estado_fecha(pedido, nuevo_estado),
+        ':ahora': ahora,
+        ':empleado': datos_empleado,
+        ':version_nueva': version_nueva,
+        ':estado_actual': estado_actual
+    }
+    
+    # DNI por rol de los empleados que atendieron el pedido (para las reseñas)
+    if datos_empleado and 'empleados_asignados' in pedido:
+        clausulas.append('empleados_asignados.#rol = :dni')
+        nombres['#rol'] = datos_empleado['rol']
+        valores[':dni'] = datos_empleado['dni']
+    elif datos_empleado:
+        clausulas.append('empleados_asignados = :asignados')
+        valores[':asignados'] = {datos_empleado['rol']: datos_empleado['dni']}
+    
+    update_kwargs = {
+        'Key': {
+            'local_id': pedido['local_id'],
+            'pedido_id': pedido['pedido_id']
+        },
+        'UpdateExpression': 'SET ' + ', '.join(clausulas),
+        'ConditionExpression': f'estado = :estado_actual AND {condicion_version(pedido, valores)}',
+        'ExpressionAttributeValues': valores
+    }
+    if nombres:
+        update_kwargs['ExpressionAttributeNames'] = nombres
+    
+    evento = construir_evento_pedido(pedido, version_nueva, nuevo_estado, ahora, datos_empleado, tipo)
+    
+    return update_kwargs, evento, empleado_actual_dni(pedido)
+
+def operaciones_transicion(update_kwargs, evento):
+    """Operaciones de TransactWriteItems para actualizar el snapshot y registrar el evento"""
+    return [
+        {
+            'Update': {
+                'TableName': os.environ['TABLE_PEDIDOS'],
+                **update_kwargs
             }
-        
-        historial_actual.append(nuevo_historial)
-        
-        # Actualizar pedido
-        response = table.update_item(
-            Key={
-                'local_id': local_id,
-                'pedido_id': pedido_id
-            },
-            UpdateExpression='SET estado = :estado, historial_estados = :historial',
-            ExpressionAttributeValues={
-                ':estado': nuevo_estado,
-                ':historial': historial_actual
-            },
-            ReturnValues='ALL_NEW'
+        },
+        {
+            'Put': {
+                'TableName': os.environ['TABLE_PEDIDO_EVENTOS'],
+                'Item': evento,
+                'ConditionExpression': 'attribute_not_exists(secuencia)'
+            }
+        }
+    ]
+
+def aplicar_transicion(pedido, evento, empleado_anterior_dni):
+    """Snapshot local del pedido después de la transición (las transacciones no retornan el item)"""
+    pedido_actualizado = dict(pedido)
+    pedido_actualizado.update({
+        'estado': evento['estado'],
+        'estado_created_at': clave_estado_fecha(pedido, evento['estado']),
+        'estado_desde': evento['hora'],
+        'empleado_actual': evento['empleado'],
+        'version': evento['secuencia'],
+        '_empleado_anterior_dni': empleado_anterior_dni
+    })
+    if evento['empleado']:
+        asignados = dict(pedido.get('empleados_asignados') or {})
+        asignados[evento['empleado']['rol']] = evento['empleado']['dni']
+        pedido_actualizado['empleados_asignados'] = asignados
+    return pedido_actualizado
+
+def ejecutar_transicion(pedido, nuevo_estado, empleado=None, tipo='transicion'):
+    """
+    Actualiza el snapshot del pedido y registra el evento en una sola transacción
+    Returns: dict - pedido actualizado con _empleado_anterior_dni
+    """
+    update_kwargs, evento, empleado_anterior_dni = construir_transicion_pedido(pedido, nuevo_estado, empleado, tipo)
+    
+    try:
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=operaciones_transicion(update_kwargs, evento)
         )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'TransactionCanceledException':
+            raise ValueError(f'El pedido {pedido["pedido_id"]} fue modificado por otro proceso')
+        raise
+    
+    return aplicar_transicion(pedido, evento, empleado_anterior_dni)
+
+def actualizar_estado_pedido_con_empleado(local_id, pedido_id, nuevo_estado, empleado, pedido=None):
+    """
+    Actualiza el estado de un pedido registrando el evento con el empleado.
+    Si se pasa el pedido ya leído, la transición es una única llamada.
+    """
+    try:
+        if pedido is None:
+            pedido = obtener_pedido(local_id, pedido_id)
+        estado_actual = pedido.get('estado')
         
-        print(f'Pedido {pedido_id} actualizado de "{estado_actual}" a "{nuevo_estado}"')
+        result = ejecutar_transicion(pedido, nuevo_estado, empleado)
         
-        # Retornar también el DNI del empleado anterior para liberarlo
-        result = response.get('Attributes')
-        result['_empleado_anterior_dni'] = empleado_anterior_dni
+        print(f'Pedido {pedido_id} actualizado de "{estado_actual}" a "{nuevo_estado}"')
         
+        # Incluye el DNI del empleado anterior para liberarlo
         return result
         
     except Exception as e:
         print(f'Error actualizando estado del pedido: {str(e)}')
         raise
 
-def finalizar_pedido(local_id, pedido_id):
-    """Finaliza el pedido marcando el último estado como inactivo"""
-    table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+# Candidatos por consulta al índice y consultas antes de rendirse
+CANDIDATOS_POR_RONDA = 5
+MAX_RONDAS_ASIGNACION = 3
+# Espera (con jitter) tras chocar con otra transacción sobre el mismo empleado
+ESPERA_CONFLICTO_SEGUNDOS = 0.05
+
+def asignar_empleado_y_actualizar_pedido(local_id, pedido_id, role, nuevo_estado, pedido=None):
+    """
+    Reclama atómicamente el mejor empleado libre del rol y avanza el pedido
+    al nuevo estado en una sola transacción:
+    - el empleado solo se marca ocupado si sigue libre (ocupado = false)
+    - el pedido solo avanza si sigue en el estado y versión leídos
+    - el evento de la transición se registra en la tabla de eventos
+    Si otro workflow ganó al candidato (ConditionalCheckFailed) o lo está
+    reclamando en ese momento (TransactionConflict), se intenta con el
+    siguiente del ranking. En el conflicto el empleado no se descarta: si la
+    otra transacción falla puede volver a aparecer en la ronda siguiente.
+    Returns: (dict, dict) - (empleado asignado, pedido actualizado con
+             _empleado_anterior_dni) o (None, None) si no hay empleados libres
+    """
+    empleados_table = os.environ['TABLE_EMPLEADOS']
+    client = dynamodb.meta.client
     
-    try:
-        ahora = datetime.now().isoformat()
-        
+    if pedido is None:
         pedido = obtener_pedido(local_id, pedido_id)
-        historial_actual = pedido.get('historial_estados', [])
+    
+    # Validar la transición antes de consultar empleados
+    validar_transicion_estado(pedido.get('estado'), nuevo_estado)
+    
+    clave = clave_disponibilidad(local_id, role)
+    descartados = set()
+    
+    for ronda in range(MAX_RONDAS_ASIGNACION):
+        candidatos = [
+            empleado for empleado in buscar_empleados_disponibles(local_id, role, CANDIDATOS_POR_RONDA + len(descartados))
+            if empleado['dni'] not in descartados
+        ]
         
-        # Cerrar el último estado activo
-        for estado in historial_actual:
-            if estado.get('activo', False):
-                estado['activo'] = False
-                estado['hora_fin'] = ahora
+        if not candidatos:
+            print(f'No se encontraron {role}s disponibles en local {local_id}')
+            return None, None
         
-        response = table.update_item(
-            Key={
-                'local_id': local_id,
-                'pedido_id': pedido_id
-            },
-            UpdateExpression='SET estado = :estado, historial_estados = :historial',
-            ExpressionAttributeValues={
-                ':estado': 'recibido',
-                ':historial': historial_actual
-            },
-            ReturnValues='ALL_NEW'
-        )
+        for empleado in candidatos:
+            update_kwargs, evento, empleado_anterior_dni = construir_transicion_pedido(pedido, nuevo_estado, empleado)
+            
+            try:
+                client.transact_write_items(
+                    TransactItems=[
+                        {
+                            'Update': {
+                                'TableName': empleados_table,
+                                'Key': {'local_id': local_id, 'dni': empleado['dni']},
+                                'UpdateExpression': 'SET ocupado = :ocupado REMOVE disponible_rol',
+                                'ConditionExpression': 'ocupado = :libre AND disponible_rol = :disponible_rol',
+                                'ExpressionAttributeValues': {
+                                    ':ocupado': True,
+                                    ':libre': False,
+                                    ':disponible_rol': clave
+                                }
+                            }
+                        }
+                    ] + operaciones_transicion(update_kwargs, evento)
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'TransactionCanceledException':
+                    raise
+                
+                razones = [r.get('Code') for r in e.response.get('CancellationReasons', [])]
+                if 'ConditionalCheckFailed' in razones[1:]:
+                    raise ValueError(f'El pedido {pedido_id} fue modificado por otro proceso durante la asignación')
+                if razones and razones[0] == 'ConditionalCheckFailed':
+                    print(f'Empleado {empleado["dni"]} ya fue asignado por otro pedido, probando el siguiente')
+                    descartados.add(empleado['dni'])
+                    continue
+                if razones and razones[0] == 'TransactionConflict':
+                    print(f'Empleado {empleado["dni"]} está siendo reclamado por otro pedido, probando el siguiente')
+                    time.sleep(random.uniform(0, ESPERA_CONFLICTO_SEGUNDOS))
+                    continue
+                raise
+            
+            print(f'Empleado {role} {empleado["dni"]} asignado y pedido {pedido_id} actualizado a "{nuevo_estado}" (ronda {ronda + 1})')
+            
+            return empleado, aplicar_transicion(pedido, evento, empleado_anterior_dni)
+    
+    print(f'No se pudo asignar un {role} en local {local_id} tras {MAX_RONDAS_ASIGNACION} rondas')
+    return None, None
+
+def finalizar_pedido(local_id, pedido_id, pedido=None):
+    """Finaliza el pedido: pasa a "recibido" y ya no tiene empleado asignado"""
+    try:
+        if pedido is None:
+            pedido = obtener_pedido(local_id, pedido_id)
+        
+        result = ejecutar_transicion(pedido, 'recibido')
         
         print(f'Pedido {pedido_id} finalizado')
-        return response.get('Attributes')
+        return result
         
     except Exception as e:
         print(f'Error finalizando pedido: {str(e)}')
         raise
 
-def agregar_pedido_a_usuario(usuario_correo, pedido_id):
-    """Agrega un pedido al historial del usuario"""
-    table = dynamodb.Table(os.environ['TABLE_USUARIOS'])
-    
+def resetear_pedido_a_inicial(local_id, pedido_id):
+    """Resetea un pedido a su estado inicial para reintentar el workflow"""
     try:
-        response = table.update_item(
-            Key={'correo': usuario_correo},
-            UpdateExpression='SET historial_pedidos = list_append(if_not_exists(historial_pedidos, :empty_list), :pedido)',
-            ExpressionAttributeValues={
-                ':pedido': [pedido_id],
-                ':empty_list': []
-            },
-            ReturnValues='UPDATED_NEW'
-        )
+        # Se conserva la fecha de creación para la sort key del GSI por estado
+        pedido = obtener_pedido(local_id, pedido_id)
         
-        print(f'Pedido {pedido_id} agregado al historial del usuario {usuario_correo}')
-        return response.get('Attributes')
+        # Volver a "procesando" sin empleados; el reinicio queda registrado como evento.
+        # historial_estados (pedidos anteriores a la tabla de eventos) se conserva:
+        # read.py?historial=true lo antepone a los eventos
+        update_kwargs, evento, _ = construir_transicion_pedido(pedido, 'procesando', None, tipo='reinicio')
+        update_kwargs['UpdateExpression'] += ', empleados_asignados = :sin_asignados REMOVE task_token, esperando_confirmacion'
+        update_kwargs['ExpressionAttributeValues'][':sin_asignados'] = {}
+        
+        try:
+            dynamodb.meta.client.transact_write_items(
+                TransactItems=operaciones_transicion(update_kwargs, evento)
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'TransactionCanceledException':
+                raise ValueError(f'El pedido {pedido_id} fue modificado por otro proceso')
+            raise
+        
+        print(f'Pedido {pedido_id} reseteado a estado inicial')
+        
+        pedido_actualizado = aplicar_transicion(pedido, evento, None)
+        pedido_actualizado['empleados_asignados'] = {}
+        for atributo in ['task_token', 'esperando_confirmacion', '_empleado_anterior_dni']:
+            pedido_actualizado.pop(atributo, None)
+        return pedido_actualizado
         
     except Exception as e:
-        print(f'Error agregando pedido al usuario: {str(e)}')
+        print(f'Error reseteando pedido: {str(e)}')
         raise
 
-def resetear_pedido_a_inicial(local_id, pedido_id):
-    """Resetea un pedido a su estado inicial para reintentar el workflow"""
-    table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+def devolver_stock_pedido(local_id, pedido_id):
+    """
+    Devuelve al inventario el stock reservado por un pedido cancelado (solo una
+    vez). Los pedidos sin stock_reservado (anteriores a la reserva atómica o
+    cargados por DataGenerator) no descontaron stock y no devuelven nada.
+    """
+    pedidos_table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+    productos_table = dynamodb.Table(os.environ['TABLE_PRODUCTOS'])
     
     try:
-        ahora = datetime.now().isoformat()
-        
-        # Resetear a estado procesando con historial limpio
-        response = table.update_item(
-            Key={
-                'local_id': local_id,
-                'pedido_id': pedido_id
-            },
-            UpdateExpression='SET estado = :estado, historial_estados = :historial, REMOVE task_token, esperando_confirmacion',
-            ExpressionAttributeValues={
-                ':estado': 'procesando',
-                ':historial': [
-                    {
-                        'estado': 'procesando',
-                        'hora_inicio': ahora,
-                        'hora_fin': ahora,
-                        'activo': True,
-                        'empleado': None
+        # Marcar el pedido primero para que reintentos no devuelvan el stock dos veces
+        try:
+            response = pedidos_table.update_item(
+                Key={
+                    'local_id': local_id,
+                    'pedido_id': pedido_id
+                },
+                UpdateExpression='SET stock_devuelto = :true',
+                ConditionExpression='attribute_exists(pedido_id) AND stock_reservado = :true AND attribute_not_exists(stock_devuelto)',
+                ExpressionAttributeValues={
+                    ':true': True
+                },
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                print(f'El pedido {pedido_id} no tiene stock reservado o ya fue devuelto')
+                return {}
+            raise
+        
+        # Sumar cantidades de productos repetidos
+        cantidades = {}
+        for producto in response['Attributes'].get('productos', []):
+            nombre = producto['nombre']
+            cantidades[nombre] = cantidades.get(nombre, 0) + int(producto['cantidad'])
+        
+        for nombre, cantidad in cantidades.items():
+            try:
+                productos_table.update_item(
+                    Key={
+                        'local_id': local_id,
+                        'nombre': nombre
+                    },
+                    UpdateExpression='ADD #stock :cantidad',
+                    ConditionExpression='attribute_exists(#nombre)',
+                    ExpressionAttributeNames={
+                        '#stock': 'stock',
+                        '#nombre': 'nombre'
+                    },
+                    ExpressionAttributeValues={
+                        ':cantidad': cantidad
                     }
-                ]
-            },
-            ReturnValues='ALL_NEW'
-        )
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                print(f'Producto {nombre} ya no existe en el local {local_id}, no se devuelve stock')
         
-        print(f'Pedido {pedido_id} reseteado a estado inicial')
-        return response.get('Attributes')
+        print(f'Stock devuelto para pedido {pedido_id}: {cantidades}')
+        return cantidades
         
     except Exception as e:
-        print(f'Error reseteando pedido: {str(e)}')
+        print(f'Error devolviendo stock del pedido: {str(e)}')
         raise
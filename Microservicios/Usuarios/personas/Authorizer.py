@@ -1,20 +1,60 @@
-import json
+import os
+import time
+from collections import OrderedDict
 from personas.utils.utils import validar_token
 
+# Tokens ya verificados en este contenedor (token -> claims), en orden LRU.
+# Evita volver a verificar la firma del JWT en invocaciones calientes
+TOKENS_CACHE_MAX = int(os.getenv("AUTHORIZER_TOKENS_CACHE_MAX", "1000"))
+_tokens_verificados = OrderedDict()
+
+
+def _validar_token_cacheado(token):
+    """
+    validar_token con un LRU en memoria. Solo se cachean tokens válidos y
+    cada entrada vence con el exp del propio token
+    """
+    ahora = time.time()
+    resultado = _tokens_verificados.get(token)
+    if resultado is not None:
+        if resultado.get("exp") and resultado["exp"] > ahora:
+            _tokens_verificados.move_to_end(token)
+            return resultado
+        del _tokens_verificados[token]
+
+    resultado = validar_token(token)
+    if resultado.get("valido") and resultado.get("exp"):
+        _tokens_verificados[token] = resultado
+        if len(_tokens_verificados) > TOKENS_CACHE_MAX:
+            _tokens_verificados.popitem(last=False)
+    return resultado
+
+
+def _recurso_comodin(method_arn):
+    """
+    arn:aws:execute-api:region:cuenta:api/stage/METODO/ruta -> .../api/stage/*/*
+    API Gateway cachea la política por token: debe cubrir todas las rutas,
+    no solo la primera que se invocó con ese token
+    """
+    arn, _, ruta = method_arn.partition("/")
+    stage = ruta.split("/", 1)[0]
+    return f"{arn}/{stage}/*/*"
+
+
 def lambda_handler(event, context):
     """
     Lambda Authorizer con validación de JWT
     """
     token = event.get("authorizationToken", "")
-    
+
     if token.lower().startswith("bearer "):
         token = token.split(" ", 1)[1].strip()
-    
-    resultado = validar_token(token)
-    
+
+    resultado = _validar_token_cacheado(token)
+
     if not resultado.get("valido"):
         raise Exception("Unauthorized")
-    
+
     # Retornar contexto con información del usuario
     return {
         "principalId": resultado["correo"],
@@ -24,7 +64,7 @@ def lambda_handler(event, context):
                 {
                     "Action": "execute-api:Invoke",
                     "Effect": "Allow",
-                    "Resource": event["methodArn"]
+                    "Resource": _recurso_comodin(event["methodArn"])
                 }
             ]
         },
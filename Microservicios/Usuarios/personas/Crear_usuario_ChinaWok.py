@@ -3,6 +3,7 @@ import boto3
 import os
 from datetime import datetime, timezone
 from personas.utils.utils import generar_token
+from personas.utils.passwords import hashear_contrasena
 
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "ChinaWok-Usuarios")
 
@@ -55,9 +56,8 @@ def lambda_handler(event, context):
     item = {
         "nombre": nombre,
         "correo": correo,
-        "contrasena": contrasena,
+        "contrasena": hashear_contrasena(contrasena),
         "role": "Cliente",
-        "historial_pedidos": [],
         "informacion_bancaria": None
     }
 
@@ -1,43 +1,104 @@
 import json
-import boto3
-import os
 from personas.utils.utils import verificar_rol
+from chinawok_shared.pagination import PaginacionError, leer_limite, decodificar_token, codificar_token
+from personas.utils.listado import EXPORT_BUCKET, escanear_pagina, consultar_por_rol, exportar_a_s3
 
-TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "ChinaWok-Usuarios")
-
-dynamodb = boto3.resource("dynamodb")
-usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
+ROLES_VALIDOS = ["Cliente", "Gerente", "Admin"]
 
 
 def lambda_handler(event, context):
+    """
+    Listado de usuarios sin contraseñas ni datos de tarjeta
+    (ProjectionExpression, nunca se leen de DynamoDB).
+    - limit / next_token: una página del scan (Admin)
+    - role=X [&limit&next_token]: usuarios de un rol desde role-correo-index
+      (Admin cualquier rol, Gerente solo Cliente)
+    - exportar=true [&segmentos=N]: scan paralelo exportado como NDJSON al
+      bucket EXPORT_BUCKET; responde con la key y una URL de descarga
+    """
     # Obtener usuario autenticado
     authorizer = event.get("requestContext", {}).get("authorizer", {})
     usuario_autenticado = {
         "correo": authorizer.get("correo"),
         "role": authorizer.get("role")
     }
-    
-    # 🔒 Solo Admin puede listar todos los usuarios
-    if not verificar_rol(usuario_autenticado, ["Admin"]):
+
+    params = event.get("queryStringParameters") or {}
+    role = params.get("role")
+
+    if role and role not in ROLES_VALIDOS:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"message": "role debe ser Cliente, Gerente o Admin"})
+        }
+
+    # 🔒 Admin lista a todos; Gerente solo puede listar Clientes
+    es_admin = verificar_rol(usuario_autenticado, ["Admin"])
+    es_gerente_clientes = role == "Cliente" and verificar_rol(usuario_autenticado, ["Gerente"])
+    if not (es_admin or es_gerente_clientes):
         return {
             "statusCode": 403,
             "body": json.dumps({"message": "Acceso denegado. Solo Admin puede listar usuarios."})
         }
-    
+
+    if str(params.get("exportar", "")).lower() == "true":
+        # La exportación recorre toda la tabla: solo Admin
+        if not es_admin:
+            return {
+                "statusCode": 403,
+                "body": json.dumps({"message": "Acceso denegado. Solo Admin puede exportar usuarios."})
+            }
+        if not EXPORT_BUCKET:
+            return {
+                "statusCode": 501,
+                "body": json.dumps({"message": "Exportación no configurada (EXPORT_BUCKET)"})
+            }
+        try:
+            segmentos = int(params.get("segmentos") or 4)
+        except ValueError:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"message": "segmentos debe ser un número entero"})
+            }
+
+        try:
+            exportacion = exportar_a_s3(EXPORT_BUCKET, segmentos)
+            return {
+                "statusCode": 200,
+                "body": json.dumps({
+                    "message": "Usuarios exportados correctamente",
+                    "exportacion": exportacion
+                })
+            }
+        except Exception as e:
+            print(f"Error al exportar usuarios: {str(e)}")
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"message": f"Error al exportar usuarios: {str(e)}"})
+            }
+
+    try:
+        limite = leer_limite(params)
+        start_key = decodificar_token(params.get("next_token"))
+    except PaginacionError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"message": str(e)})
+        }
+
     try:
-        response = usuarios_table.scan()
-        usuarios = response.get("Items", [])
-        
-        # Remover contraseñas de la respuesta
-        for usuario in usuarios:
-            if "contrasena" in usuario:
-                del usuario["contrasena"]
-        
+        if role:
+            usuarios, last_key = consultar_por_rol(role, limite, start_key)
+        else:
+            usuarios, last_key = escanear_pagina(limite, start_key)
+
         return {
             "statusCode": 200,
             "body": json.dumps({
                 "message": "Usuarios obtenidos correctamente",
-                "usuarios": usuarios
+                "usuarios": usuarios,
+                "count": len(usuarios),
+                "next_token": codificar_token(last_key)
             }, default=str)
         }
     except Exception as e:
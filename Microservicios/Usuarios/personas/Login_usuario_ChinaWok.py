@@ -2,6 +2,7 @@ import json
 import boto3
 import os
 from personas.utils.utils import generar_token
+from personas.utils.passwords import hashear_contrasena, verificar_contrasena, necesita_rehash
 
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "ChinaWok-Usuarios")
 
@@ -9,6 +10,26 @@ dynamodb = boto3.resource("dynamodb")
 usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
 
 
+def rehashear_contrasena(correo, contrasena, anterior):
+    """
+    Guarda el hash nuevo solo si la contraseña no cambió mientras tanto.
+    Si falla, el login sigue siendo válido y se reintenta en el próximo
+    """
+    try:
+        usuarios_table.update_item(
+            Key={"correo": correo},
+            UpdateExpression="SET contrasena = :nueva",
+            ConditionExpression="contrasena = :anterior",
+            ExpressionAttributeValues={
+                ":nueva": hashear_contrasena(contrasena),
+                ":anterior": anterior
+            }
+        )
+        print(f"Contraseña de {correo} migrada al hash actual")
+    except Exception as e:
+        print(f"No se pudo re-hashear la contraseña de {correo}: {str(e)}")
+
+
 def lambda_handler(event, context):
     body = {}
     if isinstance(event, dict) and "body" in event:
@@ -36,23 +57,26 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "correo y contrasena son obligatorios"})
         }
 
-    resp = usuarios_table.get_item(Key={"correo": correo})
-    if "Item" not in resp:
-        return {
-            "statusCode": 401,
-            "body": json.dumps({"message": "Credenciales inválidas"})
-        }
-
-    usuario = resp["Item"]
+    # Solo lo necesario para el login (ni tarjeta ni dirección)
+    resp = usuarios_table.get_item(
+        Key={"correo": correo},
+        ProjectionExpression="contrasena, #role, nombre",
+        ExpressionAttributeNames={"#role": "role"}
+    )
+    usuario = resp.get("Item")
 
-    if usuario.get("contrasena") != contrasena:
+    if not usuario or not verificar_contrasena(contrasena, usuario.get("contrasena")):
         return {
             "statusCode": 401,
             "body": json.dumps({"message": "Credenciales inválidas"})
         }
 
+    # Migración transparente: texto plano o costo anterior -> hash actual
+    if necesita_rehash(usuario["contrasena"]):
+        rehashear_contrasena(correo, contrasena, usuario["contrasena"])
+
     token = generar_token(
-        correo=usuario["correo"],
+        correo=correo,
         role=usuario.get("role", "Cliente"),
         nombre=usuario.get("nombre", "")
     )
@@ -63,8 +87,8 @@ def lambda_handler(event, context):
             "message": "Login exitoso",
             "token": token,
             "usuario": {
-                "correo": usuario["correo"],
-                "nombre": usuario["nombre"],
+                "correo": correo,
+                "nombre": usuario.get("nombre", ""),
                 "role": usuario.get("role", "Cliente")
             }
         })
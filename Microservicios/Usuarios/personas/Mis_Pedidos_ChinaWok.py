@@ -0,0 +1,75 @@
+import json
+import boto3
+import os
+from boto3.dynamodb.conditions import Key
+from personas.utils.utils import verificar_rol
+from chinawok_shared.pagination import PaginacionError, leer_limite, decodificar_token, codificar_token
+
+TABLE_PEDIDOS_NAME = os.getenv("TABLE_PEDIDOS", "ChinaWok-Pedidos")
+PEDIDOS_USUARIO_INDEX = os.getenv("PEDIDOS_USUARIO_INDEX", "usuario_correo-created_at-index")
+
+dynamodb = boto3.resource("dynamodb")
+pedidos_table = dynamodb.Table(TABLE_PEDIDOS_NAME)
+
+
+def lambda_handler(event, context):
+    """
+    Historial de pedidos del usuario autenticado, del más reciente al más antiguo.
+    Consulta el GSI de Pedidos por usuario_correo (ordenado por created_at),
+    paginado con limit y next_token.
+    Admin puede consultar el historial de otro usuario con ?correo=
+    """
+    # Obtener usuario autenticado
+    authorizer = event.get("requestContext", {}).get("authorizer", {})
+    usuario_autenticado = {
+        "correo": authorizer.get("correo"),
+        "role": authorizer.get("role")
+    }
+
+    params = event.get("queryStringParameters") or {}
+    correo_solicitado = params.get("correo") or usuario_autenticado["correo"]
+
+    # 🔒 Solo Admin puede ver el historial de otros usuarios
+    if correo_solicitado != usuario_autenticado["correo"] and not verificar_rol(usuario_autenticado, ["Admin"]):
+        return {
+            "statusCode": 403,
+            "body": json.dumps({"message": "Solo puedes ver tus propios pedidos"})
+        }
+
+    try:
+        limite = leer_limite(params)
+        start_key = decodificar_token(params.get("next_token"))
+    except PaginacionError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"message": str(e)})
+        }
+
+    try:
+        query_kwargs = {
+            "IndexName": PEDIDOS_USUARIO_INDEX,
+            "KeyConditionExpression": Key("usuario_correo").eq(correo_solicitado),
+            "ScanIndexForward": False,
+            "Limit": limite
+        }
+        if start_key:
+            query_kwargs["ExclusiveStartKey"] = start_key
+
+        response = pedidos_table.query(**query_kwargs)
+        pedidos = response.get("Items", [])
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "message": "Pedidos obtenidos correctamente",
+                "pedidos": pedidos,
+                "count": len(pedidos),
+                "next_token": codificar_token(response.get("LastEvaluatedKey"))
+            }, default=str)
+        }
+    except Exception as e:
+        print(f"Error al obtener pedidos: {str(e)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": f"Error al obtener pedidos: {str(e)}"})
+        }
@@ -3,6 +3,7 @@ import os
 import json
 import re
 from personas.utils.utils import verificar_rol
+from personas.utils.passwords import hashear_contrasena
 
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "ChinaWok-Usuarios")
 
@@ -111,7 +112,7 @@ def lambda_handler(event, context):
                 "body": json.dumps({"message": "contrasena debe tener al menos 6 caracteres"})
             }
         updates.append("contrasena = :contrasena")
-        expr_attr_values[":contrasena"] = body["contrasena"]
+        expr_attr_values[":contrasena"] = hashear_contrasena(body["contrasena"])
 
     # Validar role solo si se incluye
     if "role" in body:
@@ -161,11 +162,13 @@ def lambda_handler(event, context):
         kwargs["ExpressionAttributeNames"] = expr_attr_names
 
     updated_item = usuarios_table.update_item(**kwargs)
+    usuario = updated_item["Attributes"]
+    usuario.pop("contrasena", None)
 
     return {
         "statusCode": 200,
         "body": json.dumps({
             "message": "Usuario actualizado correctamente",
-            "usuario": updated_item["Attributes"]
+            "usuario": usuario
         }, default=str)
     }
@@ -1,12 +1,6 @@
 import json
-import boto3
-import os
 from personas.utils.utils import verificar_rol
-
-TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "ChinaWok-Usuarios")
-
-dynamodb = boto3.resource("dynamodb")
-usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
+from personas.utils.listado import obtener_perfil
 
 
 def lambda_handler(event, context):
@@ -33,76 +27,51 @@ def lambda_handler(event, context):
     
     print("Correo solicitado:", correo_solicitado)
     
-    # 🔒 Verificar permisos ANTES de consultar
     es_admin = verificar_rol(usuario_autenticado, ["Admin"])
     es_gerente = verificar_rol(usuario_autenticado, ["Gerente"])
     es_mismo_usuario = usuario_autenticado["correo"] == correo_solicitado
     
     print(f"Permisos: Admin={es_admin}, Gerente={es_gerente}, MismoUsuario={es_mismo_usuario}")
     
-    # Admin ve a todos
-    if es_admin:
-        print("Acceso concedido: Admin")
-        pass
-    # Gerente ve Clientes y a sí mismo
-    elif es_gerente:
-        print("Verificando permisos de Gerente...")
-        if not es_mismo_usuario:
-            # Verificar que el usuario solicitado sea Cliente
-            try:
-                resp_temp = usuarios_table.get_item(Key={"correo": correo_solicitado})
-                if "Item" not in resp_temp:
-                    return {
-                        "statusCode": 404,
-                        "body": json.dumps({"message": "Usuario no encontrado"})
-                    }
-                role_solicitado = resp_temp["Item"].get("role", "Cliente")
-                print(f"Rol del usuario solicitado: {role_solicitado}")
-                if role_solicitado != "Cliente":
-                    return {
-                        "statusCode": 403,
-                        "body": json.dumps({"message": "Gerente solo puede ver información de Clientes"})
-                    }
-            except Exception as e:
-                print(f"Error al verificar usuario: {str(e)}")
-                return {
-                    "statusCode": 500,
-                    "body": json.dumps({"message": f"Error al verificar usuario: {str(e)}"})
-                }
-    # Cliente solo ve su propia información
-    elif not es_mismo_usuario:
+    # 🔒 Cliente solo ve su propia información (se rechaza sin consultar)
+    if not es_admin and not es_gerente and not es_mismo_usuario:
         print("Acceso denegado: Cliente intenta ver info de otro")
         return {
             "statusCode": 403,
             "body": json.dumps({"message": "Solo puedes ver tu propia información"})
         }
 
-    # Obtener información del usuario
+    # Un solo GetItem proyectado (sin contraseña): sirve para la respuesta
+    # y para validar el rol del usuario solicitado
     try:
-        resp = usuarios_table.get_item(Key={"correo": correo_solicitado})
-        
-        if "Item" not in resp:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"message": "Usuario no encontrado"})
-            }
-        
-        usuario = resp["Item"]
-        
-        # Remover contraseña de la respuesta
-        if "contrasena" in usuario:
-            del usuario["contrasena"]
-        
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "message": "Usuario encontrado",
-                "usuario": usuario
-            }, default=str)
-        }
+        usuario = obtener_perfil(correo_solicitado)
     except Exception as e:
         print(f"Error al buscar usuario: {str(e)}")
         return {
             "statusCode": 500,
             "body": json.dumps({"message": f"Error al buscar usuario: {str(e)}"})
         }
+
+    if not usuario:
+        return {
+            "statusCode": 404,
+            "body": json.dumps({"message": "Usuario no encontrado"})
+        }
+
+    # Gerente ve Clientes y a sí mismo
+    if es_gerente and not es_admin and not es_mismo_usuario:
+        role_solicitado = usuario.get("role", "Cliente")
+        print(f"Rol del usuario solicitado: {role_solicitado}")
+        if role_solicitado != "Cliente":
+            return {
+                "statusCode": 403,
+                "body": json.dumps({"message": "Gerente solo puede ver información de Clientes"})
+            }
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "message": "Usuario encontrado",
+            "usuario": usuario
+        }, default=str)
+    }
@@ -0,0 +1,214 @@
+"""
+Listado y exportación de usuarios sin leer contraseñas ni datos de tarjeta.
+
+Uso como script (exporta a un archivo NDJSON local o a un bucket S3 /
+almacenamiento compatible con S3 indicado con S3_ENDPOINT_URL):
+    python -m personas.utils.listado --salida usuarios.ndjson --segmentos 8
+    python -m personas.utils.listado --bucket mi-bucket --segmentos 8
+"""
+import os
+import json
+import queue
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.dynamodb.conditions import Key
+
+TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "ChinaWok-Usuarios")
+USUARIOS_ROLE_INDEX = os.getenv("USUARIOS_ROLE_INDEX", "role-correo-index")
+EXPORT_BUCKET = os.getenv("EXPORT_BUCKET", "")
+# Endpoint de un almacenamiento compatible con S3 (MinIO, LocalStack); vacío = AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+
+dynamodb = boto3.resource("dynamodb")
+usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
+
+# Segmentos máximos del scan paralelo
+MAX_SEGMENTOS = 32
+# Usuarios en vuelo entre los segmentos y el escritor (acota la memoria)
+TAMANO_COLA = 1000
+
+# Atributos públicos del usuario: nunca contrasena ni informacion_bancaria
+# (de la información bancaria solo la dirección de delivery)
+PROYECCION_PUBLICA = {
+    "ProjectionExpression": "#correo, #nombre, #role, #banco.#direccion",
+    "ExpressionAttributeNames": {
+        "#correo": "correo",
+        "#nombre": "nombre",
+        "#role": "role",
+        "#banco": "informacion_bancaria",
+        "#direccion": "direccion_delivery"
+    }
+}
+
+# Perfil completo sin la contraseña (mi-info), incluye el role para validar permisos
+PROYECCION_PERFIL = {
+    "ProjectionExpression": "#correo, #nombre, #role, #banco",
+    "ExpressionAttributeNames": {
+        "#correo": "correo",
+        "#nombre": "nombre",
+        "#role": "role",
+        "#banco": "informacion_bancaria"
+    }
+}
+
+
+def obtener_perfil(correo):
+    """
+    Un solo GetItem con la proyección del perfil (nunca lee la contraseña)
+    Returns: dict o None si el usuario no existe
+    """
+    response = usuarios_table.get_item(Key={"correo": correo}, **PROYECCION_PERFIL)
+    return response.get("Item")
+
+
+def consultar_por_rol(role, limite, start_key=None):
+    """
+    Una página de los usuarios de un rol, ordenados por correo, desde el
+    índice role-correo-index (sin scan de la tabla)
+    Returns: (list, dict) - (usuarios, LastEvaluatedKey o None)
+    """
+    query_kwargs = dict(
+        PROYECCION_PUBLICA,
+        IndexName=USUARIOS_ROLE_INDEX,
+        KeyConditionExpression=Key("role").eq(role),
+        Limit=limite
+    )
+    if start_key:
+        query_kwargs["ExclusiveStartKey"] = start_key
+
+    response = usuarios_table.query(**query_kwargs)
+    return response.get("Items", []), response.get("LastEvaluatedKey")
+
+
+def escanear_pagina(limite, start_key=None):
+    """
+    Una página del scan con la proyección pública
+    Returns: (list, dict) - (usuarios, LastEvaluatedKey o None)
+    """
+    scan_kwargs = dict(PROYECCION_PUBLICA, Limit=limite)
+    if start_key:
+        scan_kwargs["ExclusiveStartKey"] = start_key
+
+    response = usuarios_table.scan(**scan_kwargs)
+    return response.get("Items", []), response.get("LastEvaluatedKey")
+
+
+def escanear_segmento(segmento, total_segmentos):
+    """
+    Recorre un segmento del scan paralelo página por página.
+    Usa el cliente (thread-safe) en lugar del recurso Table.
+    """
+    scan_kwargs = dict(
+        PROYECCION_PUBLICA,
+        TableName=TABLE_USUARIOS_NAME,
+        Segment=segmento,
+        TotalSegments=total_segmentos
+    )
+    while True:
+        response = dynamodb.meta.client.scan(**scan_kwargs)
+        yield from response.get("Items", [])
+
+        if "LastEvaluatedKey" not in response:
+            return
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def exportar_ndjson(salida, segmentos=4):
+    """
+    Escribe todos los usuarios en `salida` (un usuario JSON por línea).
+    Cada segmento se escanea en su propio hilo y entrega los usuarios a una
+    cola acotada, así la memoria no depende del tamaño de la tabla.
+    Returns: int - usuarios exportados
+    """
+    segmentos = max(1, min(int(segmentos), MAX_SEGMENTOS))
+    cola = queue.Queue(maxsize=TAMANO_COLA)
+    fin_segmento = object()
+    # Si el escritor falla, los segmentos dejan de esperar espacio en la cola
+    cancelado = threading.Event()
+
+    def encolar(elemento):
+        while not cancelado.is_set():
+            try:
+                cola.put(elemento, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producir(segmento):
+        try:
+            for usuario in escanear_segmento(segmento, segmentos):
+                if not encolar(usuario):
+                    return
+        finally:
+            encolar(fin_segmento)
+
+    total = 0
+    with ThreadPoolExecutor(max_workers=segmentos) as executor:
+        futuros = [executor.submit(producir, segmento) for segmento in range(segmentos)]
+
+        try:
+            terminados = 0
+            while terminados < segmentos:
+                usuario = cola.get()
+                if usuario is fin_segmento:
+                    terminados += 1
+                    continue
+                salida.write(json.dumps(usuario, ensure_ascii=False, default=str) + "\n")
+                total += 1
+        except BaseException:
+            cancelado.set()
+            raise
+
+        # Propaga el error de cualquier segmento
+        for futuro in futuros:
+            futuro.result()
+
+    return total
+
+
+def exportar_a_s3(bucket, segmentos=4, prefijo="exports/usuarios"):
+    """
+    Exporta a un archivo temporal y lo sube al bucket (subida multiparte
+    administrada por boto3)
+    Returns: dict - bucket, key, total y URL prefirmada de descarga
+    """
+    s3 = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL)
+    key = f"{prefijo}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.ndjson"
+
+    with tempfile.NamedTemporaryFile("w+", encoding="utf-8", suffix=".ndjson") as archivo:
+        total = exportar_ndjson(archivo, segmentos)
+        archivo.flush()
+        s3.upload_file(archivo.name, bucket, key, ExtraArgs={"ContentType": "application/x-ndjson"})
+
+    url = s3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket, "Key": key},
+        ExpiresIn=3600
+    )
+    return {"bucket": bucket, "key": key, "total": total, "url": url}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta los usuarios a NDJSON con un scan paralelo")
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--salida", help="Archivo NDJSON de salida")
+    destino.add_argument("--bucket", help="Bucket S3 (o compatible, ver S3_ENDPOINT_URL)")
+    parser.add_argument("--segmentos", type=int, default=4, help=f"Segmentos del scan paralelo (máx. {MAX_SEGMENTOS})")
+    args = parser.parse_args()
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as salida:
+            total = exportar_ndjson(salida, args.segmentos)
+        print(f"✅ {total} usuarios exportados a {args.salida}")
+    else:
+        resultado = exportar_a_s3(args.bucket, args.segmentos)
+        print(f"✅ {resultado['total']} usuarios exportados a s3://{resultado['bucket']}/{resultado['key']}")
+
+
+if __name__ == "__main__":
+    main()
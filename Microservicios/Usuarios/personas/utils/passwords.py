@@ -0,0 +1,67 @@
+"""
+Hash de contraseñas con PBKDF2-HMAC-SHA256 (hashlib, sin dependencias extra).
+
+Formato guardado en `contrasena`:
+    pbkdf2_sha256$<iteraciones>$<salt base64>$<hash base64>
+
+El costo se ajusta con PASSWORD_ITERATIONS. Subirlo no invalida los hashes
+existentes: el login los re-hashea con el costo nuevo (necesita_rehash), igual
+que las filas antiguas con la contraseña en texto plano.
+"""
+import os
+import hmac
+import base64
+import hashlib
+
+ALGORITMO = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = int(os.getenv("PASSWORD_ITERATIONS", "100000"))
+SALT_BYTES = 16
+
+
+def _derivar(contrasena, salt, iteraciones):
+    return hashlib.pbkdf2_hmac("sha256", contrasena.encode("utf-8"), salt, iteraciones)
+
+
+def _b64(datos):
+    return base64.b64encode(datos).decode("ascii")
+
+
+def hashear_contrasena(contrasena, iteraciones=None):
+    """Retorna el hash (con salt aleatorio) listo para guardar en DynamoDB"""
+    iteraciones = iteraciones or PASSWORD_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    derivada = _derivar(contrasena, salt, iteraciones)
+    return f"{ALGORITMO}${iteraciones}${_b64(salt)}${_b64(derivada)}"
+
+
+def _partes(guardada):
+    """(iteraciones, salt, hash) o None si no es un hash de este módulo"""
+    if not isinstance(guardada, str) or not guardada.startswith(ALGORITMO + "$"):
+        return None
+    try:
+        _, iteraciones, salt, derivada = guardada.split("$")
+        return int(iteraciones), base64.b64decode(salt), base64.b64decode(derivada)
+    except ValueError:
+        return None
+
+
+def verificar_contrasena(contrasena, guardada):
+    """
+    Compara en tiempo constante. Acepta también filas antiguas con la
+    contraseña en texto plano (se migran con necesita_rehash)
+    """
+    if not guardada:
+        return False
+
+    partes = _partes(guardada)
+    if partes is None:
+        return hmac.compare_digest(contrasena.encode("utf-8"), str(guardada).encode("utf-8"))
+
+    iteraciones, salt, derivada = partes
+    return hmac.compare_digest(_derivar(contrasena, salt, iteraciones), derivada)
+
+
+def necesita_rehash(guardada):
+    """True si está en texto plano o se hasheó con un costo distinto al actual"""
+    partes = _partes(guardada)
+    return partes is None or partes[0] != PASSWORD_ITERATIONS
@@ -34,6 +34,7 @@ def validar_token(token):
             "correo": str,
             "role": str,
             "nombre": str,
+            "exp": int (timestamp de expiración),
             "error": str (opcional)
         }
     """
@@ -47,7 +48,8 @@ def validar_token(token):
             "valido": True,
             "correo": payload.get("correo"),
             "role": payload.get("role", "Cliente"),
-            "nombre": payload.get("nombre", "")
+            "nombre": payload.get("nombre", ""),
+            "exp": payload.get("exp")
         }
     except jwt.ExpiredSignatureError:
         return {"valido": False, "error": "Token expirado"}
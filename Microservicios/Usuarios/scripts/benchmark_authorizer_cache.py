@@ -0,0 +1,86 @@
+"""
+Micro-benchmark: cache de tokens verificados del Authorizer
+(_validar_token_cacheado) frente a validar_token en cada invocación.
+
+Genera --usuarios tokens y una secuencia de --invocaciones en la que unos
+pocos usuarios concentran la mayoría de las invocaciones (Zipf, --sesgo),
+como un contenedor caliente del authorizer. Reporta la tasa de aciertos del
+LRU para el --cache-max indicado y la latencia por invocación de
+lambda_handler con y sin cache. No accede a AWS.
+
+Uso (desde Microservicios/Usuarios):
+    python scripts/benchmark_authorizer_cache.py --usuarios 5000 --invocaciones 50000 --cache-max 1000
+"""
+import argparse
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("JWT_SECRET", "benchmark-authorizer-cache-0123456789")
+
+from personas import Authorizer
+from personas.utils.utils import generar_token, validar_token
+
+METHOD_ARN = "arn:aws:execute-api:us-east-1:123456789012:api123/dev/GET/usuario/listar"
+
+
+def secuencia_invocaciones(tokens, invocaciones, sesgo):
+    """Tokens en orden de invocación; el usuario i tiene peso 1 / (i + 1)^sesgo"""
+    pesos = [1 / (i + 1) ** sesgo for i in range(len(tokens))]
+    return random.choices(tokens, weights=pesos, k=invocaciones)
+
+
+def medir(nombre, secuencia):
+    """Invoca lambda_handler con cada token y cuenta las verificaciones de firma"""
+    verificaciones = 0
+
+    def validar_contando(token):
+        nonlocal verificaciones
+        verificaciones += 1
+        return validar_token(token)
+
+    Authorizer._tokens_verificados.clear()
+    Authorizer.validar_token = validar_contando
+    inicio = time.perf_counter()
+    for token in secuencia:
+        Authorizer.lambda_handler({"authorizationToken": f"Bearer {token}", "methodArn": METHOD_ARN}, None)
+    total = time.perf_counter() - inicio
+    Authorizer.validar_token = validar_token
+
+    aciertos = len(secuencia) - verificaciones
+    print(f"   {nombre:<22} {total / len(secuencia) * 1e6:8.1f} µs/invocación   "
+          f"aciertos: {aciertos / len(secuencia):6.1%}   verificaciones JWT: {verificaciones}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tasa de aciertos y latencia del cache de tokens del Authorizer")
+    parser.add_argument("--usuarios", type=int, default=5000)
+    parser.add_argument("--invocaciones", type=int, default=50000)
+    parser.add_argument("--cache-max", type=int, default=Authorizer.TOKENS_CACHE_MAX,
+                        help="Tamaño del LRU (AUTHORIZER_TOKENS_CACHE_MAX)")
+    parser.add_argument("--sesgo", type=float, default=1.0,
+                        help="Exponente de Zipf: 0 = todos los usuarios igual de activos")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    tokens = [generar_token(f"usuario{i}@chinawok.pe", "Cliente", f"Usuario {i}") for i in range(args.usuarios)]
+    secuencia = secuencia_invocaciones(tokens, args.invocaciones, args.sesgo)
+    distintos = len(set(secuencia))
+
+    print(f"📊 {args.invocaciones} invocaciones de {distintos} usuarios distintos (sesgo {args.sesgo})")
+    print(f"   Aciertos máximos posibles: {1 - distintos / args.invocaciones:.1%} (solo fallan las primeras)\n")
+
+    Authorizer.TOKENS_CACHE_MAX = 0
+    sin_cache = medir("sin cache", secuencia)
+    Authorizer.TOKENS_CACHE_MAX = args.cache_max
+    con_cache = medir(f"LRU de {args.cache_max}", secuencia)
+
+    print(f"\n⚡ Aceleración: {sin_cache / con_cache:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Calibración del costo de PBKDF2 (PASSWORD_ITERATIONS) para el login.
+
+Mide verificar_contrasena con varios costos y reporta los ms por login y los
+logins por segundo que soporta un núcleo. Recomienda el costo más alto que
+queda bajo --objetivo-ms. El tiempo depende de la CPU: en Lambda la CPU
+crece con la memoria asignada, así que conviene correrlo con una CPU
+comparable o dejar margen en el objetivo.
+
+Uso (desde Microservicios/Usuarios):
+    python scripts/calibrar_pbkdf2.py --objetivo-ms 100 --iteraciones 100000 200000 310000 600000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from personas.utils.passwords import PASSWORD_ITERATIONS, hashear_contrasena, verificar_contrasena
+
+CONTRASENA = "Contrasena-de-prueba-123"
+
+
+def medir(iteraciones, repeticiones):
+    """Mediana de los ms de un login (verificar_contrasena) con ese costo"""
+    guardada = hashear_contrasena(CONTRASENA, iteraciones)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        if not verificar_contrasena(CONTRASENA, guardada):
+            raise RuntimeError("verificar_contrasena rechazó la contraseña correcta")
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide logins/s de PBKDF2 por costo y recomienda PASSWORD_ITERATIONS")
+    parser.add_argument("--iteraciones", type=int, nargs="+", default=[50000, 100000, 200000, 310000, 600000])
+    parser.add_argument("--objetivo-ms", type=float, default=100.0,
+                        help="Latencia máxima aceptable del hash en un login")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"📊 PBKDF2-HMAC-SHA256, mediana de {args.repeticiones} logins por costo "
+          f"(PASSWORD_ITERATIONS actual: {PASSWORD_ITERATIONS})\n")
+    print(f"   {'iteraciones':>12} {'ms/login':>10} {'logins/s':>10}")
+
+    recomendado = None
+    for iteraciones in sorted(args.iteraciones):
+        ms = medir(iteraciones, args.repeticiones)
+        marca = "✅" if ms <= args.objetivo_ms else "❌"
+        print(f"   {iteraciones:>12} {ms:>10.1f} {1000 / ms:>10.1f}  {marca}")
+        if ms <= args.objetivo_ms:
+            recomendado = iteraciones
+
+    if recomendado is None:
+        print(f"\n❌ Ningún costo queda bajo {args.objetivo_ms:.0f} ms: probar con menos iteraciones")
+        return
+
+    print(f"\n⚡ Recomendado: PASSWORD_ITERATIONS={recomendado} (objetivo {args.objetivo_ms:.0f} ms)")
+    if recomendado != PASSWORD_ITERATIONS:
+        print("   Los hashes existentes se re-hashean con el costo nuevo en el próximo login (necesita_rehash)")
+
+
+if __name__ == "__main__":
+    main()
@@ -91,6 +91,9 @@ build_layer() {
         exit 1
     fi
     
+    # Código compartido entre microservicios (import chinawok_shared.*)
+    cp -r shared/chinawok_shared python-dependencies/python/
+    
     # ⚠️ NO eliminar la carpeta python/ - Serverless la necesita para el despliegue
     # La carpeta python-dependencies/python/ debe existir cuando serverless deploy se ejecute
     